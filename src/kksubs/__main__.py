@@ -0,0 +1,5 @@
+import sys
+
+from kksubs.cli import main
+
+sys.exit(main())
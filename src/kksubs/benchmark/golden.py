@@ -0,0 +1,250 @@
+import argparse
+import json
+import logging
+import math
+import os
+import tempfile
+import time
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import yaml
+from PIL import Image
+
+from kksubs.benchmark.synthetic import SyntheticProject, get_source_image_directory
+from kksubs.kksubs import SubtitleController
+from kksubs.model.domain_models import SupportedImageExtensions
+
+logger = logging.getLogger(__name__)
+
+# golden-image regression harness.
+# renders a fixed matrix of profiles over the sample images with the reference renderer, and compares the results
+# with stored reference outputs by per-pixel error, so optimized engines can be checked against the reference.
+
+# the references of a source checkout, found from the package rather than the working directory.
+DEFAULT_REFERENCE_DIRECTORY = os.path.normpath(
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "..", "test", "golden", "reference")
+)
+REFERENCE_RESOLUTION = (320, 180)
+
+PASSED = "passed"
+FAILED = "failed"
+ERROR = "error"
+MISSING = "missing"
+
+# profile data shared by the cases, sized for the reference resolution.
+BASE_PROFILE = {
+    "subtitle_profile_id": "default",
+    "font_data": {"size": 14, "stroke_size": 2},
+    "textbox_data": {"box_width": 24, "anchor_point": [0, 20]},
+}
+CONTENT = ["The quick brown fox jumps over the lazy dog.", "Sphinx of black quartz, judge my vow."]
+MASK = {"f_coords": [30, 15], "f_radius": 40, "f_blur": 20}
+
+def get_cases(asset_path:str=None) -> Dict[str, Dict]:
+    # case name -> profile data, on top of the base profile. asset cases need an asset path.
+    cases = {
+        "align_center": {},
+        "align_left": {"textbox_data": {"alignment": "left", "anchor_point": [-150, 20]}},
+        "align_right": {"textbox_data": {"alignment": "right", "anchor_point": [150, 20]}},
+        "push_up": {"textbox_data": {"push": "up", "anchor_point": [0, -60]}},
+        "push_center": {"textbox_data": {"push": "center", "anchor_point": [0, 0]}},
+        "grid4": {"textbox_data": {"alignment": "left", "grid4": [1, 1], "anchor_point": [0, 0]}},
+        "grid4_anchor_point": {"textbox_data": {"alignment": "right", "grid4": [3, 2], "anchor_point": [10, 10]}},
+        "rotate": {"textbox_data": {"rotate": 15}},
+        # dynamic rotation leaves text centered in the middle fifth of the frame level, so these are anchored at the edges.
+        "dynamic_rotate_left": {"textbox_data": {"alignment": "left", "grid4": [0, 1], "anchor_point": [0, 0], "dynamic_rotate": 10}},
+        "dynamic_rotate_right": {"textbox_data": {"alignment": "right", "grid4": [4, 1], "anchor_point": [0, 0], "dynamic_rotate": 10}},
+        "outline_1_blur": {"outline_data_1": {"color": "black", "radius": 3, "blur_strength": 2}},
+        "outline_2_blur": {
+            "outline_data_1": {"color": "white", "radius": 2, "blur_strength": 2},
+            "outline_data_2": {"color": "black", "radius": 5, "blur_strength": 4},
+        },
+        "brightness": {"layer_data": {"brightness": 0.5}},
+        "brightness_mask": {"layer_data": {"brightness": 0.5, **MASK}},
+        "gaussian_blur": {"layer_data": {"gaussian_blur": 3}},
+        "gaussian_blur_mask": {"layer_data": {"gaussian_blur": 3, **MASK}},
+        "motion_blur": {"layer_data": {"motion_blur": 7, "motion_rotate": 30}},
+        "motion_blur_mask": {"layer_data": {"motion_blur": 7, **MASK}},
+        # radial blur does not take a rejection mask.
+        "radial_blur": {"layer_data": {"radial_blur": 9, "radial_coords": [30, 15]}},
+        "orbits": {"orbits": [
+            {"subtitle_profile_id": "orbit_0", "centrix": ["l", "u"], "default_text": "orbit", "font_data": {"size": 10}},
+            {"subtitle_profile_id": "orbit_1", "centrix": ["r", "d"], "default_text": "orbit", "font_data": {"size": 10}},
+        ]},
+    }
+    if asset_path is not None:
+        cases["asset"] = {"asset_data": {"path": asset_path, "coords": [-100, 40], "scale": 0.05}}
+        cases["asset_rotate"] = {"asset_data": {"path": asset_path, "coords": [100, 40], "scale": 0.05, "rotate": 30}}
+    return cases
+
+def _get_source_image_paths(source_image_directory:str) -> List[str]:
+    return [
+        os.path.join(source_image_directory, filename)
+        for filename in sorted(filter(SupportedImageExtensions.get_is_supported, os.listdir(source_image_directory)))
+    ]
+
+def create_golden_project(directory:str, source_image_directory:str=None, case_names:List[str]=None) -> SyntheticProject:
+    # one draft per case, each subtitling one of the sample images (cycling by case), resized to the reference resolution.
+    source_image_directory = get_source_image_directory(source_image_directory)
+    project = SyntheticProject(directory)
+    for path in [project.input_image_directory, project.input_text_directory, project.output_directory]:
+        os.makedirs(path, exist_ok=True)
+
+    source_image_paths = _get_source_image_paths(source_image_directory)
+    if not source_image_paths:
+        raise FileNotFoundError(f"Source image directory {source_image_directory} has no images.")
+    image_ids = []
+    for source_image_path in source_image_paths:
+        image_id = os.path.basename(source_image_path)
+        image = Image.open(source_image_path).resize(REFERENCE_RESOLUTION, resample=Image.BICUBIC)
+        image.save(os.path.join(project.input_image_directory, image_id))
+        image_ids.append(image_id)
+
+    cases = get_cases(asset_path=os.path.abspath(source_image_paths[0]))
+    if case_names is None:
+        case_names = list(cases.keys())
+    subtitle_profile_dicts = [BASE_PROFILE]
+    for i, case_name in enumerate(case_names):
+        subtitle_profile_dicts.append({"subtitle_profile_id": f"{case_name}(default)", **cases[case_name]})
+        with open(os.path.join(project.input_text_directory, f"{case_name}.txt"), "w", encoding="utf-8") as writer:
+            writer.write("\n".join([f"image_id: {image_ids[i % len(image_ids)]}", f"{case_name}: {CONTENT[0]}", *CONTENT[1:]]))
+    with open(project.subtitle_profile_path, "w", encoding="utf-8") as writer:
+        yaml.safe_dump(subtitle_profile_dicts, writer, sort_keys=False)
+    return project
+
+def iter_golden_renders(
+        project:SyntheticProject, configure:Callable[[SubtitleController], None]=None
+) -> Iterator[Tuple[str, Optional[Image.Image], float, Optional[Exception]]]:
+    # yields (case name, image, seconds, error) by case. configure is called on the controller before rendering,
+    # to switch on the engine under test.
+    controller = SubtitleController()
+    controller.load_project(project.directory)
+    if configure is not None:
+        configure(controller)
+    subtitle_service = controller.subtitle_service
+    for render_job in subtitle_service.get_render_jobs():
+        # each case subtitles a single image; the other images of its draft are left unchanged.
+        if render_job.subtitle_group is None:
+            continue
+        case_name = os.path.splitext(render_job.text_id)[0]
+        start = time.perf_counter()
+        try:
+            image = subtitle_service.render_job(render_job)
+        except Exception as error:
+            logger.warning(f"Golden case {case_name} failed to render: {error!r}")
+            yield case_name, None, time.perf_counter() - start, error
+            continue
+        yield case_name, image, time.perf_counter() - start, None
+
+def compare_images(image:Image.Image, reference:Image.Image) -> Dict[str, float]:
+    # per-pixel error metrics over the RGBA channels, in 0-255 units.
+    if image.size != reference.size:
+        return {"size_mismatch": True, "max_error": 255.0, "mean_error": 255.0, "differing_fraction": 1.0, "psnr": 0.0}
+    image_array = np.asarray(image.convert("RGBA"), dtype=np.int16)
+    reference_array = np.asarray(reference.convert("RGBA"), dtype=np.int16)
+    error = np.abs(image_array - reference_array)
+    mse = float(np.mean(error.astype(np.float64)**2))
+    return {
+        "size_mismatch": False,
+        "max_error": float(error.max()),
+        "mean_error": float(error.mean()),
+        # pixels with any channel off by more than one.
+        "differing_fraction": float(np.mean(error.max(axis=2) > 1)),
+        "psnr": 10*math.log10(255**2/mse) if mse > 0 else math.inf,
+    }
+
+def get_reference_path(reference_directory:str, case_name:str) -> str:
+    return os.path.join(reference_directory, f"{case_name}.png")
+
+def write_references(reference_directory:str=None, source_image_directory:str=None, case_names:List[str]=None) -> List[str]:
+    # renders the cases with the reference renderer and stores them as the new references.
+    if reference_directory is None:
+        reference_directory = DEFAULT_REFERENCE_DIRECTORY
+    os.makedirs(reference_directory, exist_ok=True)
+    written = []
+    with tempfile.TemporaryDirectory() as directory:
+        project = create_golden_project(directory, source_image_directory=source_image_directory, case_names=case_names)
+        for case_name, image, _, error in iter_golden_renders(project):
+            if error is not None:
+                continue
+            image.save(get_reference_path(reference_directory, case_name))
+            written.append(case_name)
+    logger.info(f"Wrote {len(written)} golden references to {reference_directory}.")
+    return written
+
+def run_golden_harness(
+        reference_directory:str=None, source_image_directory:str=None, case_names:List[str]=None,
+        configure:Callable[[SubtitleController], None]=None, max_mean_error:float=None, max_differing_fraction:float=None
+) -> Dict[str, Dict]:
+    """
+    Renders the cases and compares them with the references.
+    :param configure: called on the controller before rendering, e.g. to switch on an optimized engine.
+    :param max_mean_error: tolerated mean absolute error in 0-255 units; exact by default.
+    :param max_differing_fraction: tolerated fraction of pixels off by more than one; exact by default.
+    :returns: report by case, with status, metrics and render seconds.
+    """
+    if reference_directory is None:
+        reference_directory = DEFAULT_REFERENCE_DIRECTORY
+    if max_mean_error is None:
+        max_mean_error = 0.0
+    if max_differing_fraction is None:
+        max_differing_fraction = 0.0
+    report = dict()
+    with tempfile.TemporaryDirectory() as directory:
+        project = create_golden_project(directory, source_image_directory=source_image_directory, case_names=case_names)
+        for case_name, image, seconds, error in iter_golden_renders(project, configure=configure):
+            reference_path = get_reference_path(reference_directory, case_name)
+            case_report = {"seconds": seconds, "metrics": None, "error": None}
+            if not os.path.exists(reference_path):
+                case_report["status"] = MISSING
+            elif error is not None:
+                case_report["status"] = ERROR
+                case_report["error"] = repr(error)
+            else:
+                with Image.open(reference_path) as reference:
+                    metrics = compare_images(image, reference)
+                case_report["metrics"] = metrics
+                is_passed = (
+                    not metrics["size_mismatch"] and metrics["mean_error"] <= max_mean_error
+                    and metrics["differing_fraction"] <= max_differing_fraction
+                )
+                case_report["status"] = PASSED if is_passed else FAILED
+            report[case_name] = case_report
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check renders against the golden reference images.")
+    parser.add_argument("--reference-directory", default=DEFAULT_REFERENCE_DIRECTORY)
+    parser.add_argument("--source-image-directory", default=None)
+    parser.add_argument("--cases", nargs="*", default=None)
+    parser.add_argument("--max-mean-error", type=float, default=None)
+    parser.add_argument("--max-differing-fraction", type=float, default=None)
+    parser.add_argument("--update", action="store_true", help="overwrite the references with the current renders.")
+    parser.add_argument("--output", default=None, help="write the report to this JSON file.")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.WARNING)
+
+    if args.update:
+        written = write_references(args.reference_directory, source_image_directory=args.source_image_directory, case_names=args.cases)
+        print(f"Wrote {len(written)} references to {args.reference_directory}.")
+        return
+
+    report = run_golden_harness(
+        reference_directory=args.reference_directory, source_image_directory=args.source_image_directory,
+        case_names=args.cases, max_mean_error=args.max_mean_error, max_differing_fraction=args.max_differing_fraction,
+    )
+    if args.output is not None:
+        with open(args.output, "w", encoding="utf-8") as writer:
+            json.dump(report, writer, indent=2)
+    for case_name, case_report in report.items():
+        metrics = case_report["metrics"]
+        details = f"mean error {metrics['mean_error']:.3f}, max error {metrics['max_error']:.0f}" if metrics else case_report["error"] or ""
+        print(f"{case_name}\t{case_report['status']}\t{case_report['seconds']*1000:.0f}ms\t{details}")
+    if any(case_report["status"] in (FAILED, ERROR) for case_report in report.values()):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+import argparse
+import json
+import logging
+import subprocess
+import sys
+from typing import Dict, List
+
+logger = logging.getLogger(__name__)
+
+# import-time benchmark: imports kksubs modules in fresh interpreters under -X importtime, and reports the
+# cumulative import time of each module and which heavy dependencies were loaded along the way.
+
+DEFAULT_MODULES = ["kksubs.kksubs", "kksubs.server"]
+# dependencies that should only load when an effect (or the frame cache) needs them.
+HEAVY_MODULES = ["cv2", "numpy"]
+
+def _parse_importtime(stderr:str) -> Dict[str, int]:
+    # module -> cumulative import time in microseconds.
+    cumulative_times = dict()
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[1].strip().isdigit():
+            continue
+        cumulative_times[fields[2].strip()] = int(fields[1])
+    return cumulative_times
+
+def measure_import(module:str, heavy_modules:List[str]=None) -> Dict:
+    # imports a module in a fresh interpreter.
+    if heavy_modules is None:
+        heavy_modules = HEAVY_MODULES
+    code = f"import sys, json; import {module}; print(json.dumps([m for m in {heavy_modules!r} if m in sys.modules]))"
+    process = subprocess.run([sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True, check=True)
+    cumulative_times = _parse_importtime(process.stderr)
+    return {
+        "module": module,
+        "seconds": cumulative_times.get(module, 0)/1e6,
+        "loaded_heavy_modules": json.loads(process.stdout.strip().splitlines()[-1]),
+        "slowest_imports": [
+            {"module": name, "seconds": microseconds/1e6}
+            for name, microseconds in sorted(cumulative_times.items(), key=lambda item: -item[1])[:10]
+        ],
+    }
+
+def benchmark_imports(modules:List[str]=None, repeats:int=None) -> List[Dict]:
+    # the fastest of several fresh imports, by module.
+    if modules is None:
+        modules = DEFAULT_MODULES
+    if repeats is None:
+        repeats = 5
+    results = []
+    for module in modules:
+        runs = [measure_import(module) for _ in range(repeats)]
+        results.append(min(runs, key=lambda run: run["seconds"]))
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure the import time of kksubs modules.")
+    parser.add_argument("modules", nargs="*", default=None)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--max-seconds", type=float, default=None, help="fail if an import takes longer than this.")
+    parser.add_argument("--output", default=None, help="write results to this JSON file.")
+    args = parser.parse_args(argv)
+
+    results = benchmark_imports(args.modules or None, repeats=args.repeats)
+    if args.output is not None:
+        with open(args.output, "w", encoding="utf-8") as writer:
+            json.dump(results, writer, indent=2)
+    is_failed = False
+    for result in results:
+        heavy_modules = ", ".join(result["loaded_heavy_modules"]) or "none"
+        print(f"{result['module']}\t{result['seconds']*1000:.1f}ms\theavy modules loaded: {heavy_modules}")
+        if args.max_seconds is not None and result["seconds"] > args.max_seconds:
+            is_failed = True
+    if is_failed:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+import argparse
+import json
+import logging
+import os
+import platform
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+import numpy as np
+import PIL
+
+from kksubs.benchmark.synthetic import FEATURES, create_synthetic_project, get_source_image_directory
+from kksubs.kksubs import SubtitleController
+
+logger = logging.getLogger(__name__)
+
+# times parsing, validation, rendering and encoding of a synthetic project, and writes the results as JSON
+# so that runs (e.g. before and after a release) can be compared with compare_results.
+
+PHASES = ["parse", "validate", "render", "encode"]
+
+def _get_environment() -> Dict:
+    try:
+        from importlib.metadata import version
+        kksubs_version = version("kksubs")
+    except Exception:
+        kksubs_version = None
+    return {
+        "kksubs": kksubs_version,
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "pillow": PIL.__version__,
+        "numpy": np.__version__,
+        "cpu_count": os.cpu_count(),
+    }
+
+def run_phases(controller:SubtitleController, workers:int=None) -> Dict[str, float]:
+    # seconds spent in each phase of one batch render of the loaded project.
+    subtitle_service = controller.subtitle_service
+    controller.clear_cache()
+    timings = dict()
+
+    start = time.perf_counter()
+    controller.subtitle_model.get_subtitle_groups()
+    timings["parse"] = time.perf_counter() - start
+
+    # drafts are cached by now, so this is validation (and job gathering) only.
+    start = time.perf_counter()
+    render_jobs = subtitle_service.get_render_jobs()
+    timings["validate"] = time.perf_counter() - start
+
+    encode = 0.0
+    start = time.perf_counter()
+    for render_job, image in subtitle_service.iter_render_jobs(render_jobs, workers=workers):
+        encode_start = time.perf_counter()
+        image.save(subtitle_service.get_output_image_path(render_job))
+        encode += time.perf_counter() - encode_start
+    timings["render"] = time.perf_counter() - start - encode
+    timings["encode"] = encode
+    timings["frames"] = len(render_jobs)
+    return timings
+
+def run_benchmark(
+        directory:str=None, frames:int=None, resolution:tuple=None, subtitles_per_frame:int=None,
+        lines_per_subtitle:int=None, profile_count:int=None, drafts:int=None, features:List[str]=None,
+        source_image_directory:str=None, workers:int=None, repeats:int=None
+) -> Dict:
+    # generates a project (in a temporary directory unless one is given) and times each phase;
+    # the best time over the repeats is reported for each phase.
+    if repeats is None:
+        repeats = 3
+    parameters = {
+        "frames": frames, "resolution": list(resolution) if resolution is not None else None,
+        "subtitles_per_frame": subtitles_per_frame, "lines_per_subtitle": lines_per_subtitle,
+        "profile_count": profile_count, "drafts": drafts, "features": features or list(FEATURES.keys()),
+        "workers": workers, "repeats": repeats,
+    }
+    with tempfile.TemporaryDirectory() as temporary_directory:
+        if directory is None:
+            directory = temporary_directory
+        project = create_synthetic_project(
+            directory, source_image_directory=source_image_directory, frames=frames, resolution=resolution,
+            subtitles_per_frame=subtitles_per_frame, lines_per_subtitle=lines_per_subtitle,
+            profile_count=profile_count, drafts=drafts, features=features,
+        )
+        controller = SubtitleController()
+        controller.load_project(project.directory)
+
+        runs = [run_phases(controller, workers=workers) for _ in range(repeats)]
+
+    results = {phase: min(run[phase] for run in runs) for phase in PHASES}
+    results["total"] = sum(results[phase] for phase in PHASES)
+    results["frames"] = runs[0]["frames"]
+    results["frames_per_second"] = results["frames"]/results["total"] if results["total"] > 0 else None
+    return {"parameters": parameters, "environment": _get_environment(), "results": results, "runs": runs}
+
+def compare_results(baseline:Dict, current:Dict) -> Dict[str, float]:
+    # ratio of current to baseline time by phase; below 1 is faster.
+    return {
+        phase: current["results"][phase]/baseline["results"][phase]
+        for phase in PHASES + ["total"] if baseline["results"].get(phase)
+    }
+
+
+def main(argv=None, prog:str=None) -> int:
+    parser = argparse.ArgumentParser(prog=prog, description="Benchmark kksubs on a synthetic project.")
+    parser.add_argument("--frames", type=int, default=12)
+    parser.add_argument("--resolution", type=int, nargs=2, default=None, metavar=("WIDTH", "HEIGHT"))
+    parser.add_argument("--subtitles-per-frame", type=int, default=1)
+    parser.add_argument("--lines-per-subtitle", type=int, default=1)
+    parser.add_argument("--profile-count", type=int, default=None, help="number of profiles, cycling through the features.")
+    parser.add_argument("--drafts", type=int, default=1)
+    parser.add_argument("--features", nargs="*", default=None, choices=list(FEATURES.keys()))
+    parser.add_argument(
+        "--source-image-directory", default=None,
+        help="images to generate frames from (default: examples/sample-images of a source checkout)."
+    )
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--output", default=None, help="write results to this JSON file.")
+    parser.add_argument("--compare", default=None, help="compare with results in this JSON file.")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.WARNING)
+
+    try:
+        get_source_image_directory(args.source_image_directory)
+    except FileNotFoundError as e:
+        print(e, file=sys.stderr)
+        return 2
+    results = run_benchmark(
+        frames=args.frames, resolution=args.resolution, subtitles_per_frame=args.subtitles_per_frame,
+        lines_per_subtitle=args.lines_per_subtitle, profile_count=args.profile_count, drafts=args.drafts,
+        features=args.features, source_image_directory=args.source_image_directory, workers=args.workers,
+        repeats=args.repeats,
+    )
+    if args.output is not None:
+        with open(args.output, "w", encoding="utf-8") as writer:
+            json.dump(results, writer, indent=2)
+    for phase in PHASES + ["total"]:
+        print(f"{phase}\t{results['results'][phase]:.3f}s")
+    if args.compare is not None:
+        with open(args.compare, "r", encoding="utf-8") as reader:
+            baseline = json.load(reader)
+        for phase, ratio in compare_results(baseline, results).items():
+            print(f"{phase}\t{ratio:.2f}x baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
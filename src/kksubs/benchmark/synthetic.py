@@ -0,0 +1,143 @@
+import itertools
+import logging
+import os
+from typing import Dict, List, Tuple
+
+import yaml
+from PIL import Image
+
+from kksubs.model.domain_models import SupportedImageExtensions
+
+logger = logging.getLogger(__name__)
+
+# generates synthetic projects for benchmarks and regression tests from a directory of sample images.
+
+# the sample images of a source checkout, found from the package rather than the working directory.
+# they are not installed with the package, so installed copies need a source image directory.
+DEFAULT_SOURCE_IMAGE_DIRECTORY = os.path.normpath(
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "..", "examples", "sample-images")
+)
+
+# profile data that turns on each rendering feature; profiles cycle through these in order.
+FEATURES:Dict[str, Dict] = {
+    "plain": {},
+    "brightness": {"layer_data": {"brightness": 0.6}},
+    "gaussian_blur": {"layer_data": {"gaussian_blur": 6}},
+    "motion_blur": {"layer_data": {"motion_blur": 15, "motion_rotate": 30}},
+    "radial_blur": {"layer_data": {"radial_blur": 20}},
+    "focus_mask": {"layer_data": {"gaussian_blur": 6, "f_radius": 200, "f_blur": 50}},
+    "outline_blur": {
+        "outline_data_1": {"radius": 5, "blur_strength": 3},
+        "outline_data_2": {"color": "black", "radius": 10, "blur_strength": 6},
+    },
+    "rotate": {"textbox_data": {"rotate": 10}},
+    "orbits": {"orbits": [
+        {"subtitle_profile_id": "orbit_0", "centrix": ["l", "u"], "default_text": "orbit", "font_data": {"size": 30}},
+        {"subtitle_profile_id": "orbit_1", "centrix": ["r", "d"], "default_text": "orbit", "font_data": {"size": 30}},
+    ]},
+}
+
+LOREM_IPSUM = (
+    "Lorem ipsum dolor sit amet, consectetur adipiscing elit, sed do eiusmod tempor incididunt ut labore et dolore magna aliqua."
+)
+
+def get_source_image_directory(source_image_directory:str=None) -> str:
+    if source_image_directory is None:
+        source_image_directory = DEFAULT_SOURCE_IMAGE_DIRECTORY
+    if not os.path.isdir(source_image_directory):
+        raise FileNotFoundError(
+            f"Source image directory {source_image_directory} does not exist: pass a directory of sample images."
+        )
+    return source_image_directory
+
+
+class SyntheticProject:
+
+    def __init__(self, directory:str):
+        """
+        Paths of a generated project, laid out as a standard project directory, so it can be opened with load_project.
+        """
+        self.directory = directory
+        self.input_image_directory = os.path.join(directory, "input_image_directory")
+        self.input_text_directory = os.path.join(directory, "input_text_directory")
+        self.output_directory = os.path.join(directory, "output_directory")
+        self.subtitle_profile_path = os.path.join(directory, "subtitle_profiles.yaml")
+
+
+def get_subtitle_profile_dicts(profile_count:int=None, features:List[str]=None) -> List[Dict]:
+    # profile_0, profile_1, ... cycling through the features.
+    if features is None:
+        features = list(FEATURES.keys())
+    if profile_count is None:
+        profile_count = len(features)
+    subtitle_profile_dicts = [{"subtitle_profile_id": "default", "textbox_data": {"box_width": 60}}]
+    for i, feature in zip(range(profile_count), itertools.cycle(features)):
+        subtitle_profile_dict = {"subtitle_profile_id": f"profile_{i}(default)", **FEATURES[feature]}
+        subtitle_profile_dicts.append(subtitle_profile_dict)
+    return subtitle_profile_dicts
+
+def get_draft(image_ids:List[str], profile_ids:List[str], subtitles_per_frame:int=None, lines_per_subtitle:int=None) -> str:
+    # one subtitle group per image; subtitles use the profiles in turn, through their aliases.
+    if subtitles_per_frame is None:
+        subtitles_per_frame = 1
+    if lines_per_subtitle is None:
+        lines_per_subtitle = 1
+    profile_ids = itertools.cycle(profile_ids)
+    blocks = []
+    for image_id in image_ids:
+        lines = [f"image_id: {image_id}"]
+        for _ in range(subtitles_per_frame):
+            content = [LOREM_IPSUM]*lines_per_subtitle
+            lines.append(f"{next(profile_ids)}: {content[0]}")
+            lines.extend(content[1:])
+            lines.append("")
+        blocks.append("\n".join(lines))
+    return "\n".join(blocks)
+
+def create_synthetic_project(
+        directory:str, source_image_directory:str=None, frames:int=None, resolution:Tuple[int, int]=None,
+        subtitles_per_frame:int=None, lines_per_subtitle:int=None, profile_count:int=None, drafts:int=None,
+        features:List[str]=None
+) -> SyntheticProject:
+    """
+    Creates a project of generated frames, profiles and drafts.
+    :param frames: number of images, cycling through the source images.
+    :param resolution: size of the generated images; the source size by default.
+    :param profile_count: number of profiles, cycling through the features (each LayerData effect, outline blur, rotation, orbits).
+    :param drafts: number of drafts, each subtitling every frame.
+    """
+    source_image_directory = get_source_image_directory(source_image_directory)
+    if frames is None:
+        frames = 12
+    if drafts is None:
+        drafts = 1
+    project = SyntheticProject(directory)
+    for path in [project.input_image_directory, project.input_text_directory, project.output_directory]:
+        os.makedirs(path, exist_ok=True)
+
+    source_images = []
+    for filename in sorted(filter(SupportedImageExtensions.get_is_supported, os.listdir(source_image_directory))):
+        image = Image.open(os.path.join(source_image_directory, filename))
+        if resolution is not None and image.size != tuple(resolution):
+            image = image.resize(tuple(resolution), resample=Image.BICUBIC)
+        source_images.append(image)
+    if not source_images:
+        raise FileNotFoundError(f"Source image directory {source_image_directory} has no images.")
+    image_ids = [f"{i:05d}.png" for i in range(1, frames + 1)]
+    for image_id, image in zip(image_ids, itertools.cycle(source_images)):
+        # fast compression: generating the project is not what is being measured.
+        image.save(os.path.join(project.input_image_directory, image_id), compress_level=1)
+
+    subtitle_profile_dicts = get_subtitle_profile_dicts(profile_count=profile_count, features=features)
+    with open(project.subtitle_profile_path, "w", encoding="utf-8") as writer:
+        yaml.safe_dump(subtitle_profile_dicts, writer, sort_keys=False)
+
+    profile_ids = [subtitle_profile_dict["subtitle_profile_id"].split("(")[0] for subtitle_profile_dict in subtitle_profile_dicts[1:]]
+    for i in range(drafts):
+        with open(os.path.join(project.input_text_directory, f"draft-{i}.txt"), "w", encoding="utf-8") as writer:
+            writer.write(get_draft(
+                image_ids, profile_ids or ["default"], subtitles_per_frame=subtitles_per_frame,
+                lines_per_subtitle=lines_per_subtitle
+            ))
+    logger.info(f"Created synthetic project {directory} with {frames} frames, {len(profile_ids)} profiles and {drafts} drafts.")
+    return project
@@ -0,0 +1,53 @@
+import argparse
+import logging
+import time
+from typing import Dict, List
+
+from PIL import Image
+
+from kksubs.model.frame_transport import PICKLE, SHARED_MEMORY, ProcessRenderer, is_shared_memory_available
+
+logger = logging.getLogger(__name__)
+
+# compares the cost of handing frames to worker processes and back with each frame transport.
+
+def benchmark_transports(
+        size:tuple=None, frames:int=None, processes:int=None, transports:List[str]=None
+) -> Dict[str, float]:
+    # returns the mean round trip time per frame in seconds, by transport.
+    if size is None:
+        size = (3840, 2160)
+    if frames is None:
+        frames = 16
+    if processes is None:
+        processes = 2
+    if transports is None:
+        transports = [PICKLE, SHARED_MEMORY] if is_shared_memory_available() else [PICKLE]
+
+    image = Image.new("RGB", size, color=(128, 64, 32))
+    results = dict()
+    for transport in transports:
+        process_renderer = ProcessRenderer(processes=processes, transport=transport)
+        # includes starting the worker processes, which is the same for each transport.
+        start = time.perf_counter()
+        for _ in process_renderer.iter_echo([image]*frames):
+            pass
+        results[transport] = (time.perf_counter() - start)/frames
+        logger.info(f"{transport}: {results[transport]*1000:.1f} ms per frame.")
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare frame transports for multi-process rendering.")
+    parser.add_argument("--width", type=int, default=3840)
+    parser.add_argument("--height", type=int, default=2160)
+    parser.add_argument("--frames", type=int, default=16)
+    parser.add_argument("--processes", type=int, default=2)
+    args = parser.parse_args(argv)
+    results = benchmark_transports(size=(args.width, args.height), frames=args.frames, processes=args.processes)
+    for transport, seconds in results.items():
+        print(f"{transport}\t{seconds*1000:.1f} ms/frame")
+
+
+if __name__ == "__main__":
+    main()
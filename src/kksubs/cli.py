@@ -0,0 +1,235 @@
+import argparse
+import logging
+import os
+import sys
+import time
+
+logger = logging.getLogger(__name__)
+
+# the kksubs command.
+# each subcommand imports what it needs when it runs, so that e.g. "kksubs validate" does not load the image effects
+# and "kksubs --help" does not load the renderer at all.
+
+def _get_filter_dict(args):
+    # --draft may be repeated; --images selects images by index in each of the drafts.
+    if not args.draft:
+        return None
+    return {text_id: args.images if args.images else "all" for text_id in args.draft}
+
+def _load_controller(args):
+    from kksubs.kksubs import SubtitleController
+
+    controller = SubtitleController()
+    controller.load_project(args.project_directory, default_subtitle_profile_id=args.default_subtitle_profile_id)
+    for kind, name in getattr(args, "engine", None) or []:
+        controller.set_render_engine(kind, name)
+    return controller
+
+def _parse_engine(value:str):
+    # KIND=NAME, e.g. stroke=dilate.
+    kind, separator, name = value.partition("=")
+    if not separator or not kind or not name:
+        raise argparse.ArgumentTypeError(f"Expected KIND=NAME, got {value}.")
+    return kind, name
+
+def _print_stage_timings(stage_count:int=None):
+    from kksubs.model import instrumentation
+
+    if stage_count is None:
+        stage_count = 10
+    report = instrumentation.get_recorder().get_report()
+    print(f"Stage timings over {report['frames']} frames:")
+    stages = sorted(report["stages"].items(), key=lambda item: -item[1]["total"])[:stage_count]
+    for path, stage_report in stages:
+        print(f"  {path:<32}{stage_report['total']:>9.3f}s  p50 {stage_report['p50']*1000:.1f}ms  p90 {stage_report['p90']*1000:.1f}ms")
+
+
+def render(args) -> int:
+    start = time.perf_counter()
+    controller = _load_controller(args)
+    if args.timing:
+        controller.enable_stage_timing()
+    load_seconds = time.perf_counter() - start
+    try:
+        summary = controller.add_subtitles(
+            filter_dict=_get_filter_dict(args), proof_scale=args.proof_scale, workers=args.workers,
+            processes=args.processes, shard=args.shard, shard_method=args.shard_method, resume=args.resume,
+            isolate_failures=args.isolate_failures, layout_format=args.layout, overlay=args.overlay,
+            overlay_effects=args.overlay_effects,
+        )
+        render_seconds = time.perf_counter() - start - load_seconds
+        rendered, skipped, failed = (len(summary[key]) for key in ["rendered", "skipped", "failed"])
+        print(f"Rendered {rendered} frames, skipped {skipped}, failed {failed}.")
+        if args.overlay:
+            print(f"Linked {len(summary['linked'])} frames to identical overlays.")
+            # linked frames are output too, without being rendered again.
+            rendered += len(summary["linked"])
+        for output in summary["failed"]:
+            print(f"  failed: {output}")
+        if args.timing:
+            frames_per_second = rendered/render_seconds if render_seconds > 0 else 0.0
+            print(f"Loaded project in {load_seconds:.3f}s, rendered in {render_seconds:.3f}s ({frames_per_second:.2f} frames/s).")
+            _print_stage_timings()
+    finally:
+        if args.timing:
+            controller.disable_stage_timing()
+    return 1 if failed else 0
+
+def preview(args) -> int:
+    start = time.perf_counter()
+    controller = _load_controller(args)
+    # encoded in the format of the output's extension, without alpha for formats that cannot hold it (e.g. .jpg).
+    from PIL import Image
+    image_format = Image.registered_extensions().get(os.path.splitext(args.output)[1].lower(), "PNG")
+    image_bytes = controller.preview(args.text_id, args.image_id, proof_scale=args.proof_scale, image_format=image_format)
+    with open(args.output, "wb") as writer:
+        writer.write(image_bytes)
+    if args.timing:
+        print(f"Previewed {args.text_id}/{args.image_id} in {time.perf_counter() - start:.3f}s.")
+    return 0
+
+def watch(args) -> int:
+    controller = _load_controller(args)
+    controller.watch(
+        interval=args.interval, proof_scale=args.proof_scale, workers=args.workers, render_on_start=args.render_on_start
+    )
+    return 0
+
+def validate(args) -> int:
+    # parses the drafts and profiles and validates every frame, without rendering.
+    start = time.perf_counter()
+    try:
+        controller = _load_controller(args)
+        render_jobs = controller.subtitle_service.get_render_jobs(filter_dict=_get_filter_dict(args), isolate_failures=True)
+    except Exception as e:
+        print(f"Invalid project: {e!r}")
+        return 1
+    failed_jobs = [render_job for render_job in render_jobs if render_job.error is not None]
+    for render_job in failed_jobs:
+        print(f"{render_job.text_id}: {render_job.image_id}: {render_job.error!r}")
+    print(f"Validated {len(render_jobs)} frames, {len(failed_jobs)} invalid.")
+    if args.timing:
+        print(f"Validated in {time.perf_counter() - start:.3f}s.")
+    return 1 if failed_jobs else 0
+
+def lint(args) -> int:
+    # reports overlapping subtitles, off-frame text and orbit collisions, from the text layout alone.
+    import json
+
+    start = time.perf_counter()
+    controller = _load_controller(args)
+    issues = controller.lint(filter_dict=_get_filter_dict(args), tolerance=args.tolerance)
+    if args.json:
+        print(json.dumps([issue.to_dict() for issue in issues], indent=2))
+    else:
+        for issue in issues:
+            print(issue)
+        print(f"Found {len(issues)} issues.")
+    if args.timing:
+        print(f"Linted in {time.perf_counter() - start:.3f}s.")
+    return 1 if issues else 0
+
+def bench(args) -> int:
+    from kksubs.benchmark.suite import main as bench_main
+    return bench_main(args.arguments, prog="kksubs bench")
+
+def serve(args) -> int:
+    from kksubs.server import main as serve_main
+    return serve_main(args.arguments, prog="kksubs serve")
+
+
+def _add_project_arguments(parser:argparse.ArgumentParser):
+    parser.add_argument("project_directory", help="project directory containing a config file or the standard input/output directories.")
+    parser.add_argument("--default-subtitle-profile-id", default=None)
+
+def _add_engine_argument(parser:argparse.ArgumentParser):
+    parser.add_argument(
+        "--engine", type=_parse_engine, action="append", default=None, metavar="KIND=NAME",
+        help="use a faster, approximate render engine, e.g. stroke=dilate (repeatable).",
+    )
+
+def _add_filter_arguments(parser:argparse.ArgumentParser):
+    parser.add_argument("--draft", action="append", default=None, help="draft to process, e.g. draft.txt (repeatable; all drafts by default).")
+    parser.add_argument("--images", type=int, nargs="+", default=None, help="indices of the images to process in the selected drafts.")
+
+def get_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="kksubs", description="Automate subtitling for KKT stories.")
+    parser.add_argument("-v", "--verbose", action="store_true", help="log progress.")
+    subparsers = parser.add_subparsers(dest="command", metavar="command")
+    subparsers.required = True
+
+    render_parser = subparsers.add_parser("render", help="render subtitles into the output directory.")
+    _add_project_arguments(render_parser)
+    _add_filter_arguments(render_parser)
+    render_parser.add_argument("--proof-scale", type=float, default=None, help="render low-resolution proofs, e.g. 0.25.")
+    render_parser.add_argument("--workers", type=int, default=None, help="frames rendered concurrently in threads.")
+    render_parser.add_argument("--processes", type=int, default=None, help="worker processes rendering frames.")
+    render_parser.add_argument("--shard", default=None, help="render one part of the jobs, as index/count.")
+    render_parser.add_argument("--shard-method", choices=["hash", "cost"], default=None)
+    render_parser.add_argument("--resume", action="store_true", help="skip frames a previous run completed with the same inputs.")
+    render_parser.add_argument("--isolate-failures", action="store_true", help="report failing frames and keep going.")
+    render_parser.add_argument("--timing", action="store_true", help="print a timing summary with the slowest render stages.")
+    render_parser.add_argument("--overlay", action="store_true", help="save transparent PNG overlays of the subtitles instead of frames.")
+    render_parser.add_argument("--overlay-effects", action="store_true", help="include the pixels changed by layer effects in overlays.")
+    render_parser.add_argument(
+        "--layout", choices=["json", "jsonl"], default=None, help="write the subtitle geometry of each draft to a sidecar file."
+    )
+    _add_engine_argument(render_parser)
+    render_parser.set_defaults(handler=render)
+
+    preview_parser = subparsers.add_parser("preview", help="render one frame to a file, outside the output directory.")
+    _add_project_arguments(preview_parser)
+    preview_parser.add_argument("text_id", help="draft, e.g. draft.txt.")
+    preview_parser.add_argument("image_id", help="image, e.g. 1.png.")
+    preview_parser.add_argument("-o", "--output", default="preview.png")
+    preview_parser.add_argument("--proof-scale", type=float, default=None)
+    preview_parser.add_argument("--timing", action="store_true")
+    _add_engine_argument(preview_parser)
+    preview_parser.set_defaults(handler=preview)
+
+    watch_parser = subparsers.add_parser("watch", help="re-render frames affected by changes until interrupted.")
+    _add_project_arguments(watch_parser)
+    watch_parser.add_argument("--interval", type=float, default=None, help="seconds between polls (default 0.5).")
+    watch_parser.add_argument("--proof-scale", type=float, default=None)
+    watch_parser.add_argument("--workers", type=int, default=None)
+    watch_parser.add_argument("--render-on-start", action="store_true")
+    _add_engine_argument(watch_parser)
+    watch_parser.set_defaults(handler=watch)
+
+    validate_parser = subparsers.add_parser("validate", help="check drafts and profiles without rendering.")
+    _add_project_arguments(validate_parser)
+    _add_filter_arguments(validate_parser)
+    validate_parser.add_argument("--timing", action="store_true")
+    validate_parser.set_defaults(handler=validate)
+
+    lint_parser = subparsers.add_parser("lint", help="find overlapping subtitles, off-frame text and orbit collisions without rendering.")
+    _add_project_arguments(lint_parser)
+    _add_filter_arguments(lint_parser)
+    lint_parser.add_argument("--tolerance", type=float, default=None, help="pixels of overlap or overhang to allow.")
+    lint_parser.add_argument("--json", action="store_true", help="print the issues as JSON.")
+    lint_parser.add_argument("--timing", action="store_true")
+    lint_parser.set_defaults(handler=lint)
+
+    # bench and serve take the arguments of kksubs.benchmark.suite and kksubs.server, which are only imported when run.
+    bench_parser = subparsers.add_parser(
+        "bench", add_help=False, help="benchmark rendering on a synthetic project (see kksubs bench --help)."
+    )
+    bench_parser.set_defaults(handler=bench, forwards_arguments=True)
+
+    serve_parser = subparsers.add_parser("serve", add_help=False, help="run a local render server (see kksubs serve --help).")
+    serve_parser.set_defaults(handler=serve, forwards_arguments=True)
+    return parser
+
+
+def main(argv=None) -> int:
+    parser = get_parser()
+    args, arguments = parser.parse_known_args(argv)
+    if arguments and not getattr(args, "forwards_arguments", False):
+        parser.error(f"unrecognized arguments: {' '.join(arguments)}")
+    args.arguments = arguments
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
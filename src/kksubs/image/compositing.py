@@ -0,0 +1,134 @@
+import math
+from typing import List, Optional, Tuple
+
+import numpy as np
+from PIL import Image, ImageFilter
+
+# composites the layers of a subtitle onto an RGB or RGBA frame in one pass: the union of the layers' regions is read
+# from the frame once, every layer is blended into it with numpy, and it is written back once.
+# the arithmetic is Pillow's, so the result is the same as pasting each layer onto the whole frame in turn:
+# RGBA layers are blended by their alpha; RGBa layers are added to the frame scaled by one minus their alpha, wrapping
+# around past 255 as Pillow's paste does with the colors ImageDraw leaves in RGBa layers. onto RGBA frames, every
+# channel is blended, and RGBa layers are converted to RGBA first.
+
+# pixels are blended as uint16, which holds 255*255 + 255 without overflowing.
+
+def _div255(values:np.ndarray) -> np.ndarray:
+    # values/255, rounded as Pillow rounds.
+    values = values + 128
+    return ((values >> 8) + values) >> 8
+
+def _muldiv255(values:np.ndarray, factors:np.ndarray) -> np.ndarray:
+    return _div255(values*factors)
+
+def _blend_straight(frame:np.ndarray, colors:np.ndarray, alpha:np.ndarray) -> np.ndarray:
+    return _div255(frame*(255 - alpha) + colors*alpha)
+
+def _blend_premultiplied(frame:np.ndarray, colors:np.ndarray, alpha:np.ndarray) -> np.ndarray:
+    return (_muldiv255(frame, 255 - alpha) + colors) & 255
+
+def get_blur_extent(blur_strength:float) -> int:
+    # pixels past which a gaussian blur of the given radius has no effect (Pillow blurs with three box blurs).
+    return 3*(math.ceil(blur_strength) + 1) + 1
+
+def get_visible_box(image:Image.Image) -> Optional[Tuple[int, int, int, int]]:
+    # box of the pixels an RGBA or RGBa layer changes, or None. an RGBA layer shows only where its alpha is nonzero; an
+    # RGBa layer may hold colors where its alpha is zero, which are added to the frame. getbbox of single bands behaves
+    # the same on every Pillow version, where getbbox of an RGBa image looks only at alpha since Pillow 10.
+    if image.mode != "RGBa":
+        return image.getchannel("A").getbbox()
+    boxes = [box for box in (band.getbbox() for band in image.split()) if box is not None]
+    if not boxes:
+        return None
+    return min(box[0] for box in boxes), min(box[1] for box in boxes), max(box[2] for box in boxes), max(box[3] for box in boxes)
+
+
+class CompositeLayer:
+
+    def __init__(
+            self, image:Image.Image, position:Tuple[int, int]=None, box:Tuple[int, int, int, int]=None,
+            opacity:float=None, blur_strength:float=None
+    ):
+        """
+        A layer to composite onto a frame.
+        :param image: RGBA or RGBa layer, with its corner at position ((0, 0) by default) on the frame.
+        :param box: region of the layer holding all of its visible pixels, in layer coordinates; found if not given.
+        :param opacity: scales the alpha of an RGBA layer, or every channel of an RGBa layer.
+        :param blur_strength: blurs the layer, and the frame under it, as for blurred outlines.
+        """
+        if position is None:
+            position = (0, 0)
+        if box is None:
+            box = get_visible_box(image)
+        self.image = image
+        self.position = position
+        self.box = box
+        self.opacity = opacity
+        self.blur_strength = blur_strength
+
+    def get_region(self, image_size:Tuple[int, int]) -> Optional[Tuple[int, int, int, int]]:
+        # region of the frame the layer changes, or None.
+        if self.box is None:
+            return None
+        padding = 2*get_blur_extent(self.blur_strength) if self.blur_strength else 0
+        x, y = self.position
+        left, top = max(0, x + self.box[0] - padding), max(0, y + self.box[1] - padding)
+        right, bottom = min(image_size[0], x + self.box[2] + padding), min(image_size[1], y + self.box[3] + padding)
+        if right <= left or bottom <= top:
+            return None
+        return left, top, right, bottom
+
+    def get_pixels(self, region:Tuple[int, int, int, int], mode:str) -> np.ndarray:
+        # the layer over a region of a frame of the given mode, transparent where the layer does not reach.
+        x, y = self.position
+        layer = self.image.crop((region[0] - x, region[1] - y, region[2] - x, region[3] - y))
+        if self.opacity is not None and self.opacity != 1:
+            pixels = np.asarray(layer, dtype=np.uint16)
+            opacity = np.uint16(round(self.opacity*255))
+            if layer.mode == "RGBa":
+                pixels = _muldiv255(pixels, opacity)
+            else:
+                pixels[:, :, 3] = _muldiv255(pixels[:, :, 3], opacity)
+            layer = Image.frombytes(layer.mode, layer.size, pixels.astype(np.uint8).tobytes())
+        if layer.mode == "RGBa" and mode == "RGBA":
+            layer = layer.convert("RGBA")
+        return np.asarray(layer, dtype=np.uint16)
+
+
+def _blend_blurred(frame:np.ndarray, pixels:np.ndarray, blur_strength:float) -> np.ndarray:
+    # the frame with the layer over it is blurred, and blended back through the blurred alpha of the layer.
+    blur = ImageFilter.GaussianBlur(radius=blur_strength)
+    alpha = pixels[:, :, 3:]
+    over_frame = _blend_premultiplied(frame, pixels[:, :, :frame.shape[2]], alpha)
+    over_frame = np.asarray(Image.fromarray(over_frame.astype(np.uint8)).filter(blur), dtype=np.uint16)
+    alpha = np.asarray(Image.fromarray(alpha[:, :, 0].astype(np.uint8)).filter(blur), dtype=np.uint16)
+    return _blend_straight(frame, over_frame, alpha[:, :, None])
+
+def composite_layers(image:Image.Image, layers:List[CompositeLayer]) -> Image.Image:
+    """
+    Composites layers onto an RGB or RGBA frame in order, in place.
+    Layers with a blur strength are RGBa, as the outline layers are.
+    """
+    regions = [(layer, layer.get_region(image.size)) for layer in layers]
+    regions = [(layer, region) for layer, region in regions if region is not None]
+    if not regions:
+        return image
+    union = (
+        min(region[0] for _, region in regions), min(region[1] for _, region in regions),
+        max(region[2] for _, region in regions), max(region[3] for _, region in regions),
+    )
+    frame = np.asarray(image.crop(union), dtype=np.uint16)
+    for layer, region in regions:
+        # each layer is blended over its own part of the union.
+        left, top, right, bottom = region[0] - union[0], region[1] - union[1], region[2] - union[0], region[3] - union[1]
+        pixels = layer.get_pixels(region, image.mode)
+        colors, alpha = pixels[:, :, :frame.shape[2]], pixels[:, :, 3:]
+        if layer.blur_strength:
+            blended = _blend_blurred(frame[top:bottom, left:right], pixels, layer.blur_strength)
+        elif layer.image.mode == "RGBa":
+            blended = _blend_premultiplied(frame[top:bottom, left:right], colors, alpha)
+        else:
+            blended = _blend_straight(frame[top:bottom, left:right], colors, alpha)
+        frame[top:bottom, left:right] = blended
+    image.paste(Image.fromarray(frame.astype(np.uint8)), union[:2])
+    return image
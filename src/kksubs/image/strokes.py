@@ -0,0 +1,106 @@
+from typing import List, Optional, Tuple
+
+import cv2
+import numpy as np
+from PIL import Image, ImageColor, ImageDraw, ImageFont
+
+# strokes and outlines from a single rasterization of each line: the glyph mask is dilated by each radius using its
+# distance transform, instead of FreeType stroking the glyphs again for every radius.
+# strokes come out round at every corner, where FreeType may miter them, so the result is close to but not exactly
+# what ImageDraw.text draws with a stroke width.
+
+# distance from the center of the nearest glyph pixel to the edge of a stroke, beyond its radius;
+# one pixel matches FreeType strokes best.
+EDGE_OFFSET = 1.0
+
+def get_dilated_mask(glyph_mask:np.ndarray, distances:np.ndarray, radius:int=None) -> np.ndarray:
+    # coverage of the glyphs dilated by radius, antialiased over one pixel.
+    if not radius:
+        return glyph_mask
+    stroke_mask = np.clip((radius + EDGE_OFFSET - distances)*255, 0, 255).astype(np.uint8)
+    return np.maximum(glyph_mask, stroke_mask)
+
+def _get_colored(color, alpha:np.ndarray) -> Image.Image:
+    # color with the given coverage, scaled by the color's own alpha; uncovered pixels are left (0, 0, 0, 0),
+    # as ImageDraw leaves them, so that blurring a layer does not spread the color.
+    color = ImageColor.getcolor(color, "RGBA") if isinstance(color, str) else tuple(color)
+    if len(color) == 4 and color[3] < 255:
+        alpha = ((alpha.astype(np.uint16)*color[3] + 127)//255).astype(np.uint8)
+    pixels = np.zeros(alpha.shape + (4,), dtype=np.uint8)
+    pixels[alpha > 0, :3] = color[:3]
+    pixels[:, :, 3] = alpha
+    return Image.fromarray(pixels)
+
+def get_frame_layer(image_size:Tuple[int, int], layer:Image.Image, position:Tuple[int, int]) -> Image.Image:
+    # a transparent layer of the image's size with layer pasted at position, which may be partly or wholly outside it.
+    frame_layer = Image.new(layer.mode, image_size, (0, 0, 0, 0))
+    frame_layer.paste(layer, position)
+    return frame_layer
+
+def draw_local_text_layers(
+        lines:List[Tuple[str, float, float]], font:ImageFont.FreeTypeFont, fill, stroke_size:int=None, stroke_fill=None,
+        outlines:List[Optional[Tuple[int, object]]]=None
+) -> Tuple[Tuple[int, int], Image.Image, List[Optional[Image.Image]]]:
+    """
+    Draws lines of text with a stroke and outlines, as ImageDraw.text does with stroke widths, into layers that cover
+    only the text and its widest stroke.
+    All lines are rasterized into one mask, so the fill of every line is drawn over the strokes of every line.
+    :param lines: text and position of each line on the image.
+    :param outlines: (radius, color) of each outline, or None where there is no outline.
+    :return: the position of the layers on the image, the text layer (RGBA), and a layer for each outline (RGBa,
+    holding colors as ImageDraw leaves them) or None. the layers are empty at (0, 0) if no line has any ink.
+    """
+    if outlines is None:
+        outlines = []
+    radii = [stroke_size or 0] + [outline[0] or 0 for outline in outlines if outline is not None]
+    padding = max(radii) + 2
+
+    # bounds of the lines on the image, with room for the widest stroke.
+    boxes = []
+    for text, x, y in lines:
+        left, top, right, bottom = font.getbbox(text)
+        if right > left and bottom > top:
+            boxes.append((int(np.floor(x)) + left, int(np.floor(y)) + top, int(np.ceil(x)) + right, int(np.ceil(y)) + bottom))
+    if not boxes:
+        return (0, 0), Image.new("RGBA", (0, 0)), [None if outline is None else Image.new("RGBa", (0, 0)) for outline in outlines]
+    origin_x, origin_y = min(box[0] for box in boxes) - padding, min(box[1] for box in boxes) - padding
+    width, height = max(box[2] for box in boxes) + padding - origin_x, max(box[3] for box in boxes) + padding - origin_y
+
+    # the fractional part of each position is kept when rasterizing.
+    mask_image = Image.new("L", (width, height), 0)
+    mask_draw = ImageDraw.Draw(mask_image)
+    for text, x, y in lines:
+        mask_draw.text((x - origin_x, y - origin_y), text, font=font, fill=255)
+    glyph_mask = np.asarray(mask_image)
+    distances = cv2.distanceTransform((glyph_mask < 128).astype(np.uint8), cv2.DIST_L2, cv2.DIST_MASK_PRECISE)
+
+    outline_layers = []
+    for outline in outlines:
+        if outline is None:
+            outline_layers.append(None)
+            continue
+        radius, color = outline
+        # the same bytes, as ImageDraw leaves them in an RGBa layer.
+        outline_layers.append(Image.merge("RGBa", _get_colored(color, get_dilated_mask(glyph_mask, distances, radius)).split()))
+    text_layer = _get_colored(fill, glyph_mask)
+    if stroke_size:
+        if stroke_fill is None:
+            stroke_fill = fill
+        # the fill is drawn over the stroke.
+        text_layer = Image.alpha_composite(_get_colored(stroke_fill, get_dilated_mask(glyph_mask, distances, stroke_size)), text_layer)
+    return (origin_x, origin_y), text_layer, outline_layers
+
+def draw_text_layers(
+        image_size:Tuple[int, int], lines:List[Tuple[str, float, float]], font:ImageFont.FreeTypeFont, fill,
+        stroke_size:int=None, stroke_fill=None, outlines:List[Optional[Tuple[int, object]]]=None
+) -> Tuple[Image.Image, List[Optional[Image.Image]]]:
+    """
+    Draws text as draw_local_text_layers does, into layers of the image's size, for pasting and rotating whole layers.
+    :return: the text layer (RGBA), and a layer for each outline (RGBa) or None.
+    """
+    position, text_layer, outline_layers = draw_local_text_layers(
+        lines, font, fill, stroke_size=stroke_size, stroke_fill=stroke_fill, outlines=outlines
+    )
+    return get_frame_layer(image_size, text_layer, position), [
+        None if outline_layer is None else get_frame_layer(image_size, outline_layer, position) for outline_layer in outline_layers
+    ]
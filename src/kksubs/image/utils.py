@@ -1,14 +1,50 @@
+from typing import Tuple
+
 from PIL import Image, ImageEnhance, ImageFilter, ImageDraw
-import cv2
-import numpy as np
+
+# cv2 and numpy are imported where they are used, so that importing kksubs does not load them
+# until an effect needs them.
 
 def cv2_to_pil(cv2_image):
+    import cv2
     return Image.fromarray(cv2.cvtColor(cv2.convertScaleAbs(cv2_image), cv2.COLOR_BGRA2RGBA))
     # return Image.fromarray(cv2.cvtColor(cv2.convertScaleAbs(cv2_image), cv2.COLOR_BGRA2RGBA))
 def pil_to_cv2(pil_image):
+    import cv2
+    import numpy as np
     # return cv2.cvtColor(np.array(pil_image), cv2.COLOR_BGRA2RGBA)
     return cv2.cvtColor(np.array(pil_image), cv2.COLOR_BGRA2RGB)
 
+def load_image(image_path, scale:float=None) -> Image.Image:
+    # decodes an image, optionally at a reduced scale.
+    # JPEG images are decoded directly at a reduced size via draft mode; other formats are reduced after decoding.
+    # the file is closed before returning, so that it is not held open (and locked, on windows) until collected.
+    with Image.open(image_path) as image:
+        if scale is None or scale == 1:
+            return image.copy()
+
+        size = get_scaled_size(image.size, scale)
+        image.draft(image.mode, size)
+        scaled = scale_image(image, scale, size=size)
+        if scaled is image:
+            scaled = image.copy()
+        scaled.load()
+        return scaled
+
+def get_scaled_size(size:tuple, scale:float) -> tuple:
+    return (max(1, int(round(size[0]*scale))), max(1, int(round(size[1]*scale))))
+
+def scale_image(image:Image.Image, scale:float, size:tuple=None) -> Image.Image:
+    # scales an image down, using a fast integer reduction where possible.
+    if size is None:
+        size = get_scaled_size(image.size, scale)
+    factor = min(image.size[0]//size[0], image.size[1]//size[1])
+    if factor > 1:
+        image = image.reduce(factor)
+    if image.size != size:
+        image = image.resize(size)
+    return image
+
 def in_cv2_environment(fn):
     # creates a cv2 environment for a cv2-valued function.
     def decorated_fn(image, *args, **kwargs):
@@ -39,8 +75,10 @@ def circular_filter_rejection(fn):
     
     return filter_fn
 
-def apply_image(image:Image.Image, applying_image:Image.Image, displacement:tuple=None, scale:float=None, rotate:int=None) -> Image.Image:
-
+def get_image_placement(
+        image_size:Tuple[int, int], applying_image:Image.Image, displacement:tuple=None, scale:float=None, rotate:int=None
+) -> Tuple[Image.Image, Tuple[int, int]]:
+    # the scaled and rotated applying image, and the position of its corner when centered on the image and displaced.
     if displacement is None:
         displacement = (0, 0)
     if scale is not None:
@@ -50,11 +88,24 @@ def apply_image(image:Image.Image, applying_image:Image.Image, displacement:tupl
     if rotate is not None:
         applying_image = applying_image.rotate(rotate)
 
-    image_width, image_height = image.size
-    new_image_width, new_image_height = new_image_size
+    image_width, image_height = image_size
+    new_image_width, new_image_height = applying_image.size
     
     x = image_width//2-new_image_width//2+displacement[0]
     y = image_height//2-new_image_height//2-displacement[1]
+    return applying_image, (x, y)
 
+def apply_image(
+        image:Image.Image, applying_image:Image.Image, displacement:tuple=None, scale:float=None, rotate:int=None,
+        is_overlay:bool=False
+) -> Image.Image:
+    # is_overlay: image is a transparent RGBA overlay, which the applying image is alpha composited onto.
+    applying_image, (x, y) = get_image_placement(image.size, applying_image, displacement=displacement, scale=scale, rotate=rotate)
+
+    if is_overlay:
+        layer = Image.new("RGBA", image.size, (0, 0, 0, 0))
+        layer.paste(applying_image.convert("RGBA"), (x, y))
+        image.alpha_composite(layer)
+        return image
     image.paste(applying_image, (x, y), applying_image)
-    return image
\ No newline at end of file
+    return image
@@ -1,12 +1,17 @@
 import json
 import logging
 import os
+import time
 from typing import List
 
 import yaml
 
+from kksubs.model import engines, instrumentation
+from kksubs.model.cache_services import DEFAULT_CACHE_DIRECTORY, BackgroundCache, FrameCache
 from kksubs.model.data_access_services import SubtitleDataAccessService
+from kksubs.model.diagnostics import DEFAULT_DIAGNOSTICS_DIRECTORY, FrameProfiler
 from kksubs.model.subtitle_services import SubtitleService
+from kksubs.model.watch_services import ProjectWatcher
 
 logger = logging.getLogger(__name__)
 
@@ -237,15 +242,164 @@ class SubtitleController:
         input_text_ids = [os.path.basename(path) for path in self.subtitle_model.get_textpaths()]
         return input_text_ids
 
-    def add_subtitles_by_text_id(self, text_id=None, filter_list=None):
+    def add_subtitles_by_text_id(self, text_id=None, filter_list=None, proof_scale=None):
         if text_id is not None:
             if filter_list is None:
                 filter_list = "all"
-            self.add_subtitles(filter_dict={text_id: filter_list})
+            self.add_subtitles(filter_dict={text_id: filter_list}, proof_scale=proof_scale)
         else:
-            self.add_subtitles()
-
-    def add_subtitles(self, filter_dict=None):
-        self.subtitle_service.add_subtitles(filter_dict=filter_dict)
+            self.add_subtitles(proof_scale=proof_scale)
+
+    def preview(self, text_id, image_id, proof_scale=None, image_format=None):
+        # renders one frame in memory without writing to the output directory.
+        # parsed drafts, profiles, fonts and decoded images are kept warm between calls, so repeated previews are fast.
+        # returns a PIL image, or encoded bytes if image_format (e.g. "PNG") is given; formats without alpha (e.g. "JPEG")
+        # get the frame without it. a warm 1080p frame renders in well under 100ms, but PNG encoding takes about 200ms more,
+        # so use JPEG where encoded previews must be fast.
+        return self.subtitle_service.preview(text_id, image_id, proof_scale=proof_scale, image_format=image_format)
+
+    def get_layouts(self, filter_dict=None):
+        # line positions, text boxes and rotations of every frame, computed without rasterizing.
+        # returns TextLayout lists by output key ("<draft name>/<image_id>"); use to_dict() for JSON.
+        return self.subtitle_service.get_layouts(filter_dict=filter_dict)
+
+    def lint(self, filter_dict=None, tolerance=None):
+        # finds overlapping subtitles, text running off the frame and orbit collisions, without rendering.
+        # returns LintIssue objects with the draft line of each subtitle (text drafts only); tolerance is in pixels.
+        return self.subtitle_service.lint(filter_dict=filter_dict, tolerance=tolerance)
+
+    def watch(self, interval=None, proof_scale=None, workers=None, render_on_start=None, max_polls=None):
+        # polls the drafts, images, subtitle profiles and referenced fonts/assets for changes,
+        # and re-renders only the output frames affected by each change. Stop with Ctrl+C.
+        if interval is None:
+            interval = 0.5
+        if render_on_start is None:
+            render_on_start = False
+
+        # frames that fail to render are logged and skipped, so that one bad frame does not stop watching.
+        watcher = ProjectWatcher(self.subtitle_model)
+        render_jobs = watcher.poll()
+        if render_on_start:
+            self.subtitle_service.save_render_jobs(render_jobs, proof_scale=proof_scale, workers=workers, isolate_failures=True)
+        logger.info(f"Watching for changes every {interval} seconds.")
+
+        polls = 0
+        last_error = None
+        try:
+            while max_polls is None or polls < max_polls:
+                time.sleep(interval)
+                polls += 1
+                try:
+                    render_jobs = watcher.poll()
+                except Exception as e:
+                    # drafts are often briefly invalid while being edited; the changes are picked up again by the
+                    # next poll, so the same error is only logged once.
+                    if repr(e) != last_error:
+                        logger.warning(f"Could not process changes: {e!r}")
+                    last_error = repr(e)
+                    continue
+                last_error = None
+                if render_jobs:
+                    logger.info(f"Re-rendering {len(render_jobs)} changed frames.")
+                    self.subtitle_service.save_render_jobs(render_jobs, proof_scale=proof_scale, workers=workers, isolate_failures=True)
+        except KeyboardInterrupt:
+            logger.info("Stopped watching.")
+
+    def clear_cache(self):
+        self.subtitle_model.clear_cache()
+        self.subtitle_service.clear_cache()
+
+    def enable_background_cache(self, directory=None, max_size=None):
+        # stores backgrounds processed with layer data (brightness, blurs, focus masks) on disk,
+        # so re-renders after text-only edits skip the effects. max_size is in bytes.
+        if directory is None:
+            directory = os.path.join(DEFAULT_CACHE_DIRECTORY, "backgrounds")
+        logger.info(f"Using background cache {directory}.")
+        self.subtitle_service.background_cache = BackgroundCache(directory=directory, max_size=max_size)
+
+    def clear_background_cache(self):
+        if self.subtitle_service.background_cache is not None:
+            self.subtitle_service.background_cache.clear()
+
+    def set_render_engine(self, kind, name=None):
+        # selects the engine rendering one kind of work, e.g. ("stroke", "dilate"); name None restores the reference engine.
+        # the selection applies to the whole process and is passed on to worker processes.
+        engines.set_engine(kind, name)
+
+    def enable_stage_timing(self):
+        # records the time spent in each render stage (decode, layer effects, text layout, rasterization, ...) by frame.
+        # stages run in worker processes are not recorded.
+        return instrumentation.enable_recorder()
+
+    def disable_stage_timing(self):
+        instrumentation.disable_recorder()
+
+    def write_stage_timing_report(self, path, slowest_frame_count=None):
+        # writes totals, percentiles and the slowest frames by stage to a JSON file.
+        recorder = instrumentation.get_recorder()
+        if recorder is None:
+            raise ValueError("Stage timing is not enabled.")
+        return recorder.write_report(path, slowest_frame_count=slowest_frame_count)
+
+    def enable_frame_profiling(self, frames=None, sample_rate=None, directory=None, top_allocations=None):
+        # runs the given frames ("<draft name>/<image_id>" or image IDs), or a sampled fraction of all frames,
+        # under cProfile and tracemalloc, writing .prof files, the layers each render stage allocated, the allocation sites
+        # that grew most and the growth of the RSS to the diagnostics directory.
+        # profiled frames render alone; frames rendered in worker processes are not profiled.
+        if directory is None:
+            directory = DEFAULT_DIAGNOSTICS_DIRECTORY
+        logger.info(f"Profiling frames into {directory}.")
+        self.subtitle_service.frame_profiler = FrameProfiler(
+            directory=directory, frames=frames, sample_rate=sample_rate, top_allocations=top_allocations
+        )
+
+    def disable_frame_profiling(self):
+        self.subtitle_service.frame_profiler = None
+
+    def enable_frame_cache(self, directory=None, max_size=None):
+        # stores decoded source images as memory-mapped arrays on disk,
+        # so later runs, previews and workers skip decoding. max_size is in bytes.
+        if directory is None:
+            directory = os.path.join(DEFAULT_CACHE_DIRECTORY, "frames")
+        logger.info(f"Using frame cache {directory}.")
+        self.subtitle_service.frame_cache = FrameCache(directory=directory, max_size=max_size)
+
+    def clear_frame_cache(self):
+        if self.subtitle_service.frame_cache is not None:
+            self.subtitle_service.frame_cache.clear()
+
+    def iter_subtitles(self, filter_dict=None, proof_scale=None, workers=None, processes=None):
+        # yields (text_id, image_id, image) for each rendered frame in order, without touching the output directory.
+        return self.subtitle_service.iter_subtitles(
+            filter_dict=filter_dict, proof_scale=proof_scale, workers=workers, processes=processes
+        )
+
+    def add_subtitles(
+            self, filter_dict=None, proof_scale=None, workers=None, processes=None, shard=None, shard_method=None,
+            resume=False, isolate_failures=False, layout_format=None, overlay=False, overlay_effects=False
+    ):
+        # proof_scale: render low-resolution proofs (e.g. 0.25) with all geometry scaled proportionally.
+        # workers: number of frames rendered concurrently in threads.
+        # processes: number of worker processes rendering frames, with images handed over in shared memory.
+        # shard: (index, count) or "index/count", to render one disjoint part of the jobs on each of several nodes.
+        # shard_method: "hash" (default, stable as jobs change) or "cost" (balanced by estimated render cost).
+        # resume: journal finished frames in the output directory, and skip frames an earlier run completed with the same inputs.
+        # isolate_failures: report frames that fail validation or rendering and keep going, instead of aborting the batch.
+        # layout_format: "json" or "jsonl", to write the subtitle geometry of each rendered frame to
+        # output_directory/<draft name>.layout.<format>, for re-compositing without rendering again.
+        # overlay: save transparent PNG overlays of the text, outlines and assets instead of frames, without decoding the frames.
+        # identical overlays are saved once and hard linked for later frames.
+        # overlay_effects: also include the pixels changed by layer effects in the overlays, which needs the frames.
+        # returns a summary with the rendered, skipped and failed outputs.
+        return self.subtitle_service.add_subtitles(
+            filter_dict=filter_dict, proof_scale=proof_scale, workers=workers, processes=processes,
+            shard=shard, shard_method=shard_method, resume=resume, isolate_failures=isolate_failures,
+            layout_format=layout_format, overlay=overlay, overlay_effects=overlay_effects
+        )
+
+    def verify_shards(self, filter_dict=None, shard_count=None, overlay=False):
+        # after all shards finish, checks that every expected output exists and was written by exactly one shard.
+        # pass overlay if the shards saved overlays.
+        return self.subtitle_service.verify_shards(filter_dict=filter_dict, shard_count=shard_count, overlay=overlay)
 
     pass
@@ -0,0 +1,175 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from typing import Optional
+
+from PIL import Image
+
+from kksubs.model.domain_models import LayerData
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIRECTORY = ".kksubs-cache"
+
+def _to_normalized(value):
+    # converts domain objects into JSON-serializable data with a stable representation.
+    if isinstance(value, dict):
+        return {str(key): _to_normalized(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_to_normalized(item) for item in value]
+    if hasattr(value, "__dict__"):
+        return {"__type__": type(value).__name__, **_to_normalized(vars(value))}
+    return value
+
+def get_digest(*values) -> str:
+    # content hash of domain objects and plain data.
+    serialized = json.dumps(_to_normalized(values), sort_keys=True, default=str)
+    return hashlib.sha1(serialized.encode("utf-8")).hexdigest()
+
+def get_image_digest(image:Image.Image) -> str:
+    digest = hashlib.sha1(f"{image.mode}:{image.size}:".encode("utf-8"))
+    digest.update(image.tobytes())
+    return digest.hexdigest()
+
+def _write_atomic(path:str, write_fn):
+    # writes through a temporary file so concurrent readers never see partial files.
+    directory = os.path.dirname(path)
+    file_descriptor, temporary_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(file_descriptor, "wb") as writer:
+            write_fn(writer)
+        os.replace(temporary_path, path)
+    except BaseException:
+        if os.path.exists(temporary_path):
+            os.remove(temporary_path)
+        raise
+
+class FileCache:
+
+    def __init__(self, directory:str=None, max_size:int=None):
+        """
+        A content-addressed directory of cache files, limited in size by evicting the least recently used files.
+        :param max_size: maximum total size in bytes.
+        """
+        if directory is None:
+            directory = DEFAULT_CACHE_DIRECTORY
+        if max_size is None:
+            max_size = 1024**3
+        self.directory = directory
+        self.max_size = max_size
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._size = sum(os.path.getsize(path) for path in self._get_paths())
+
+    def _get_paths(self):
+        return [
+            os.path.join(self.directory, filename) for filename in os.listdir(self.directory)
+            if not filename.endswith(".tmp") and os.path.isfile(os.path.join(self.directory, filename))
+        ]
+
+    def _get_path(self, key:str, extension:str) -> str:
+        return os.path.join(self.directory, f"{key}{extension}")
+
+    def _touch(self, path:str):
+        # file modification times record recency of use.
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+    def _add_size(self, size:int):
+        with self._lock:
+            self._size += size
+            if self._size <= self.max_size:
+                return
+            # evict down to 90% of the cap, so eviction does not run on every write.
+            paths = sorted(self._get_paths(), key=lambda path: os.path.getmtime(path))
+            self._size = sum(os.path.getsize(path) for path in paths)
+            for path in paths:
+                if self._size <= self.max_size*0.9:
+                    break
+                size = os.path.getsize(path)
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                self._size -= size
+                logger.debug(f"Evicted cache file {path}.")
+
+    def get_size(self) -> int:
+        return self._size
+
+    def clear(self):
+        with self._lock:
+            for path in self._get_paths():
+                os.remove(path)
+            self._size = 0
+        logger.info(f"Cleared cache {self.directory}.")
+
+
+class BackgroundCache(FileCache):
+    # processed backgrounds, keyed by the source image and the layer data applied to it.
+    # files hold a JSON header line with the image mode and size, followed by the raw pixel data.
+
+    extension = ".raw"
+
+    def get_key(self, image:Image.Image, layer_data:LayerData) -> str:
+        return get_digest(get_image_digest(image), layer_data)
+
+    def get(self, key:str) -> Optional[Image.Image]:
+        path = self._get_path(key, self.extension)
+        try:
+            with open(path, "rb") as reader:
+                header = json.loads(reader.readline())
+                data = reader.read()
+        except (OSError, ValueError):
+            return None
+        self._touch(path)
+        return Image.frombytes(header["mode"], tuple(header["size"]), data)
+
+    def put(self, key:str, image:Image.Image):
+        path = self._get_path(key, self.extension)
+        header = json.dumps({"mode": image.mode, "size": list(image.size)}).encode("utf-8") + b"\n"
+        data = image.tobytes()
+        _write_atomic(path, lambda writer: (writer.write(header), writer.write(data)))
+        self._add_size(len(header) + len(data))
+
+
+class FrameCache(FileCache):
+    # decoded source images, stored as .npy pixel arrays and memory-mapped on load,
+    # so repeated runs and worker processes share decoded pixels through the page cache instead of decoding again.
+    # the file name is a hash of the image path, modification time and size, so edited images are decoded again.
+
+    extension = ".npy"
+    supported_modes = {"L", "LA", "RGB", "RGBA"}
+
+    def get_key(self, image_path:str) -> str:
+        stat = os.stat(image_path)
+        return get_digest(os.path.abspath(image_path), stat.st_mtime_ns, stat.st_size)
+
+    def load(self, image_path:str) -> Image.Image:
+        # returns the decoded image, decoding and storing it on a cache miss.
+        # numpy is only needed once the frame cache is used.
+        import numpy as np
+        key = self.get_key(image_path)
+        path = self._get_path(key, self.extension)
+        try:
+            array = np.load(path, mmap_mode="r")
+        except (OSError, ValueError):
+            array = None
+        if array is not None:
+            self._touch(path)
+            # the image may share the read-only mapping; PIL copies it before the first modification.
+            return Image.fromarray(array)
+
+        image = Image.open(image_path)
+        image.load()
+        if image.mode not in self.supported_modes:
+            return image
+        array = np.asarray(image)
+        _write_atomic(path, lambda writer: np.save(writer, array))
+        self._add_size(os.path.getsize(path))
+        return image
@@ -95,6 +95,7 @@ def _get_subtitle_profile_from_dict(subtitle_profile_dict:Dict, subtitle_profile
         asset_data.coords = asset_data_dict.get("coords")
         asset_data.scale = asset_data_dict.get("scale")
         asset_data.rotate = asset_data_dict.get("rotate")
+        asset_data.correct_values()
         subtitle_profile.asset_data = asset_data
 
     if default_text_key in keys:
@@ -132,11 +133,24 @@ def _get_subtitle_profile_from_dict(subtitle_profile_dict:Dict, subtitle_profile
     return subtitle_profile
 
 
-def _inject_subtitle_profile_data(subtitle:Subtitle, subtitle_profiles:Optional[Dict[str, SubtitleProfile]]=None, default_profile_id:Optional[str]=None):
+def _has_local_profile_data(subtitle_profile:SubtitleProfile) -> bool:
+    return any(value is not None for value in vars(subtitle_profile).values())
+
+def _inject_subtitle_profile_data(
+        subtitle:Subtitle, subtitle_profiles:Optional[Dict[str, SubtitleProfile]]=None, default_profile_id:Optional[str]=None,
+        resolved_profiles:Dict[Optional[str], SubtitleProfile]=None
+):
     # assume subtitle has local profile information.
     if subtitle.subtitle_profile is None:
         subtitle.subtitle_profile = SubtitleProfile()
 
+    # subtitles without local profile data resolve to the same profile for the same profile ID,
+    # so they share the first one resolved (resolved_profiles, by profile ID).
+    is_shared = resolved_profiles is not None and not _has_local_profile_data(subtitle.subtitle_profile)
+    if is_shared and subtitle.subtitle_profile_id in resolved_profiles:
+        subtitle.subtitle_profile = resolved_profiles[subtitle.subtitle_profile_id]
+        return
+
     # check if default profile ID exists --> get default profile.
     # else, use global subtitle profile.
 
@@ -159,6 +173,8 @@ def _inject_subtitle_profile_data(subtitle:Subtitle, subtitle_profiles:Optional[
         else:
             logger.warning(f"The subtitle profile with ID {subtitle.subtitle_profile_id} is not found: Using global default.")
             subtitle_profile = SubtitleProfile()
+            # warn for every subtitle with the missing ID.
+            is_shared = False
     else:
         subtitle_profile = SubtitleProfile()
     subtitle_profile.add_default(default_profile)
@@ -170,6 +186,8 @@ def _inject_subtitle_profile_data(subtitle:Subtitle, subtitle_profiles:Optional[
             orbit.add_default(default_profile)
 
     subtitle.subtitle_profile.add_default(subtitle_profile)
+    if is_shared:
+        resolved_profiles[subtitle.subtitle_profile_id] = subtitle.subtitle_profile
 
 
 def _get_subtitle_from_dict(subtitle_json:Dict, subtitle_profiles:Dict[str, SubtitleProfile]=None, default_profile_id:str=None) -> Subtitle:
@@ -267,12 +285,13 @@ def _get_profile_data_type_feature_and_value(line:str):
     if line.startswith("subtitle_profile_id:"):
         return "subtitle_profile_id", "subtitle_profile_id", line.split(":", 1)[1].lstrip()
 
-    for data_type in text_profile_features_by_keys.keys():
-        for feature in text_profile_features_by_keys[data_type]:
-            formatted_feature = f"{data_type}.{feature}"
-            if line.lower().startswith(formatted_feature):
-                value = line.split(":", 1)[1].lstrip()
-                return data_type, feature, value
+    # every feature starts with its data type and a dot, so only the features of that data type can match.
+    lowered_line = line.lower()
+    data_type = lowered_line.split(".", 1)[0]
+    for feature in text_profile_features_by_keys.get(data_type, []):
+        if lowered_line.startswith(f"{data_type}.{feature}"):
+            value = line.split(":", 1)[1].lstrip()
+            return data_type, feature, value
 
     return None, None, None
 
@@ -329,7 +348,7 @@ def _add_text_data_to_subtitle(subtitle: Subtitle, line:str) -> Subtitle:
     raise
 
 def get_profile_alias(line:str, subtitle_profiles:Optional[Dict[str, SubtitleProfile]]=None):
-    if subtitle_profiles is None:
+    if subtitle_profiles is None or ":" not in line:
         return None
     for profile_id in subtitle_profiles.keys():
         if line.startswith(f"{subtitle_profiles[profile_id].subtitle_profile_id}:"):
@@ -355,14 +374,19 @@ def _get_subtitle_groups_from_textstring(textstring:str, subtitle_profiles:Optio
     subtitle = Subtitle(content=[])
     default_profile = get_default_subtitle_profile(subtitle_profiles, default_profile_id=default_profile_id)
     default_profile.add_default(SubtitleProfile.get_default())
+    resolved_profiles = dict()
 
     is_profile_environment = False
     is_content_environment = False
     is_empty = False
     empty_strings = []
 
+    # each line is classified once, since the loop also looks ahead at the next line.
+    profile_aliases = [get_profile_alias(line, subtitle_profiles=subtitle_profiles) for line in lines]
+    data_types = [_get_profile_data_type_feature_and_value(line)[0] for line in lines]
+
     for i, line in enumerate(lines):
-        profile_alias = get_profile_alias(line, subtitle_profiles=subtitle_profiles)
+        profile_alias = profile_aliases[i]
         if line.lower().startswith("image_id:"):
             image_id = line.split(":")[1].lstrip()
 
@@ -392,7 +416,7 @@ def _get_subtitle_groups_from_textstring(textstring:str, subtitle_profiles:Optio
                 is_empty = True
                 empty_strings.append("")
                 if i+1<len(lines):
-                    data_type, feature, value = _get_profile_data_type_feature_and_value(lines[i+1])
+                    data_type = data_types[i+1]
                     if data_type is not None or lines[i+1].lower().startswith("content:") or lines[i+1].lower().startswith("image_id:"):
                         empty_strings = []
             else:
@@ -405,42 +429,38 @@ def _get_subtitle_groups_from_textstring(textstring:str, subtitle_profiles:Optio
         # conditions for adding subtitle/subtitle_group
         # last part.
         if i+1==len(lines) and subtitle_group.image_id is not None:
-            _inject_subtitle_profile_data(subtitle, subtitle_profiles, default_profile_id)
+            _inject_subtitle_profile_data(subtitle, subtitle_profiles, default_profile_id, resolved_profiles=resolved_profiles)
             if subtitle.subtitle_profile.font_data is None:
                 raise TypeError(f"Subtitle profile error: {subtitle.subtitle_profile.__dict__}")
-            subtitle.subtitle_profile.add_default()
             subtitle_group.subtitle_list.append(subtitle)
             empty_strings = []
             subtitle_groups_by_path[subtitle_group.image_id] = subtitle_group
 
         if i+1<len(lines):
             # subtitle: the current subtitle environment ends when the next line is content or a file for subtitle profile.
-            next_profile_alias = get_profile_alias(lines[i+1], subtitle_profiles=subtitle_profiles)
+            next_profile_alias = profile_aliases[i+1]
             if is_content_environment and i+1<len(lines) and (lines[i+1].lower().startswith("content:") or next_profile_alias is not None):
-                _inject_subtitle_profile_data(subtitle, subtitle_profiles, default_profile_id)
+                _inject_subtitle_profile_data(subtitle, subtitle_profiles, default_profile_id, resolved_profiles=resolved_profiles)
                 if subtitle.subtitle_profile.font_data is None:
                     raise TypeError(f"Subtitle profile error: {subtitle.subtitle_profile.__dict__}")
-                subtitle.subtitle_profile.add_default()
                 subtitle_group.subtitle_list.append(subtitle)
                 empty_strings = []
                 subtitle = Subtitle(content=[], subtitle_profile=SubtitleProfile())
 
-            data_type, feature, value = _get_profile_data_type_feature_and_value(lines[i+1])
+            data_type = data_types[i+1]
             if is_content_environment and i+1<len(lines) and data_type is not None:
                 is_content_environment = False
                 is_profile_environment = True
-                _inject_subtitle_profile_data(subtitle, subtitle_profiles, default_profile_id)
+                _inject_subtitle_profile_data(subtitle, subtitle_profiles, default_profile_id, resolved_profiles=resolved_profiles)
                 if subtitle.subtitle_profile.font_data is None:
                     raise TypeError(f"Subtitle profile error: {subtitle.subtitle_profile.__dict__}")
-                subtitle.subtitle_profile.add_default()
                 subtitle_group.subtitle_list.append(subtitle)
                 empty_strings = []
                 subtitle = Subtitle(content=[], subtitle_profile=SubtitleProfile())
 
             # subtitle group
             elif i+1<len(lines) and lines[i+1].lower().startswith("image_id:") and subtitle_group.image_id is not None:
-                _inject_subtitle_profile_data(subtitle, subtitle_profiles, default_profile_id)
-                subtitle.subtitle_profile.add_default()
+                _inject_subtitle_profile_data(subtitle, subtitle_profiles, default_profile_id, resolved_profiles=resolved_profiles)
                 subtitle_group.subtitle_list.append(subtitle)
                 empty_strings = []
                 subtitle_groups_by_path[subtitle_group.image_id] = subtitle_group
@@ -458,6 +478,26 @@ def _get_subtitle_groups_from_text(textpath, subtitle_profiles:Optional[Dict[str
     return _get_subtitle_groups_from_textstring(textstring, subtitle_profiles=subtitle_profiles, default_profile_id=default_profile_id)
 
 
+def get_subtitle_line_numbers_from_textstring(textstring:str, subtitle_profiles:Optional[Dict[str, SubtitleProfile]]=None) -> Dict[str, List[int]]:
+    # image ID -> 1-based line numbers of its image_id line followed by the line starting each subtitle (content or profile alias),
+    # found by a separate scan so that parsed subtitles stay plain data.
+    line_numbers = dict()
+    current = None
+    for i, line in enumerate(textstring.split("\n")):
+        if line.lower().startswith("image_id:"):
+            current = line_numbers[line.split(":")[1].lstrip()] = [i+1]
+        elif current is not None and (line.lower().startswith("content:") or get_profile_alias(line, subtitle_profiles=subtitle_profiles) is not None):
+            current.append(i+1)
+    return line_numbers
+
+def get_subtitle_line_numbers_by_textpath(textpath, subtitle_profiles:Optional[Dict[str, SubtitleProfile]]=None) -> Dict[str, List[int]]:
+    # line numbers are only known for text drafts.
+    if os.path.splitext(textpath)[1] != ".txt":
+        return dict()
+    with open(textpath, "r", encoding="utf-8") as reader:
+        textstring = reader.read()
+    return get_subtitle_line_numbers_from_textstring(textstring, subtitle_profiles=subtitle_profiles)
+
 def get_subtitle_groups_by_textpath(textpath, subtitle_profiles:Optional[Dict[str, SubtitleProfile]]=None, default_profile_id:str=None) -> Dict[str, SubtitleGroup]:
     extension = os.path.splitext(textpath)[1]
     if extension == ".json":
@@ -476,8 +516,7 @@ def _get_parent_profile_id_list(child_profile_id) -> List[str]:
         return match.group(1).split(",")
     return []
 
-def get_subtitle_profiles(subtitle_profile_path) -> Dict[str, SubtitleProfile]:
-    # deserialize a list of subtitle profile paths.
+def _get_subtitle_profile_list_dict(subtitle_profile_path) -> List[Dict]:
     extension = os.path.splitext(subtitle_profile_path)[1]
     if extension == ".json":
         with open(subtitle_profile_path, "r", encoding="utf-8") as reader:
@@ -485,6 +524,21 @@ def get_subtitle_profiles(subtitle_profile_path) -> Dict[str, SubtitleProfile]:
     if extension in {".yml", ".yaml"}:
         with open(subtitle_profile_path, "r", encoding="utf-8") as reader:
             subtitle_profile_list_dict = yaml.safe_load(reader)
+    return subtitle_profile_list_dict
+
+def get_subtitle_profile_dicts(subtitle_profile_path) -> Dict[str, Dict]:
+    # raw subtitle profile definitions by profile ID (without parents), before inheritance is resolved.
+    subtitle_profile_dicts = dict()
+    for subtitle_profile_json in _get_subtitle_profile_list_dict(subtitle_profile_path):
+        subtitle_profile_id = subtitle_profile_json.get("subtitle_profile_id")
+        if subtitle_profile_id is None:
+            continue
+        subtitle_profile_dicts[subtitle_profile_id.split("(")[0]] = subtitle_profile_json
+    return subtitle_profile_dicts
+
+def get_subtitle_profiles(subtitle_profile_path) -> Dict[str, SubtitleProfile]:
+    # deserialize a list of subtitle profile paths.
+    subtitle_profile_list_dict = _get_subtitle_profile_list_dict(subtitle_profile_path)
 
     subtitle_profiles = dict()
     for subtitle_profile_json in subtitle_profile_list_dict:
@@ -1,3 +1,4 @@
+import copy
 import logging
 import os
 from typing import List, Dict, Optional
@@ -9,7 +10,10 @@ from kksubs.model.domain_models import SubtitleProfile, SubtitleGroup, Supported
 
 from kksubs.model.domain_models import get_default_font_style
 
-from kksubs.model.converters import get_subtitle_groups_by_textpath, get_subtitle_profiles
+from kksubs.model.converters import (
+    get_subtitle_groups_by_textpath, get_subtitle_line_numbers_by_textpath, get_subtitle_profile_dicts, get_subtitle_profiles
+)
+from kksubs.model.dependency_graph import DependencyGraph, build_dependency_graph
 
 logger = logging.getLogger(__name__)
 
@@ -114,6 +118,13 @@ def update_images_in_textpath(text_path:str, image_paths:List[str], new_image_pa
     with open(text_path, "w", encoding="utf-8") as writer:
         writer.write(updated_textstring)
 
+def _get_file_key(path:Optional[str]) -> Optional[tuple]:
+    # identifies a version of a file for caching purposes.
+    if path is None or not os.path.exists(path):
+        return None
+    stat = os.stat(path)
+    return (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+
 class SubtitleDataAccessService:
 
     def __init__(
@@ -127,6 +138,14 @@ class SubtitleDataAccessService:
         self.default_subtitle_profile_id = default_subtitle_profile_id
         self.default_subtitle_style = default_subtitle_style
 
+        # parsed profiles and drafts are kept warm between calls, and refreshed when the file changes on disk.
+        self._subtitle_profiles_cache = None
+        self._subtitle_groups_cache = dict()
+
+    def clear_cache(self):
+        self._subtitle_profiles_cache = None
+        self._subtitle_groups_cache = dict()
+
     def set_input_image_directory(self, input_image_directory):
         if not os.path.exists(input_image_directory):
             raise FileNotFoundError(f"Image input directory {input_image_directory} does not exist.")
@@ -155,12 +174,34 @@ class SubtitleDataAccessService:
         correct_paths = list(map(lambda filtered_path:os.path.join(self.input_text_directory, filtered_path), filtered_paths))
         return correct_paths
 
+    def get_textpath(self, text_id:str) -> str:
+        # finds the draft by its file name, with or without extension.
+        for textpath in self.get_textpaths():
+            basename = os.path.basename(textpath)
+            if text_id in {basename, os.path.splitext(basename)[0]}:
+                return textpath
+        raise FileNotFoundError(f"Draft {text_id} is not in input text directory {self.input_text_directory}.")
+
     def get_subtitle_groups_by_textpath(self, textpath, subtitle_profiles=None, default_profile_id=None) -> Dict[str, SubtitleGroup]:
-        if subtitle_profiles is None:
-            subtitle_profiles = self.get_subtitle_profiles()
+        # subtitle groups are cached per draft unless profiles are passed explicitly.
+        # the cached groups are shared: callers that modify them must work on a copy.
+        use_cache = subtitle_profiles is None
         if default_profile_id is None:
             default_profile_id = self.default_subtitle_profile_id
-        return get_subtitle_groups_by_textpath(textpath, subtitle_profiles=subtitle_profiles, default_profile_id=default_profile_id)
+        if use_cache:
+            cache_key = (_get_file_key(textpath), _get_file_key(self.subtitle_profile_path), default_profile_id)
+            cached = self._subtitle_groups_cache.get(textpath)
+            if cached is not None and cached[0] == cache_key:
+                return cached[1]
+            subtitle_profiles = self.get_subtitle_profiles()
+        subtitle_groups = get_subtitle_groups_by_textpath(textpath, subtitle_profiles=subtitle_profiles, default_profile_id=default_profile_id)
+        if use_cache:
+            self._subtitle_groups_cache[textpath] = (cache_key, subtitle_groups)
+        return subtitle_groups
+
+    def get_subtitle_line_numbers_by_textpath(self, textpath) -> Dict[str, List[int]]:
+        # image ID -> draft line numbers of the image_id line and of each subtitle; empty for JSON and YAML drafts.
+        return get_subtitle_line_numbers_by_textpath(textpath, subtitle_profiles=self.get_subtitle_profiles())
 
     def get_subtitle_groups(self) -> Dict[str, Dict[str, SubtitleGroup]]:
         if self.default_subtitle_style is None:
@@ -180,12 +221,30 @@ class SubtitleDataAccessService:
         return image_paths
 
     def get_subtitle_profiles(self) -> Dict[str, SubtitleProfile]:
+        # returns a copy of the cached profiles, since parsing drafts fills profiles with default data.
         if self.subtitle_profile_path is not None:
             if not os.path.exists(self.subtitle_profile_path):
                 raise FileExistsError(f"Subtitle profile path {self.subtitle_profile_path} does not exist.")
-            return get_subtitle_profiles(self.subtitle_profile_path)
+            cache_key = _get_file_key(self.subtitle_profile_path)
+            if self._subtitle_profiles_cache is None or self._subtitle_profiles_cache[0] != cache_key:
+                self._subtitle_profiles_cache = (cache_key, get_subtitle_profiles(self.subtitle_profile_path))
+            return copy.deepcopy(self._subtitle_profiles_cache[1])
         return None
 
+    def get_subtitle_profile_dicts(self) -> Dict[str, Dict]:
+        # raw subtitle profile definitions by profile ID, used to find which profiles were edited.
+        if self.subtitle_profile_path is not None and os.path.exists(self.subtitle_profile_path):
+            return get_subtitle_profile_dicts(self.subtitle_profile_path)
+        return dict()
+
+    def get_dependency_graph(self) -> DependencyGraph:
+        # links each profile, parent profile, font, asset, image and draft to the output frames that use it.
+        image_ids = sorted(map(os.path.basename, self.get_image_paths()))
+        return build_dependency_graph(
+            self.get_subtitle_profile_dicts(), self.get_subtitle_groups(), image_ids,
+            default_profile_id=self.default_subtitle_profile_id
+        )
+
     def set_default_subtitle_profile_id(self, profile_id):
         if self.get_subtitle_profiles() is None:
             raise KeyError("Currently there are no subtitle profiles associated with this application.")
@@ -0,0 +1,157 @@
+import logging
+from collections import defaultdict, deque
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from kksubs.model.converters import _get_parent_profile_id_list
+from kksubs.model.domain_models import SubtitleGroup, SubtitleProfile
+
+logger = logging.getLogger(__name__)
+
+# nodes are (kind, key) tuples, where kind is one of the following.
+PROFILE = "profile" # key: subtitle profile ID (without parents).
+FONT = "font" # key: font path.
+ASSET = "asset" # key: asset path.
+IMAGE = "image" # key: image ID.
+DRAFT = "draft" # key: draft path.
+FRAME = "frame" # key: (draft path, image ID), an output image.
+
+def get_base_profile_id(subtitle_profile_id:str) -> str:
+    # child(parent1,parent2) -> child
+    return subtitle_profile_id.split("(")[0].strip()
+
+def _get_subtitle_profile_dependencies(subtitle_profile:SubtitleProfile) -> Set[tuple]:
+    # font and asset files a resolved subtitle profile reads during rendering.
+    nodes = set()
+    if subtitle_profile.font_data is not None and subtitle_profile.font_data.style is not None:
+        nodes.add((FONT, subtitle_profile.font_data.style))
+    if subtitle_profile.asset_data is not None and subtitle_profile.asset_data.path is not None:
+        nodes.add((ASSET, subtitle_profile.asset_data.path))
+    if subtitle_profile.orbits is not None:
+        for orbit in subtitle_profile.orbits:
+            nodes.update(_get_subtitle_profile_dependencies(orbit))
+    return nodes
+
+def get_subtitle_group_dependencies(subtitle_group:SubtitleGroup, default_profile_id:str=None) -> Set[tuple]:
+    # profiles, fonts and assets used by a subtitle group.
+    nodes = set()
+    if default_profile_id is not None:
+        nodes.add((PROFILE, default_profile_id))
+    for subtitle in subtitle_group.subtitle_list or []:
+        if subtitle.subtitle_profile_id is not None:
+            nodes.add((PROFILE, get_base_profile_id(subtitle.subtitle_profile_id)))
+        if subtitle.subtitle_profile is not None:
+            nodes.update(_get_subtitle_profile_dependencies(subtitle.subtitle_profile))
+    return nodes
+
+def _get_subtitle_profile_dict_dependencies(subtitle_profile_dict:Dict) -> Set[tuple]:
+    # parent profiles (including those of orbits), fonts and assets named in a subtitle profile definition.
+    nodes = set()
+    subtitle_profile_id = subtitle_profile_dict.get("subtitle_profile_id")
+    if subtitle_profile_id is not None:
+        for parent_profile_id in _get_parent_profile_id_list(subtitle_profile_id):
+            if parent_profile_id.strip():
+                nodes.add((PROFILE, parent_profile_id.strip()))
+    font_data_dict = subtitle_profile_dict.get("font_data") or dict()
+    if font_data_dict.get("style") is not None:
+        nodes.add((FONT, font_data_dict.get("style")))
+    asset_data_dict = subtitle_profile_dict.get("asset_data") or dict()
+    if asset_data_dict.get("path") is not None:
+        nodes.add((ASSET, asset_data_dict.get("path")))
+    for orbit_dict in subtitle_profile_dict.get("orbits") or []:
+        nodes.update(_get_subtitle_profile_dict_dependencies(orbit_dict))
+    return nodes
+
+def get_changed_profile_ids(subtitle_profile_dicts:Dict[str, Dict], previous_subtitle_profile_dicts:Dict[str, Dict]) -> Set[str]:
+    # IDs of profiles whose definitions were added, removed or edited.
+    profile_ids = set(subtitle_profile_dicts.keys()) | set(previous_subtitle_profile_dicts.keys())
+    return {
+        profile_id for profile_id in profile_ids
+        if subtitle_profile_dicts.get(profile_id) != previous_subtitle_profile_dicts.get(profile_id)
+    }
+
+
+class DependencyGraph:
+
+    def __init__(self):
+        """
+        Links subtitle profiles, parent profiles, fonts, assets, images and drafts to the output frames that use them.
+        """
+        self._dependents:Dict[tuple, Set[tuple]] = defaultdict(set)
+        self._dependencies:Dict[tuple, Set[tuple]] = defaultdict(set)
+        self._frame_nodes_by_textpath:Dict[str, Set[tuple]] = defaultdict(set)
+
+    def add_dependency(self, dependent:tuple, dependency:tuple):
+        # dependent must be rebuilt if dependency changes.
+        self._dependents[dependency].add(dependent)
+        self._dependencies[dependent].add(dependency)
+
+    def remove_dependencies(self, node:tuple):
+        for dependency in self._dependencies.pop(node, set()):
+            self._dependents[dependency].discard(node)
+
+    def remove_node(self, node:tuple):
+        for dependency in self._dependencies.pop(node, set()):
+            self._dependents[dependency].discard(node)
+        for dependent in self._dependents.pop(node, set()):
+            self._dependencies[dependent].discard(node)
+
+    def get_nodes(self, kind:str) -> Set[tuple]:
+        return {node for node in set(self._dependents.keys()) | set(self._dependencies.keys()) if node[0] == kind}
+
+    def get_dependencies(self, node:tuple) -> Set[tuple]:
+        return set(self._dependencies.get(node, set()))
+
+    def get_dependents(self, *nodes:tuple) -> Set[tuple]:
+        # everything that transitively depends on any of the nodes.
+        dependents = set()
+        queue = deque(nodes)
+        while queue:
+            node = queue.popleft()
+            for dependent in self._dependents.get(node, set()):
+                if dependent not in dependents:
+                    dependents.add(dependent)
+                    queue.append(dependent)
+        return dependents
+
+    def get_affected_frames(self, *nodes:tuple) -> Set[Tuple[str, str]]:
+        # (draft path, image ID) pairs that must be rebuilt if any of the nodes change.
+        return {node[1] for node in self.get_dependents(*nodes) if node[0] == FRAME}
+
+    def get_affected_frames_by_profile(self, subtitle_profile_id:str) -> Set[Tuple[str, str]]:
+        return self.get_affected_frames((PROFILE, get_base_profile_id(subtitle_profile_id)))
+
+    def add_subtitle_profile_dicts(self, subtitle_profile_dicts:Dict[str, Dict]):
+        # replaces the dependencies of all profiles with those of the given definitions.
+        for profile_node in self.get_nodes(PROFILE):
+            self.remove_dependencies(profile_node)
+        for subtitle_profile_id, subtitle_profile_dict in subtitle_profile_dicts.items():
+            profile_node = (PROFILE, subtitle_profile_id)
+            for node in _get_subtitle_profile_dict_dependencies(subtitle_profile_dict):
+                self.add_dependency(profile_node, node)
+
+    def add_subtitle_groups(self, textpath:str, subtitle_groups:Dict[str, SubtitleGroup], image_ids:Iterable[str], default_profile_id:str=None):
+        # frames of a draft; images without subtitle groups still depend on the draft and the image.
+        for frame_node in self._frame_nodes_by_textpath.pop(textpath, set()):
+            self.remove_node(frame_node)
+        for image_id in image_ids:
+            frame_node = (FRAME, (textpath, image_id))
+            self._frame_nodes_by_textpath[textpath].add(frame_node)
+            self.add_dependency(frame_node, (DRAFT, textpath))
+            self.add_dependency(frame_node, (IMAGE, image_id))
+            subtitle_group = subtitle_groups.get(image_id)
+            if subtitle_group is None:
+                continue
+            for node in get_subtitle_group_dependencies(subtitle_group, default_profile_id=default_profile_id):
+                self.add_dependency(frame_node, node)
+
+
+def build_dependency_graph(
+        subtitle_profile_dicts:Optional[Dict[str, Dict]], subtitle_groups_by_textpath:Dict[str, Dict[str, SubtitleGroup]],
+        image_ids:List[str], default_profile_id:str=None
+) -> DependencyGraph:
+    dependency_graph = DependencyGraph()
+    if subtitle_profile_dicts is not None:
+        dependency_graph.add_subtitle_profile_dicts(subtitle_profile_dicts)
+    for textpath, subtitle_groups in subtitle_groups_by_textpath.items():
+        dependency_graph.add_subtitle_groups(textpath, subtitle_groups, image_ids, default_profile_id=default_profile_id)
+    return dependency_graph
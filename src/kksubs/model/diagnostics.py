@@ -0,0 +1,248 @@
+import cProfile
+import contextlib
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+import tracemalloc
+import zlib
+from typing import Dict, Iterable, Optional
+
+try:
+    import resource
+except ImportError:
+    # windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+# opt-in profiling of selected or sampled frames.
+# each profiled frame gets a cProfile dump (<frame>.prof, readable with pstats or snakeviz) and a report of its memory
+# (<frame>.allocations.txt): the image layers each render stage allocated, and the python allocation sites that grew
+# most over the frame. a summary line with timings and memory growth is appended to frames.jsonl.
+# tracemalloc only sees python allocations, not Pillow's pixel buffers, which the render stages record as layers instead.
+# profiled frames render alone, so that other frames do not add to their numbers.
+
+DEFAULT_DIAGNOSTICS_DIRECTORY = ".kksubs-diagnostics"
+SUMMARY_FILENAME = "frames.jsonl"
+
+# layers allocated by each render stage of the frame profiled in this thread.
+_local = threading.local()
+
+def record_layers(stage:str, layers:Iterable):
+    # notes the image layers a render stage allocated, if the frame rendering in this thread is profiled.
+    allocations = getattr(_local, "allocations", None)
+    if allocations is None:
+        return
+    for layer in layers:
+        if layer is None:
+            continue
+        allocation = allocations.setdefault(stage, {"layers": 0, "bytes": 0})
+        allocation["layers"] += 1
+        allocation["bytes"] += layer.width*layer.height*len(layer.getbands())
+
+def _get_current_rss() -> Optional[int]:
+    # resident set size in bytes, where the platform exposes it cheaply.
+    try:
+        with open("/proc/self/statm", "r") as reader:
+            return int(reader.read().split()[1])*os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+def _get_max_rss() -> Optional[int]:
+    # peak resident set size of the process so far, in bytes.
+    if resource is None:
+        return None
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on linux, bytes on macos.
+    return max_rss if sys.platform == "darwin" else max_rss*1024
+
+def _to_filename(frame:str) -> str:
+    return re.sub(r"[^\w.-]+", "_", frame)
+
+
+class _RSSSampler:
+    # polls the resident set size in the background while a frame renders, keeping the peak.
+
+    def __init__(self, interval:float):
+        self.interval = interval
+        self.peak = _get_current_rss()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            rss = _get_current_rss()
+            if rss is not None and (self.peak is None or rss > self.peak):
+                self.peak = rss
+
+    def __enter__(self):
+        if self.peak is not None:
+            self._thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+        rss = _get_current_rss()
+        if rss is not None and (self.peak is None or rss > self.peak):
+            self.peak = rss
+
+
+class FrameProfiler:
+
+    def __init__(
+            self, directory:str=None, frames:Iterable[str]=None, sample_rate:float=None, top_allocations:int=None,
+            rss_interval:float=None
+    ):
+        """
+        Profiles selected frames under cProfile and tracemalloc.
+        :param frames: frames to profile, as output keys ("<draft name>/<image_id>") or image IDs.
+        :param sample_rate: fraction of frames to profile, chosen by a hash of the frame, so reruns profile the same frames.
+        :param rss_interval: seconds between resident set size samples.
+        """
+        if directory is None:
+            directory = DEFAULT_DIAGNOSTICS_DIRECTORY
+        if top_allocations is None:
+            top_allocations = 20
+        if rss_interval is None:
+            rss_interval = 0.01
+        if sample_rate is not None and not 0 <= sample_rate <= 1:
+            raise ValueError(f"Sample rate must be in [0, 1], got {sample_rate}.")
+        self.directory = directory
+        self.frames = set(frames) if frames is not None else set()
+        self.sample_rate = sample_rate
+        self.top_allocations = top_allocations
+        self.rss_interval = rss_interval
+        os.makedirs(directory, exist_ok=True)
+        # cProfile and tracemalloc are process-wide, so profiled frames run one at a time.
+        self._lock = threading.Lock()
+        # frames rendering, and whether a profiled frame is rendering or waiting to.
+        self._condition = threading.Condition()
+        self._rendering = 0
+        self._profiling = False
+        self._waiting = 0
+
+    def should_profile(self, frame:str) -> bool:
+        if frame in self.frames or frame.split("/")[-1] in self.frames:
+            return True
+        if self.sample_rate:
+            return zlib.crc32(frame.encode("utf-8")) % 10000 < self.sample_rate*10000
+        return False
+
+    @contextlib.contextmanager
+    def render(self, frame:str):
+        # renders a frame, profiling it if selected.
+        # profiled frames render alone: they wait for the frames rendering in other threads, and hold back new ones.
+        if not self.should_profile(frame):
+            with self._condition:
+                while self._profiling or self._waiting:
+                    self._condition.wait()
+                self._rendering += 1
+            try:
+                yield
+            finally:
+                with self._condition:
+                    self._rendering -= 1
+                    self._condition.notify_all()
+            return
+
+        with self._condition:
+            self._waiting += 1
+            while self._profiling or self._rendering:
+                self._condition.wait()
+            self._waiting -= 1
+            self._profiling = True
+        try:
+            with self.profile(frame):
+                yield
+        finally:
+            with self._condition:
+                self._profiling = False
+                self._condition.notify_all()
+
+    @contextlib.contextmanager
+    def profile(self, frame:str):
+        with self._lock:
+            is_tracing = tracemalloc.is_tracing()
+            if not is_tracing:
+                tracemalloc.start()
+            elif hasattr(tracemalloc, "reset_peak"):
+                tracemalloc.reset_peak()
+            start_snapshot = tracemalloc.take_snapshot()
+            start_traced, _ = tracemalloc.get_traced_memory()
+            _local.allocations = dict()
+            profiler = cProfile.Profile()
+            start = time.perf_counter()
+            try:
+                with _RSSSampler(self.rss_interval) as rss_sampler:
+                    start_rss = rss_sampler.peak
+                    profiler.enable()
+                    try:
+                        yield
+                    finally:
+                        profiler.disable()
+            finally:
+                duration = time.perf_counter() - start
+                end_rss = _get_current_rss()
+                end_traced, traced_peak = tracemalloc.get_traced_memory()
+                snapshot = tracemalloc.take_snapshot()
+                if not is_tracing:
+                    tracemalloc.stop()
+                layer_allocations = _local.allocations
+                _local.allocations = None
+                self._write(frame, profiler, snapshot, start_snapshot, {
+                    "frame": frame,
+                    "duration": duration,
+                    "traced_delta": end_traced - start_traced,
+                    "traced_peak_delta": traced_peak - start_traced,
+                    "rss_delta": end_rss - start_rss if end_rss is not None and start_rss is not None else None,
+                    "peak_rss_delta": rss_sampler.peak - start_rss if start_rss is not None else None,
+                    "process_max_rss": _get_max_rss(),
+                    "layer_allocations": layer_allocations,
+                    "layer_bytes": sum(allocation["bytes"] for allocation in layer_allocations.values()),
+                })
+
+    def _write(
+            self, frame:str, profiler:cProfile.Profile, snapshot:tracemalloc.Snapshot, start_snapshot:tracemalloc.Snapshot,
+            summary:Dict
+    ):
+        filename = _to_filename(frame)
+        profile_path = os.path.join(self.directory, f"{filename}.prof")
+        profiler.dump_stats(profile_path)
+
+        filters = [
+            tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+        ]
+        statistics = snapshot.filter_traces(filters).compare_to(start_snapshot.filter_traces(filters), "lineno")
+        statistics = [statistic for statistic in statistics if statistic.size_diff > 0][:self.top_allocations]
+        allocations_path = os.path.join(self.directory, f"{filename}.allocations.txt")
+        with open(allocations_path, "w", encoding="utf-8") as writer:
+            writer.write(f"Image layers allocated by the render stages of frame {frame}:\n")
+            for stage, allocation in sorted(summary["layer_allocations"].items(), key=lambda item: -item[1]["bytes"]):
+                writer.write(f"{stage}: {allocation['layers']} layers, {allocation['bytes']/1024**2:.1f} MiB\n")
+            writer.write(f"Total: {summary['layer_bytes']/1024**2:.1f} MiB.\n")
+            if summary["peak_rss_delta"] is not None:
+                writer.write(f"Resident set size grew by {summary['peak_rss_delta']/1024**2:.1f} MiB at its peak.\n")
+            writer.write(f"\nTop {len(statistics)} python allocation sites by growth over the frame ")
+            writer.write(f"(traced peak {summary['traced_peak_delta']/1024**2:.1f} MiB over the start):\n")
+            for statistic in statistics:
+                writer.write(f"{statistic}\n")
+
+        summary["profile"] = profile_path
+        summary["allocations"] = allocations_path
+        summary["top_allocations"] = [
+            {"site": str(statistic.traceback), "size_diff": statistic.size_diff, "count_diff": statistic.count_diff}
+            for statistic in statistics[:5]
+        ]
+        with open(os.path.join(self.directory, SUMMARY_FILENAME), "a", encoding="utf-8") as writer:
+            writer.write(json.dumps(summary) + "\n")
+        logger.info(
+            f"Profiled frame {frame}: {summary['duration']:.3f}s, {summary['layer_bytes']/1024**2:.1f} MiB of layers, "
+            f"written to {profile_path}."
+        )
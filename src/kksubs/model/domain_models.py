@@ -1,3 +1,4 @@
+import functools
 import os
 from abc import ABC, abstractmethod
 from enum import Enum
@@ -44,6 +45,20 @@ def to_xy_coords(value) -> Optional[tuple]:
         return (int(value[0]), int(value[1]))
     raise TypeError(f"Coords has invalid type: {value} is of type {type(value)}.")
 
+def scale_integer(value, scale) -> Optional[int]:
+    # scales a pixel length, keeping nonzero lengths visible.
+    if value is None:
+        return value
+    if value == 0:
+        return 0
+    return max(1, int(round(value*scale)))
+
+def scale_xy_coords(value, scale) -> Optional[tuple]:
+    if value is None:
+        return value
+    return (int(round(value[0]*scale)), int(round(value[1]*scale)))
+
+@functools.lru_cache(maxsize=None)
 def get_default_font_style():
     return os.path.join(os.path.dirname(os.path.abspath(__file__)), "../resource/font/Roboto/Roboto-Regular.ttf")
 
@@ -152,8 +167,17 @@ class FontData(BaseData):
         self.stroke_size = coalesce(self.stroke_size, profile_font_data.stroke_size)
         pass
 
+    def get_scaled(self, scale) -> "FontData":
+        return FontData(
+            style=self.style,
+            color=self.color,
+            size=scale_integer(self.size, scale),
+            stroke_color=self.stroke_color,
+            stroke_size=scale_integer(self.stroke_size, scale),
+        )
+
     def __eq__(self, other):
-        return self.__dict__ == other.__dict__
+        return isinstance(other, type(self)) and self.__dict__ == other.__dict__
 
     pass
 
@@ -188,8 +212,15 @@ class OutlineData(BaseData):
         self.blur_strength = coalesce(self.blur_strength, profile_outline_data.blur_strength)
         self.correct_values()
 
+    def get_scaled(self, scale) -> "OutlineData":
+        return OutlineData(
+            color=self.color,
+            radius=scale_integer(self.radius, scale),
+            blur_strength=scale_integer(self.blur_strength, scale),
+        )
+
     def __eq__(self, other):
-        return self.__dict__ == other.__dict__
+        return isinstance(other, type(self)) and self.__dict__ == other.__dict__
 
     pass
 
@@ -244,8 +275,20 @@ class TextboxData(BaseData):
         self.rotate = coalesce(self.rotate, profile_textbox_data.rotate)
         self.dynamic_rotate = coalesce(self.dynamic_rotate, profile_textbox_data.dynamic_rotate)
 
+    def get_scaled(self, scale) -> "TextboxData":
+        # box width is measured in characters and grid4 is relative to the image, so neither is scaled.
+        return TextboxData(
+            alignment=self.alignment,
+            anchor_point=scale_xy_coords(self.anchor_point, scale),
+            grid4=self.grid4,
+            box_width=self.box_width,
+            push=self.push,
+            rotate=self.rotate,
+            dynamic_rotate=self.dynamic_rotate,
+        )
+
     def __eq__(self, other):
-        return self.__dict__ == other.__dict__
+        return isinstance(other, type(self)) and self.__dict__ == other.__dict__
 
 class LayerData(BaseData):
     def __init__(
@@ -316,6 +359,38 @@ class LayerData(BaseData):
         self.f_radius = coalesce(self.f_radius, profile_focus_data.f_radius)
         self.f_blur = coalesce(self.f_blur, profile_focus_data.f_blur)
 
+    def get_scaled(self, scale) -> "LayerData":
+        is_motion_blur = self.motion_blur is not None or self.motion_rotate is not None
+        is_radial_blur = self.radial_blur is not None or self.radial_coords is not None
+        is_rejection_filter = self.f_coords is not None or self.f_radius is not None or self.f_blur is not None
+
+        # effects fall back to pixel defaults when unset (see kksubs.image), so these are made explicit before scaling.
+        radial_blur = self.radial_blur
+        if is_radial_blur:
+            radial_blur = coalesce(radial_blur, 50)
+        motion_blur = self.motion_blur
+        if is_motion_blur and is_rejection_filter:
+            motion_blur = coalesce(motion_blur, 50)
+        f_radius, f_blur = self.f_radius, self.f_blur
+        if is_rejection_filter:
+            f_radius = coalesce(f_radius, 200)
+            f_blur = coalesce(f_blur, 200)
+
+        return LayerData(
+            brightness=self.brightness,
+            gaussian_blur=scale_integer(self.gaussian_blur, scale),
+            motion_blur=scale_integer(motion_blur, scale),
+            motion_rotate=self.motion_rotate,
+            radial_blur=scale_integer(radial_blur, scale),
+            radial_coords=scale_xy_coords(self.radial_coords, scale),
+            f_coords=scale_xy_coords(self.f_coords, scale),
+            f_radius=scale_integer(f_radius, scale),
+            f_blur=scale_integer(f_blur, scale),
+        )
+
+    def __eq__(self, other):
+        return isinstance(other, type(self)) and self.__dict__ == other.__dict__
+
 class AssetData(BaseData):
     # applies an asset (image) to the image. Example: focal lines, 
     def __init__(self, path:str=None, coords=None, scale=None, rotate=None):
@@ -338,10 +413,21 @@ class AssetData(BaseData):
         self.scale = coalesce(self.scale, profile_data.scale)
         self.rotate = coalesce(self.rotate, profile_data.rotate)
 
+    def get_scaled(self, scale) -> "AssetData":
+        return AssetData(
+            path=self.path,
+            coords=scale_xy_coords(self.coords, scale),
+            scale=coalesce(self.scale, 1.0)*scale,
+            rotate=self.rotate,
+        )
+
     @classmethod
     def get_default(cls):
         return AssetData()
 
+    def __eq__(self, other):
+        return isinstance(other, type(self)) and self.__dict__ == other.__dict__
+
 class SubtitleProfile(BaseData):
 
     def __init__(
@@ -407,7 +493,7 @@ class SubtitleProfile(BaseData):
         profile.font_data.add_default()
 
         if self.font_data is None:
-            self.font_data = coalesce(self.font_data, profile.font_data, FontData.get_default())
+            self.font_data = profile.font_data
         self.font_data.add_default(profile.font_data)
 
         # if no local outline data and no profile outline data, do not fill with global data.
@@ -458,8 +544,27 @@ class SubtitleProfile(BaseData):
         self.orbits = coalesce(self.orbits, profile.orbits)
         self.centrix = coalesce(self.centrix, profile.centrix)
 
+    def get_scaled(self, scale) -> "SubtitleProfile":
+        # returns a copy of the profile with all pixel-valued properties multiplied by the scale.
+        def get_scaled_data(data):
+            return data.get_scaled(scale) if data is not None else None
+
+        subtitle_profile = SubtitleProfile(
+            font_data=get_scaled_data(self.font_data),
+            outline_data_1=get_scaled_data(self.outline_data_1),
+            outline_data_2=get_scaled_data(self.outline_data_2),
+            textbox_data=get_scaled_data(self.textbox_data),
+            layer_data=get_scaled_data(self.layer_data),
+            asset_data=get_scaled_data(self.asset_data),
+            default_text=self.default_text,
+            orbits=[orbit.get_scaled(scale) for orbit in self.orbits] if self.orbits is not None else None,
+            subtitle_profile_id=self.subtitle_profile_id,
+        )
+        subtitle_profile.centrix = self.centrix
+        return subtitle_profile
+
     def __eq__(self, other):
-        return self.__dict__ == other.__dict__
+        return isinstance(other, type(self)) and self.__dict__ == other.__dict__
 
     pass
 
@@ -479,8 +584,15 @@ class Subtitle:
         self.subtitle_profile = subtitle_profile
         self.content = content
 
+    def get_scaled(self, scale) -> "Subtitle":
+        return Subtitle(
+            subtitle_profile_id=self.subtitle_profile_id,
+            subtitle_profile=self.subtitle_profile.get_scaled(scale) if self.subtitle_profile is not None else None,
+            content=list(self.content) if self.content is not None else None,
+        )
+
     def __eq__(self, other):
-        return self.__dict__ == other.__dict__
+        return isinstance(other, type(self)) and self.__dict__ == other.__dict__
 
     pass
 
@@ -496,5 +608,11 @@ class SubtitleGroup:
         self.image_id = image_id
         self.subtitle_list = subtitle_list
 
+    def get_scaled(self, scale) -> "SubtitleGroup":
+        return SubtitleGroup(
+            image_id=self.image_id,
+            subtitle_list=[subtitle.get_scaled(scale) for subtitle in self.subtitle_list] if self.subtitle_list is not None else None,
+        )
+
     def __eq__(self, other):
-        return self.__dict__ == other.__dict__
+        return isinstance(other, type(self)) and self.__dict__ == other.__dict__
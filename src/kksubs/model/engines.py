@@ -0,0 +1,65 @@
+import logging
+from typing import Dict
+
+logger = logging.getLogger(__name__)
+
+# optional render engines, selected per process by kind. each kind has a reference engine, which renders exactly as
+# before and which the golden references are rendered with, and faster engines, some of which trade exactness for speed.
+# fast engines are checked against the reference engines and golden references (see kksubs.benchmark.golden),
+# with a tolerance where they are not exact.
+
+PIL = "pil"
+
+# strokes and outlines of text.
+# pil: FreeType strokes each line once per outline and once for the font stroke.
+# dilate: rasterizes each line once, and dilates the glyph mask by each radius with a distance transform.
+STROKE = "stroke"
+DILATE = "dilate"
+
+# compositing of a subtitle's layers onto the frame.
+# pil: pastes each layer onto the whole frame in turn; blurred outlines blur a copy of the whole frame.
+# numpy: blends all of a subtitle's layers, its asset included, over the region they cover in one pass, with the same
+# arithmetic as pil. only used for RGB and RGBA frames outside of overlays.
+COMPOSITE = "composite"
+NUMPY = "numpy"
+
+# rotation of a rotated subtitle's layers.
+# pil: rotates each whole layer, resampling to the nearest pixel.
+# nearest, bilinear, bicubic: rotate only the region around each layer's text, resampling with the named filter;
+# nearest gives the same pixels as pil.
+ROTATE = "rotate"
+NEAREST = "nearest"
+BILINEAR = "bilinear"
+BICUBIC = "bicubic"
+
+ENGINES = {
+    STROKE: [PIL, DILATE],
+    COMPOSITE: [PIL, NUMPY],
+    ROTATE: [PIL, NEAREST, BILINEAR, BICUBIC],
+}
+
+_engines:Dict[str, str] = {kind: names[0] for kind, names in ENGINES.items()}
+
+def set_engine(kind:str, name:str=None):
+    # name None restores the reference engine.
+    if kind not in ENGINES:
+        raise ValueError(f"Unknown engine kind {kind}, expected one of {list(ENGINES.keys())}.")
+    if name is None:
+        name = ENGINES[kind][0]
+    if name not in ENGINES[kind]:
+        raise ValueError(f"Unknown {kind} engine {name}, expected one of {ENGINES[kind]}.")
+    _engines[kind] = name
+    logger.debug(f"Using the {name} {kind} engine.")
+
+def get_engine(kind:str) -> str:
+    return _engines[kind]
+
+def get_engines() -> Dict[str, str]:
+    return dict(_engines)
+
+def set_engines(engines:Dict[str, str]=None):
+    # sets the given engines and restores the reference engine for the other kinds.
+    if engines is None:
+        engines = dict()
+    for kind in ENGINES.keys():
+        set_engine(kind, engines.get(kind))
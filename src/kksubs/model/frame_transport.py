@@ -0,0 +1,296 @@
+import logging
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from PIL import Image
+
+from kksubs.model import engines
+from kksubs.model.cache_services import BackgroundCache
+from kksubs.model.domain_models import SubtitleGroup
+
+try:
+    from multiprocessing import shared_memory
+except ImportError:
+    # python 3.7
+    shared_memory = None
+
+logger = logging.getLogger(__name__)
+
+# frame transports hand images between the parent process and render worker processes.
+# the shared memory transport places decoded source images and rendered outputs in shared memory blocks,
+# so only a small handle (block name, size and mode) is pickled; the pickle transport sends the images themselves.
+
+SHARED_MEMORY = "shared_memory"
+PICKLE = "pickle"
+
+# bytes per pixel of the largest supported mode; output blocks are sized for RGBA.
+MAX_PIXEL_SIZE = 4
+
+def is_shared_memory_available() -> bool:
+    return shared_memory is not None
+
+
+class SharedFrame:
+
+    def __init__(self, name:str, size:Tuple[int, int]=None, mode:str=None, length:int=None):
+        """
+        Handle to an image held in a shared memory block.
+        :param name: name of the shared memory block.
+        :param size: image size, or None if the block is an empty output buffer.
+        :param length: number of bytes of image data in the block.
+        """
+        self.name = name
+        self.size = size
+        self.mode = mode
+        self.length = length
+
+    def __repr__(self):
+        return f"SharedFrame({self.name}, {self.size}, {self.mode}, {self.length})"
+
+
+def read_shared_frame(frame:SharedFrame) -> Image.Image:
+    # copies the image out of its block.
+    block = shared_memory.SharedMemory(name=frame.name)
+    try:
+        with block.buf[:frame.length] as buffer:
+            return Image.frombytes(frame.mode, frame.size, buffer)
+    finally:
+        block.close()
+
+def write_shared_frame(frame:SharedFrame, image:Image.Image) -> Optional[SharedFrame]:
+    # copies the image into the block, returning its handle, or None if the image does not fit.
+    data = image.tobytes()
+    block = shared_memory.SharedMemory(name=frame.name)
+    try:
+        if len(data) > block.size:
+            return None
+        block.buf[:len(data)] = data
+    finally:
+        block.close()
+    return SharedFrame(frame.name, size=image.size, mode=image.mode, length=len(data))
+
+
+class SharedMemoryPool:
+
+    def __init__(self):
+        """
+        Reusable shared memory blocks, owned by the parent process.
+        Blocks are returned to the pool after use instead of being unlinked, which avoids allocation churn for frames of similar size.
+        """
+        if not is_shared_memory_available():
+            raise NotImplementedError("Shared memory requires python 3.8 or later.")
+        self._blocks:Dict[str, "shared_memory.SharedMemory"] = dict()
+        self._free_names:List[str] = list()
+        self._lock = threading.Lock()
+
+    def acquire(self, size:int) -> "shared_memory.SharedMemory":
+        # the smallest free block that fits, or a new block.
+        with self._lock:
+            fitting_names = [name for name in self._free_names if self._blocks[name].size >= size]
+            if fitting_names:
+                name = min(fitting_names, key=lambda name: self._blocks[name].size)
+                self._free_names.remove(name)
+                return self._blocks[name]
+        block = shared_memory.SharedMemory(create=True, size=size)
+        with self._lock:
+            self._blocks[block.name] = block
+        return block
+
+    def release(self, name:str):
+        with self._lock:
+            if name in self._blocks and name not in self._free_names:
+                self._free_names.append(name)
+
+    def get_block_count(self) -> int:
+        return len(self._blocks)
+
+    def close(self):
+        with self._lock:
+            for block in self._blocks.values():
+                block.close()
+                try:
+                    block.unlink()
+                except FileNotFoundError:
+                    pass
+            self._blocks.clear()
+            self._free_names.clear()
+
+
+class SharedMemoryTransport:
+    name = SHARED_MEMORY
+
+    def __init__(self, pool:SharedMemoryPool=None):
+        if pool is None:
+            pool = SharedMemoryPool()
+        self.pool = pool
+
+    def put(self, image:Image.Image) -> SharedFrame:
+        data = image.tobytes()
+        block = self.pool.acquire(len(data))
+        block.buf[:len(data)] = data
+        return SharedFrame(block.name, size=image.size, mode=image.mode, length=len(data))
+
+    def allocate(self, size:Tuple[int, int]) -> SharedFrame:
+        # an empty output buffer, large enough for an RGBA image of the given size.
+        block = self.pool.acquire(size[0]*size[1]*MAX_PIXEL_SIZE)
+        return SharedFrame(block.name)
+
+    def get(self, frame) -> Image.Image:
+        # workers return the image itself if it did not fit in the output buffer.
+        if isinstance(frame, Image.Image):
+            return frame
+        return read_shared_frame(frame)
+
+    def release(self, frame):
+        if isinstance(frame, SharedFrame):
+            self.pool.release(frame.name)
+
+    def close(self):
+        self.pool.close()
+
+
+class PickleTransport:
+    name = PICKLE
+
+    def put(self, image:Image.Image) -> Image.Image:
+        return image
+
+    def allocate(self, size:Tuple[int, int]) -> None:
+        return None
+
+    def get(self, frame:Image.Image) -> Image.Image:
+        return frame
+
+    def release(self, frame):
+        pass
+
+    def close(self):
+        pass
+
+
+def get_transport(name:str=None):
+    # shared memory where available, unless a transport is named.
+    if name is None:
+        name = SHARED_MEMORY if is_shared_memory_available() else PICKLE
+    if name == SHARED_MEMORY:
+        return SharedMemoryTransport()
+    if name == PICKLE:
+        return PickleTransport()
+    raise ValueError(f"Unknown frame transport {name}.")
+
+
+# worker process state.
+_worker_background_cache:Optional[BackgroundCache] = None
+
+def _initialize_worker(background_cache_directory:str=None, background_cache_max_size:int=None, render_engines:Dict[str, str]=None):
+    global _worker_background_cache
+    # workers use the engines selected in the parent, which spawned workers would not otherwise inherit.
+    engines.set_engines(render_engines)
+    if background_cache_directory is not None:
+        _worker_background_cache = BackgroundCache(directory=background_cache_directory, max_size=background_cache_max_size)
+
+def _read_frame(frame) -> Image.Image:
+    if isinstance(frame, SharedFrame):
+        return read_shared_frame(frame)
+    return frame
+
+def _write_frame(output:Optional[SharedFrame], image:Image.Image):
+    if output is None:
+        return image
+    frame = write_shared_frame(output, image)
+    return image if frame is None else frame
+
+def _render_frame(frame, output:Optional[SharedFrame], subtitle_group:SubtitleGroup, proof_scale:float=None):
+    # runs in a worker process; returns the output frame and the time spent rendering.
+    # imported here, since subtitle_services imports this module.
+    from kksubs.model.subtitle_services import apply_subtitle_group_to_image
+    start = time.perf_counter()
+    image = apply_subtitle_group_to_image(
+        _read_frame(frame), subtitle_group, proof_scale=proof_scale, background_cache=_worker_background_cache
+    )
+    return _write_frame(output, image), time.perf_counter() - start
+
+def _echo_frame(frame, output:Optional[SharedFrame]):
+    # runs in a worker process; a round trip without rendering, for measuring transport overhead.
+    return _write_frame(output, _read_frame(frame)), 0.0
+
+
+class ProcessRenderer:
+
+    def __init__(self, processes:int=None, transport:str=None, background_cache:BackgroundCache=None):
+        """
+        Renders subtitle groups in worker processes.
+        Source images are decoded in the parent (so the frame cache and base image cache apply) and handed to workers through the frame transport.
+        """
+        if processes is None:
+            processes = os.cpu_count() or 1
+        self.processes = processes
+        self.transport_name = transport
+        self.background_cache = background_cache
+
+    def _create_executor(self) -> ProcessPoolExecutor:
+        initargs = (None, None, engines.get_engines())
+        if self.background_cache is not None:
+            initargs = (self.background_cache.directory, self.background_cache.max_size, engines.get_engines())
+        return ProcessPoolExecutor(max_workers=self.processes, initializer=_initialize_worker, initargs=initargs)
+
+    def _iter_in_workers(
+            self, items:Iterable[Tuple[Image.Image, Optional[tuple]]], fn:Callable, isolate_failures:bool=False
+    ) -> Iterator[Tuple[Image.Image, float]]:
+        # items are (image, arguments) pairs; fn(frame, output, *arguments) runs in a worker,
+        # and (image, seconds spent in the worker) pairs are yielded in order.
+        # images without arguments pass through without visiting a worker.
+        # if isolate_failures, errors raised in workers are yielded in place of their images.
+        transport = get_transport(self.transport_name)
+        logger.info(f"Using {self.processes} processes with the {transport.name} frame transport.")
+        try:
+            with self._create_executor() as executor:
+                pending = deque()
+                for image, arguments in items:
+                    if arguments is None:
+                        pending.append((None, image, None, None))
+                    else:
+                        frame = transport.put(image)
+                        output = transport.allocate(image.size)
+                        pending.append((executor.submit(fn, frame, output, *arguments), None, frame, output))
+                    # a bounded number of frames is in flight, so blocks are reused instead of piling up.
+                    if len(pending) >= 2*self.processes:
+                        yield self._collect(transport, *pending.popleft(), isolate_failures=isolate_failures)
+                while pending:
+                    yield self._collect(transport, *pending.popleft(), isolate_failures=isolate_failures)
+        finally:
+            transport.close()
+
+    def _collect(self, transport, future, image, frame, output, isolate_failures:bool=False) -> Tuple[Image.Image, float]:
+        if future is None:
+            return image, 0.0
+        try:
+            result, seconds = future.result()
+            return transport.get(result), seconds
+        except Exception as e:
+            if not isolate_failures:
+                raise
+            return e, 0.0
+        finally:
+            transport.release(frame)
+            transport.release(output)
+
+    def iter_render(
+            self, items:Iterable[Tuple[Image.Image, Optional[SubtitleGroup]]], proof_scale:float=None,
+            isolate_failures:bool=False
+    ) -> Iterator[Tuple[Image.Image, float]]:
+        # items are (decoded image, subtitle group) pairs, which may be decoded lazily by the caller.
+        # yields (rendered image, seconds spent rendering) pairs.
+        return self._iter_in_workers(
+            ((image, None if subtitle_group is None else (subtitle_group, proof_scale)) for image, subtitle_group in items),
+            _render_frame, isolate_failures=isolate_failures
+        )
+
+    def iter_echo(self, images:Iterable[Image.Image]) -> Iterator[Image.Image]:
+        # hands images to workers and back without rendering, for measuring transport overhead.
+        for image, _ in self._iter_in_workers(((image, ()) for image in images), _echo_frame):
+            yield image
@@ -0,0 +1,155 @@
+import contextlib
+import json
+import logging
+import math
+import threading
+import time
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# optional per-stage timing of the render path.
+# render code marks frames and stages with the frame and stage context managers, which do nothing unless a
+# recorder is enabled. stages nest: time is attributed to the innermost stage, under its path (e.g. "orbits/rasterize"),
+# so the stage times of a frame add up to the time spent in stages.
+
+_NULL_CONTEXT = contextlib.nullcontext()
+_recorder:Optional["StageRecorder"] = None
+
+def _get_percentile(sorted_values:List[float], percentile:float) -> float:
+    # nearest-rank percentile.
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(percentile/100*len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+class StageRecorder:
+
+    def __init__(self):
+        """
+        Collects stage timings by frame. Safe to use from several render threads; each thread tracks its own frame and stages.
+        """
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        # frame -> stage path -> seconds.
+        self._stages_by_frame:Dict[str, Dict[str, float]] = dict()
+        self._total_by_frame:Dict[str, float] = dict()
+
+    def _get_stack(self) -> list:
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        return self._local.stack
+
+    @contextlib.contextmanager
+    def frame(self, frame:str):
+        # frames may be entered more than once (e.g. render, then encode); their times add up.
+        previous_frame = getattr(self._local, "frame", None)
+        previous_stack = self._get_stack()
+        self._local.frame = frame
+        self._local.stack = []
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self._local.frame = previous_frame
+            self._local.stack = previous_stack
+            with self._lock:
+                self._total_by_frame[frame] = self._total_by_frame.get(frame, 0.0) + elapsed
+
+    @contextlib.contextmanager
+    def stage(self, name:str):
+        frame = getattr(self._local, "frame", None)
+        if frame is None:
+            # outside of a frame (e.g. previews).
+            yield
+            return
+        stack = self._get_stack()
+        path = "/".join([entry[0] for entry in stack] + [name])
+        # entries: [name, time spent in nested stages].
+        entry = [name, 0.0]
+        stack.append(entry)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            stack.pop()
+            if stack:
+                stack[-1][1] += elapsed
+            with self._lock:
+                stages = self._stages_by_frame.setdefault(frame, dict())
+                stages[path] = stages.get(path, 0.0) + elapsed - entry[1]
+
+    def get_report(self, slowest_frame_count:int=None) -> Dict:
+        # totals and percentiles over frames by stage, and the slowest frames with their stage breakdowns.
+        if slowest_frame_count is None:
+            slowest_frame_count = 10
+        with self._lock:
+            stages_by_frame = {frame: dict(stages) for frame, stages in self._stages_by_frame.items()}
+            total_by_frame = dict(self._total_by_frame)
+
+        paths = sorted({path for stages in stages_by_frame.values() for path in stages.keys()})
+        stage_reports = dict()
+        for path in paths:
+            values = sorted(stages[path] for stages in stages_by_frame.values() if path in stages)
+            stage_reports[path] = {
+                "total": sum(values),
+                "frames": len(values),
+                "mean": sum(values)/len(values),
+                "p50": _get_percentile(values, 50),
+                "p90": _get_percentile(values, 90),
+                "p99": _get_percentile(values, 99),
+                "max": values[-1],
+            }
+        slowest_frames = sorted(total_by_frame.keys(), key=lambda frame: -total_by_frame[frame])[:slowest_frame_count]
+        frame_totals = sorted(total_by_frame.values())
+        return {
+            "frames": len(total_by_frame),
+            "total": sum(frame_totals),
+            "frame_percentiles": {
+                "p50": _get_percentile(frame_totals, 50),
+                "p90": _get_percentile(frame_totals, 90),
+                "p99": _get_percentile(frame_totals, 99),
+            },
+            "stages": stage_reports,
+            "slowest_frames": [
+                {"frame": frame, "total": total_by_frame[frame], "stages": stages_by_frame.get(frame, dict())}
+                for frame in slowest_frames
+            ],
+        }
+
+    def write_report(self, path:str, slowest_frame_count:int=None) -> Dict:
+        report = self.get_report(slowest_frame_count=slowest_frame_count)
+        with open(path, "w", encoding="utf-8") as writer:
+            json.dump(report, writer, indent=2)
+        logger.info(f"Wrote stage timings for {report['frames']} frames to {path}.")
+        return report
+
+
+def enable_recorder(recorder:StageRecorder=None) -> StageRecorder:
+    global _recorder
+    if recorder is None:
+        recorder = StageRecorder()
+    _recorder = recorder
+    return recorder
+
+def disable_recorder():
+    global _recorder
+    _recorder = None
+
+def get_recorder() -> Optional[StageRecorder]:
+    return _recorder
+
+def frame(frame:str):
+    recorder = _recorder
+    if recorder is None:
+        return _NULL_CONTEXT
+    return recorder.frame(frame)
+
+def stage(name:str):
+    recorder = _recorder
+    if recorder is None:
+        return _NULL_CONTEXT
+    return recorder.stage(name)
@@ -0,0 +1,93 @@
+import json
+import logging
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+from kksubs.model.cache_services import get_digest
+from kksubs.model.dependency_graph import ASSET, FONT, get_subtitle_group_dependencies
+
+logger = logging.getLogger(__name__)
+
+# an append-only record of finished frames in the output directory, one JSON object per line.
+# a frame counts as completed if its output exists and the hash of its inputs matches the journal,
+# so a resumed batch skips completed frames and re-renders frames whose draft, profile, image, font or asset changed.
+
+JOURNAL_FILENAME = ".kksubs-journal.jsonl"
+
+COMPLETED = "completed"
+FAILED = "failed"
+
+def _get_file_key(path:str) -> Optional[tuple]:
+    if path is None or not os.path.exists(path):
+        return None
+    stat = os.stat(path)
+    return (stat.st_mtime_ns, stat.st_size)
+
+def get_input_hash(image_path:str, subtitle_group=None, proof_scale:float=None) -> str:
+    # hash of everything a frame is rendered from; subtitle groups must be validated, so that their profiles are resolved.
+    file_keys = [(image_path, _get_file_key(image_path))]
+    if subtitle_group is not None:
+        for kind, path in sorted(get_subtitle_group_dependencies(subtitle_group)):
+            if kind in (FONT, ASSET):
+                file_keys.append((path, _get_file_key(path)))
+    return get_digest(file_keys, subtitle_group, proof_scale)
+
+
+class RenderJournal:
+
+    def __init__(self, path:str):
+        """
+        Journal of finished frames, keyed by output path relative to the output directory.
+        Entries are appended as frames finish; later entries for the same output replace earlier ones.
+        """
+        self.path = path
+        self._entries:Dict[str, Dict] = dict()
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "rb+") as file:
+            data = file.read()
+            if data and not data.endswith(b"\n"):
+                # the last line was cut short by an interrupted run. it is truncated, so that the next entry is appended
+                # on a line of its own rather than onto the torn one.
+                data = data[:data.rfind(b"\n") + 1]
+                file.truncate(len(data))
+        for line in data.decode("utf-8").splitlines():
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                logger.warning(f"Skipped an unreadable line in journal {self.path}.")
+                continue
+            self._entries[entry["output"]] = entry
+        logger.info(f"Loaded {len(self._entries)} journal entries from {self.path}.")
+
+    def _append(self, entry:Dict):
+        with self._lock:
+            self._entries[entry["output"]] = entry
+            with open(self.path, "a", encoding="utf-8") as writer:
+                writer.write(json.dumps(entry) + "\n")
+                writer.flush()
+                os.fsync(writer.fileno())
+
+    def get_entry(self, output:str) -> Optional[Dict]:
+        return self._entries.get(output)
+
+    def is_completed(self, output:str, input_hash:str, output_path:str) -> bool:
+        entry = self._entries.get(output)
+        return (
+            entry is not None and entry["status"] == COMPLETED and entry["input_hash"] == input_hash
+            and os.path.exists(output_path)
+        )
+
+    def record_completed(self, output:str, input_hash:str):
+        self._append({"output": output, "status": COMPLETED, "input_hash": input_hash, "time": time.time()})
+
+    def record_failed(self, output:str, input_hash:Optional[str], error:BaseException):
+        self._append({
+            "output": output, "status": FAILED, "input_hash": input_hash, "time": time.time(), "error": repr(error)
+        })
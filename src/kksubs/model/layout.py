@@ -0,0 +1,358 @@
+import functools
+import math
+import textwrap
+from typing import Callable, Dict, List, Optional, Tuple
+
+from PIL import ImageFont
+
+from kksubs.model.domain_models import Subtitle, SubtitleProfile, TextboxData
+
+# text layout without rasterization: wrapped lines, their positions, the text box and the rotation of a subtitle.
+# apply_text_to_image draws from the same layout, so geometry reported here is exactly what gets rendered.
+
+@functools.lru_cache(maxsize=64)
+def get_font(font_style, font_size) -> ImageFont.FreeTypeFont:
+    # fonts are loaded once per style and size.
+    return ImageFont.truetype(font_style, font_size)
+
+@functools.lru_cache(maxsize=64)
+def get_line_height(font_style, font_size) -> int:
+    # lines are spaced by the height of "l" plus the descent, rather than by their own heights,
+    # so that lines of different content are evenly spaced.
+    font = get_font(font_style, font_size)
+    _, descent = font.getmetrics()
+    return font.getmask("l").getbbox()[3] + descent
+
+@functools.lru_cache(maxsize=64)
+def get_text_height(font_style, font_size) -> int:
+    # height of a drawn line from the y it is drawn at, including descenders.
+    ascent, descent = get_font(font_style, font_size).getmetrics()
+    return ascent + descent
+
+def get_text_width(font_style, font_size, text:str) -> float:
+    return get_font(font_style, font_size).getlength(text)
+
+@functools.lru_cache(maxsize=64)
+def _get_advances(font_style, font_size) -> Dict[str, float]:
+    # glyph advances by character, filled in as characters are seen.
+    return dict()
+
+def get_approximate_text_width(font_style, font_size, text:str) -> float:
+    # sum of the glyph advances, ignoring kerning: usually within a pixel or two of get_text_width, at a small
+    # fraction of the cost, for checks over whole drafts.
+    advances = _get_advances(font_style, font_size)
+    try:
+        return sum(map(advances.__getitem__, text))
+    except KeyError:
+        for character in set(text).difference(advances):
+            advances[character] = get_text_width(font_style, font_size, character)
+        return sum(map(advances.__getitem__, text))
+
+
+class LineLayout:
+
+    def __init__(self, text:str, x:float, y:float, width:float):
+        """
+        A wrapped line of text.
+        :param x: left edge of the line, as passed to ImageDraw.text.
+        :param y: top of the line, as passed to ImageDraw.text.
+        """
+        self.text = text
+        self.x = x
+        self.y = y
+        self.width = width
+
+    def to_dict(self) -> Dict:
+        return {"text": self.text, "x": self.x, "y": self.y, "width": self.width}
+
+
+class TextLayout:
+
+    def __init__(
+            self, lines:List[LineLayout], line_height:int, left:float, right:float, up:float, down:float,
+            rotate:Optional[int]=None, rotation_center:Optional[Tuple[float, float]]=None, margin:int=None,
+            anchor:Optional[Tuple[float, float]]=None, text_height:int=None
+    ):
+        """
+        Geometry of a subtitle's text on an image.
+        :param left, right, up, down: the text box. up and down follow the push direction, so up is not always above down.
+        :param rotate: resolved rotation in degrees (including dynamic rotation), or None if the text is not rotated.
+        :param rotation_center: point the text rotates about.
+        :param margin: how far strokes and outlines reach beyond the glyphs.
+        :param anchor: anchor of the text box in image coordinates.
+        :param text_height: height of each drawn line from its y; descenders can reach below the line height.
+        """
+        if margin is None:
+            margin = 0
+        if text_height is None:
+            text_height = line_height
+        self.lines = lines
+        self.line_height = line_height
+        self.left = left
+        self.right = right
+        self.up = up
+        self.down = down
+        self.rotate = rotate
+        self.rotation_center = rotation_center
+        self.margin = margin
+        self.anchor = anchor
+        self.text_height = text_height
+
+    def get_bounds(self) -> Tuple[float, float, float, float]:
+        # (x0, y0, x1, y1) of the drawn lines including the margin, after rotation.
+        # unlike the text box, this follows the lines wherever the push direction puts them.
+        x0 = min(line.x for line in self.lines) - self.margin
+        x1 = max(line.x + line.width for line in self.lines) + self.margin
+        y0 = self.lines[0].y - self.margin
+        y1 = max(self.lines[-1].y + self.line_height, self.lines[-1].y + self.text_height) + self.margin
+        if not self.rotate:
+            return x0, y0, x1, y1
+        return get_rotated_bounds((x0, y0, x1, y1), self.rotate, self.rotation_center)
+
+    def get_ink_bounds(
+            self, font:ImageFont.FreeTypeFont, stroke_width:int=None, is_rotated:bool=None
+    ) -> Optional[Tuple[int, int, int, int]]:
+        # (x0, y0, x1, y1) in whole pixels, holding every pixel the lines are drawn on with a stroke of the given
+        # width, after rotation unless is_rotated is False; None if nothing is drawn. two pixels of padding cover
+        # fractional positions and rotation to the nearest pixel.
+        if is_rotated is None:
+            is_rotated = True
+        boxes = []
+        for line in self.lines:
+            left, top, right, bottom = font.getbbox(line.text, stroke_width=stroke_width or 0)
+            if right > left and bottom > top:
+                boxes.append((line.x + left, line.y + top, line.x + right, line.y + bottom))
+        if not boxes:
+            return None
+        bounds = min(box[0] for box in boxes), min(box[1] for box in boxes), max(box[2] for box in boxes), max(box[3] for box in boxes)
+        if self.rotate and is_rotated:
+            bounds = get_rotated_bounds(bounds, self.rotate, self.rotation_center)
+        return math.floor(bounds[0]) - 2, math.floor(bounds[1]) - 2, math.ceil(bounds[2]) + 2, math.ceil(bounds[3]) + 2
+
+    def get_box(self) -> Dict[str, float]:
+        return {"left": self.left, "right": self.right, "up": self.up, "down": self.down}
+
+    def to_dict(self) -> Dict:
+        return {
+            "anchor": list(self.anchor) if self.anchor is not None else None,
+            "lines": [line.to_dict() for line in self.lines],
+            "line_height": self.line_height,
+            "box": self.get_box(),
+            "rotate": self.rotate,
+            "rotation_center": list(self.rotation_center) if self.rotation_center is not None else None,
+            "bounds": list(self.get_bounds()),
+        }
+
+
+def get_rotated_bounds(
+        bounds:Tuple[float, float, float, float], rotate:float, center:Tuple[float, float]
+) -> Tuple[float, float, float, float]:
+    # (x0, y0, x1, y1) bounding the box rotated by rotate degrees around center.
+    # images rotate counter-clockwise for positive angles, with y pointing down.
+    x0, y0, x1, y1 = bounds
+    center_x, center_y = center
+    angle = math.radians(rotate)
+    cos, sin = math.cos(angle), math.sin(angle)
+    xs, ys = [], []
+    for x, y in [(x0, y0), (x1, y0), (x0, y1), (x1, y1)]:
+        dx, dy = x - center_x, y - center_y
+        xs.append(center_x + dx*cos + dy*sin)
+        ys.append(center_y - dx*sin + dy*cos)
+    return min(xs), min(ys), max(xs), max(ys)
+
+def get_anchor(textbox_data:TextboxData, image_size:Tuple[int, int], anchor_point:tuple=None) -> Tuple[float, float]:
+    # anchor of the text box in image coordinates, from the grid4 point and/or anchor point (y up, from the center).
+    image_width, image_height = image_size
+    if anchor_point is None:
+        anchor_point = textbox_data.anchor_point
+    if textbox_data.grid4 is not None:
+        grid4_x, grid4_y = textbox_data.grid4
+        tb_anchor_x = int(image_width//4*grid4_x)
+        tb_anchor_y = int(image_height//4*grid4_y)
+
+        if anchor_point is not None: # if there is anchor point data, use it to fine-tune.
+            x_adjust, y_adjust = anchor_point
+            tb_anchor_x = tb_anchor_x + x_adjust
+            tb_anchor_y = tb_anchor_y - y_adjust
+    else:
+        tb_anchor_x, tb_anchor_y = anchor_point
+        tb_anchor_x = image_width/2 + tb_anchor_x
+        tb_anchor_y = image_height/2 - tb_anchor_y
+    return tb_anchor_x, tb_anchor_y
+
+def _wrap_words(line:str, box_width:int) -> Optional[List[str]]:
+    # greedy wrapping of plain words separated by single spaces, which is what textwrap does for such lines
+    # without its regular expressions; None if textwrap has to handle the line
+    # (other whitespace, hyphens it may break at, or words longer than the box).
+    if not line.isprintable() or "-" in line or "  " in line or line[0] == " " or line[-1] == " ":
+        return None
+    wrapped_lines = []
+    while len(line) > box_width:
+        # break at the last space that leaves the line within the box.
+        end = line.rfind(" ", 0, box_width + 1)
+        if end == -1:
+            return None
+        wrapped_lines.append(line[:end])
+        line = line[end + 1:]
+    wrapped_lines.append(line)
+    return wrapped_lines
+
+def wrap_content(content:List[str], box_width:int) -> List[str]:
+    wrapped_text = []
+    for line in content:
+        wrapped_lines = _wrap_words(line, box_width) if line != "" else None
+        if wrapped_lines is not None:
+            wrapped_text.extend(wrapped_lines)
+        elif line != "":
+            wrapped_text.extend(textwrap.wrap(line, width=box_width))
+        else:
+            wrapped_text.append("")
+    return wrapped_text
+
+def get_rotation(textbox_data:TextboxData, rotation_center:Tuple[float, float], image_size:Tuple[int, int]) -> Optional[int]:
+    # dynamic rotation tilts text in the upper part of the image towards the center, and leaves central text level.
+    rotate = textbox_data.rotate
+    dynamic_rotate = textbox_data.dynamic_rotate
+    if rotate is not None or dynamic_rotate is None:
+        return rotate
+    image_width, image_height = image_size
+    rotate_x, rotate_y = rotation_center
+    first_or_fourth_quadrant = rotate_x > image_width//2
+    first_or_second_quadrant = rotate_y < image_height*2//3
+    if (first_or_fourth_quadrant and first_or_second_quadrant):
+        rotate = -dynamic_rotate
+    elif (not first_or_fourth_quadrant and first_or_second_quadrant):
+        rotate = dynamic_rotate
+    if image_width*2//5 < rotate_x < image_width*3//5:
+        rotate = 0
+    return rotate
+
+def _get_margin(subtitle_profile:SubtitleProfile) -> int:
+    margins = [subtitle_profile.font_data.stroke_size or 0]
+    for outline_data in [subtitle_profile.outline_data_1, subtitle_profile.outline_data_2]:
+        if outline_data is not None:
+            margins.append((outline_data.radius or 0) + (outline_data.blur_strength or 0))
+    return max(margins)
+
+def get_text_layout(
+        subtitle_profile:SubtitleProfile, content:List[str], image_size:Tuple[int, int], anchor_point:tuple=None,
+        measure_text:Callable=None
+) -> Optional[TextLayout]:
+    # layout of validated subtitle data; None if there is no text. anchor_point overrides the profile's anchor point.
+    # measure_text(font_style, font_size, text) measures lines; exact by default.
+    if measure_text is None:
+        measure_text = get_text_width
+    font_data = subtitle_profile.font_data
+    textbox_data = subtitle_profile.textbox_data
+    alignment = textbox_data.alignment
+    push = textbox_data.push
+    image_width, image_height = image_size
+    tb_anchor_x, tb_anchor_y = get_anchor(textbox_data, image_size, anchor_point=anchor_point)
+
+    wrapped_text = wrap_content(content, textbox_data.box_width)
+    if not wrapped_text:
+        return None
+    line_height = get_line_height(font_data.style, font_data.size)
+    num_lines = len(wrapped_text)
+    sum_text_height = num_lines * line_height
+    text_widths = [measure_text(font_data.style, font_data.size, line) for line in wrapped_text]
+
+    left = image_width
+    right = 0
+    up = image_height
+    down = 0
+    for text_width in text_widths:
+        if alignment == "left":
+            left = min(left, tb_anchor_x)
+            right = max(right, tb_anchor_x + text_width)
+        elif alignment == "center":
+            left = min(left, tb_anchor_x - text_width/2)
+            right = max(right, tb_anchor_x + text_width/2)
+        elif alignment == "right":
+            left = min(left, tb_anchor_x - text_width)
+            right = max(right, tb_anchor_x)
+    if push == "up":
+        up = min(up, tb_anchor_y)
+        down = max(down, tb_anchor_y + sum_text_height)
+    elif push == "down":
+        up = min(up, tb_anchor_y + sum_text_height)
+        down = max(down, tb_anchor_y)
+    elif push == "center":
+        up = min(up, tb_anchor_y + sum_text_height)
+        down = max(down, tb_anchor_y)
+
+    lines = []
+    for i, (line, text_width) in enumerate(zip(wrapped_text, text_widths)):
+        if alignment == "left":
+            x = tb_anchor_x + text_width/2 - text_width/2
+        elif alignment == "center":
+            x = tb_anchor_x - text_width/2
+        elif alignment == "right":
+            x = tb_anchor_x - text_width/2 - text_width/2
+        else:
+            raise ValueError(f"Invalid alignment value {alignment}.")
+        if push == "up":
+            y = tb_anchor_y - line_height*(num_lines-i)
+        elif push == "down":
+            y = tb_anchor_y - line_height*(num_lines-i) + sum_text_height
+        elif push == "center":
+            y = tb_anchor_y - line_height*(num_lines-i) + sum_text_height//2
+        else:
+            raise ValueError(f"Invalid push value {push}.")
+        lines.append(LineLayout(line, x, y, text_width))
+
+    rotation_center = ((right + left)/2, (up + down)/2)
+    rotate = get_rotation(textbox_data, rotation_center, image_size)
+    return TextLayout(
+        lines, line_height, left, right, up, down, rotate=rotate,
+        rotation_center=rotation_center if rotate is not None else None, margin=_get_margin(subtitle_profile),
+        anchor=(tb_anchor_x, tb_anchor_y), text_height=get_text_height(font_data.style, font_data.size),
+    )
+
+def get_subtitle_content(subtitle:Subtitle) -> Optional[List[str]]:
+    # content with the profile's default text prepended to the first line.
+    content = subtitle.content
+    default_text = subtitle.subtitle_profile.default_text
+    if default_text is not None:
+        if content is None or len(content) == 0:
+            return [default_text]
+        return [default_text + content[0]] + list(content[1:])
+    return content
+
+def get_orbit_anchor_point(orbit_profile:SubtitleProfile, box:Dict[str, float], image_size:Tuple[int, int]) -> tuple:
+    # orbits are anchored relative to the points of the main text box named by their centrix, e.g. ["l", "u"]
+    # for the upper left corner; several letters average their points.
+    left, right, up, down = box["left"], box["right"], box["up"], box["down"]
+    points_x = {"l": left, "c": (left + right)/2, "r": right}
+    points_y = {"u": up, "c": (up + down)/2, "d": down}
+    centrix = orbit_profile.centrix
+    if centrix is None:
+        centrix = ["c", "c"]
+    anchor_point = orbit_profile.textbox_data.anchor_point
+    xs = [points_x[s.lower()] for s in centrix[0]]
+    ys = [points_y[s.lower()] for s in centrix[1]]
+    centrix_x = int(sum(xs)/len(xs)) - image_size[0]//2
+    centrix_y = int(sum(ys)/len(ys)) - image_size[1]//2
+    return (anchor_point[0]+centrix_x, anchor_point[1]+centrix_y)
+
+def get_subtitle_layouts(subtitle:Subtitle, image_size:Tuple[int, int], measure_text:Callable=None) -> List[TextLayout]:
+    # layouts of a validated subtitle and its orbits, in drawing order; orbits are only drawn around a main text box.
+    # subtitles without content are not drawn, even with default text.
+    if subtitle.content is None:
+        return []
+    content = get_subtitle_content(subtitle)
+    if not content:
+        return []
+    text_layout = get_text_layout(subtitle.subtitle_profile, content, image_size, measure_text=measure_text)
+    if text_layout is None:
+        return []
+    layouts = [text_layout]
+    for orbit_profile in subtitle.subtitle_profile.orbits or []:
+        orbit_content = get_subtitle_content(Subtitle(subtitle_profile=orbit_profile))
+        if not orbit_content:
+            continue
+        anchor_point = get_orbit_anchor_point(orbit_profile, text_layout.get_box(), image_size)
+        orbit_layout = get_text_layout(orbit_profile, orbit_content, image_size, anchor_point=anchor_point, measure_text=measure_text)
+        if orbit_layout is not None:
+            layouts.append(orbit_layout)
+    return layouts
@@ -0,0 +1,121 @@
+import logging
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from kksubs.model.layout import TextLayout
+
+logger = logging.getLogger(__name__)
+
+# checks text placement over whole drafts from the text layout alone, without rendering:
+# subtitles that overlap each other, text that runs off the frame, and orbits that collide with other text.
+
+OVERLAP = "overlap"
+OFF_FRAME = "off_frame"
+ORBIT_COLLISION = "orbit_collision"
+
+class LintIssue:
+
+    def __init__(self, kind:str, text_id:str, image_id:str, line_number:int=None, message:str=None):
+        """
+        A placement problem in one frame.
+        :param kind: OVERLAP, OFF_FRAME or ORBIT_COLLISION.
+        :param line_number: 1-based draft line of the subtitle, if known; orbits report their subtitle's line.
+        """
+        self.kind = kind
+        self.text_id = text_id
+        self.image_id = image_id
+        self.line_number = line_number
+        self.message = message
+
+    def __str__(self):
+        location = self.text_id if self.line_number is None else f"{self.text_id}:{self.line_number}"
+        return f"{location}: {self.image_id}: {self.kind}: {self.message}"
+
+    def to_dict(self) -> Dict:
+        return {
+            "kind": self.kind, "text_id": self.text_id, "image_id": self.image_id,
+            "line_number": self.line_number, "message": self.message,
+        }
+
+
+class PlacedText:
+
+    def __init__(self, layout:TextLayout, subtitle_index:int, orbit_index:int=None, line_number:int=None):
+        """
+        A subtitle's text or one of its orbits, placed on a frame.
+        :param subtitle_index: position of the subtitle in its group.
+        :param orbit_index: position of the orbit in the subtitle's profile, or None for the subtitle's own text.
+        """
+        self.layout = layout
+        self.subtitle_index = subtitle_index
+        self.orbit_index = orbit_index
+        self.line_number = line_number
+        self.bounds = layout.get_bounds()
+
+    def get_name(self) -> str:
+        if self.orbit_index is None:
+            return f"subtitle {self.subtitle_index+1}"
+        return f"orbit {self.orbit_index+1} of subtitle {self.subtitle_index+1}"
+
+
+def get_intersecting_pairs(bounds:Sequence[Tuple[float, float, float, float]], tolerance:float=None) -> List[Tuple[int, int]]:
+    # pairs of (x0, y0, x1, y1) boxes that overlap by more than tolerance on both axes.
+    # sort and sweep along x: each box is only compared with the boxes whose x range it reaches,
+    # so a frame costs O(n log n) plus the overlaps found rather than O(n^2).
+    if tolerance is None:
+        tolerance = 0
+    order = sorted(range(len(bounds)), key=lambda index: bounds[index][0])
+    pairs = []
+    active = []
+    for index in order:
+        x0, y0, x1, y1 = bounds[index]
+        active = [other for other in active if bounds[other][2] - tolerance > x0]
+        for other in active:
+            other_y0, other_y1 = bounds[other][1], bounds[other][3]
+            if min(y1, other_y1) - max(y0, other_y0) > tolerance:
+                pairs.append((min(index, other), max(index, other)))
+        active.append(index)
+    return sorted(pairs)
+
+def lint_frame(
+        text_id:str, image_id:str, placed_texts:List[PlacedText], image_size:Tuple[int, int], tolerance:float=None
+) -> List[LintIssue]:
+    """
+    Checks the texts placed on a frame.
+    :param tolerance: pixels of overlap (or of text past the frame edge) to allow.
+    """
+    if tolerance is None:
+        tolerance = 0
+    image_width, image_height = image_size
+    issues = []
+    for placed_text in placed_texts:
+        x0, y0, x1, y1 = placed_text.bounds
+        if x0 < -tolerance or y0 < -tolerance or x1 > image_width + tolerance or y1 > image_height + tolerance:
+            issues.append(LintIssue(
+                OFF_FRAME, text_id, image_id, line_number=placed_text.line_number,
+                message=f"{placed_text.get_name()} spans ({x0:.0f}, {y0:.0f})-({x1:.0f}, {y1:.0f}), outside the {image_width}x{image_height} frame.",
+            ))
+    for index, other_index in get_intersecting_pairs([placed_text.bounds for placed_text in placed_texts], tolerance=tolerance):
+        placed_text, other = placed_texts[index], placed_texts[other_index]
+        if placed_text.subtitle_index == other.subtitle_index and placed_text.orbit_index is None and other.orbit_index is None:
+            continue
+        kind = OVERLAP if placed_text.orbit_index is None and other.orbit_index is None else ORBIT_COLLISION
+        issues.append(LintIssue(
+            kind, text_id, image_id, line_number=placed_text.line_number,
+            message=f"{placed_text.get_name()} overlaps {other.get_name()}" + (
+                f" (line {other.line_number})." if other.line_number is not None and other.line_number != placed_text.line_number else "."
+            ),
+        ))
+    return issues
+
+def get_placed_texts(subtitle_layouts:List[List[TextLayout]], line_numbers:Optional[List[int]]=None) -> List[PlacedText]:
+    # subtitle_layouts holds the layouts of each subtitle in a group, its own text followed by its orbits.
+    placed_texts = []
+    for subtitle_index, layouts in enumerate(subtitle_layouts):
+        line_number = None
+        if line_numbers is not None and subtitle_index < len(line_numbers):
+            line_number = line_numbers[subtitle_index]
+        for orbit_index, layout in enumerate(layouts):
+            placed_texts.append(PlacedText(
+                layout, subtitle_index, orbit_index=orbit_index-1 if orbit_index else None, line_number=line_number
+            ))
+    return placed_texts
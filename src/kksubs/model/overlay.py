@@ -0,0 +1,40 @@
+import logging
+import os
+import shutil
+
+from PIL import Image, ImageChops
+
+logger = logging.getLogger(__name__)
+
+# transparent overlay outputs: the subtitle layer of each frame as an RGBA PNG, for compositing in a video editor.
+# composited over the frame, an overlay gives the rendered frame. layer effects and outlines blurred into the background
+# need the frame, so they are either left out (blurred outlines are then blurred on their own) or included as a delta.
+
+def get_overlay_path(output_image_path:str) -> str:
+    # overlays are always PNG, for the alpha channel.
+    return os.path.splitext(output_image_path)[0] + ".png"
+
+def get_delta_overlay(base_image:Image.Image, image:Image.Image) -> Image.Image:
+    # the pixels of image that differ from base_image, opaque, on a transparent background.
+    image = image.convert("RGB")
+    difference = ImageChops.difference(base_image.convert("RGB"), image)
+    red, green, blue = difference.split()
+    mask = ImageChops.lighter(ImageChops.lighter(red, green), blue).point(lambda value: 255 if value else 0)
+    overlay = image.convert("RGBA")
+    overlay.putalpha(mask)
+    return overlay
+
+def unlink_shared(path:str):
+    # removes a file that is hard linked elsewhere, so that writing to its path does not change the other links.
+    if os.path.exists(path) and os.stat(path).st_nlink > 1:
+        os.remove(path)
+
+def link_file(source:str, destination:str):
+    # hard links share the data of identical outputs on disk; files are copied where links are not supported.
+    if os.path.exists(destination):
+        os.remove(destination)
+    try:
+        os.link(source, destination)
+    except OSError as e:
+        logger.debug(f"Could not link {destination} to {source} ({e!r}), copying instead.")
+        shutil.copyfile(source, destination)
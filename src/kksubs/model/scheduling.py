@@ -0,0 +1,133 @@
+import heapq
+import logging
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from PIL import Image
+
+from kksubs.model.domain_models import LayerData, SubtitleGroup, SubtitleProfile
+
+logger = logging.getLogger(__name__)
+
+# render costs are estimated in passes over a one-megapixel frame, from the resolved subtitle profiles.
+# the weights below are rough measurements; the logged estimated and actual times per frame can be used to tune them.
+COSTS = {
+    "frame": 2.0, # decoding and encoding the frame.
+    "layer": 1.0, # allocating and pasting a full-frame text or outline layer.
+    "rotate": 1.0, # rotating a full-frame layer.
+    "outline_blur": 4.0, # blurring an outline layer and the image under it.
+    "asset": 1.0,
+    "glyphs": 2.0, # drawing one megapixel of glyph area.
+    "brightness": 1.0,
+    "gaussian_blur": 3.0,
+    "motion_blur": 2.0,
+    "motion_blur_per_kernel": 0.5, # per kernel row/column, up to where filter2D switches to a DFT.
+    "radial_blur": 20.0,
+    "radial_blur_per_kernel": 0.2,
+    "focus_mask": 4.0, # building and blurring the circular rejection mask.
+}
+MAX_DIRECT_KERNEL_SIZE = 11
+
+def get_layer_data_cost(layer_data:LayerData) -> float:
+    # mirrors the order of effects in _apply_layer_data_to_image: only the first active effect is applied.
+    is_focus_mask = layer_data.f_coords is not None or layer_data.f_radius is not None or layer_data.f_blur is not None
+    if layer_data.brightness is not None:
+        cost = COSTS["brightness"]
+    elif layer_data.gaussian_blur is not None:
+        cost = COSTS["gaussian_blur"]
+    elif layer_data.motion_blur is not None or layer_data.motion_rotate is not None:
+        kernel_size = min(layer_data.motion_blur or 0, MAX_DIRECT_KERNEL_SIZE)
+        cost = COSTS["motion_blur"] + COSTS["motion_blur_per_kernel"]*kernel_size
+    elif layer_data.radial_blur is not None or layer_data.radial_coords is not None:
+        return COSTS["radial_blur"] + COSTS["radial_blur_per_kernel"]*(layer_data.radial_blur or 50)
+    else:
+        return 0.0
+    if is_focus_mask:
+        cost += COSTS["focus_mask"]
+    return cost
+
+def get_subtitle_profile_cost(
+        subtitle_profile:SubtitleProfile, content:Optional[List[str]], megapixels:float, scale:float=None
+) -> float:
+    # cost of applying one subtitle (and its orbits) to a frame of the given size.
+    # scale: proof scale, by which font sizes are reduced.
+    if scale is None:
+        scale = 1
+    cost = 0.0
+    if subtitle_profile.layer_data is not None:
+        cost += get_layer_data_cost(subtitle_profile.layer_data)*megapixels
+    if subtitle_profile.asset_data is not None and subtitle_profile.asset_data.path is not None:
+        cost += COSTS["asset"]*megapixels
+
+    text_length = sum(len(line) for line in content or []) + len(subtitle_profile.default_text or "")
+    if text_length > 0:
+        outlines = [
+            outline_data for outline_data in [subtitle_profile.outline_data_1, subtitle_profile.outline_data_2]
+            if outline_data is not None
+        ]
+        # text layer and outline layers are allocated even if unused.
+        cost += 3*COSTS["layer"]*megapixels
+        textbox_data = subtitle_profile.textbox_data
+        if textbox_data is not None and (textbox_data.rotate or textbox_data.dynamic_rotate):
+            cost += 3*COSTS["rotate"]*megapixels
+        cost += sum(COSTS["outline_blur"]*megapixels for outline_data in outlines if outline_data.blur_strength)
+
+        font_data = subtitle_profile.font_data
+        font_size = font_data.size if font_data is not None and font_data.size is not None else 0
+        stroke_sizes = [outline_data.radius or 0 for outline_data in outlines]
+        if font_data is not None:
+            stroke_sizes.append(font_data.stroke_size or 0)
+        # each glyph is drawn once per layer.
+        glyph_area = text_length*((font_size + 2*max(stroke_sizes, default=0))*scale)**2/1e6
+        cost += COSTS["glyphs"]*glyph_area*(1 + len(outlines))
+
+        # orbits are placed around the text, and are not drawn without it.
+        for orbit in subtitle_profile.orbits or []:
+            cost += get_subtitle_profile_cost(orbit, None, megapixels, scale=scale)
+    return cost
+
+def estimate_render_cost(subtitle_group:Optional[SubtitleGroup], image_size:Tuple[int, int], proof_scale:float=None) -> float:
+    # estimated cost of rendering a frame; subtitle groups must be validated, so that their profiles are resolved.
+    if proof_scale is None:
+        proof_scale = 1
+    megapixels = image_size[0]*image_size[1]*proof_scale**2/1e6
+    cost = COSTS["frame"]*megapixels
+    if subtitle_group is None:
+        return cost
+    for subtitle in subtitle_group.subtitle_list:
+        if subtitle.subtitle_profile is None:
+            continue
+        # subtitles without content cost only what they draw without text: their layer effects, asset and default text.
+        cost += get_subtitle_profile_cost(subtitle.subtitle_profile, subtitle.content, megapixels, scale=proof_scale)
+    return cost
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+def _get_png_size(header:bytes) -> Optional[Tuple[int, int]]:
+    # a PNG starts with its signature and the IHDR chunk, which holds the width and height as big-endian integers.
+    if len(header) < 24 or not header.startswith(PNG_SIGNATURE) or header[12:16] != b"IHDR":
+        return None
+    return int.from_bytes(header[16:20], "big"), int.from_bytes(header[20:24], "big")
+
+def get_image_size(image_path:str, image_sizes:Dict[str, Tuple[int, int]]=None) -> Tuple[int, int]:
+    # reads only the image header; PNG headers are parsed directly, which is much cheaper than opening the image.
+    if image_sizes is not None and image_path in image_sizes:
+        return image_sizes[image_path]
+    with open(image_path, "rb") as reader:
+        size = _get_png_size(reader.read(24))
+    if size is None:
+        with Image.open(image_path) as image:
+            size = image.size
+    if image_sizes is not None:
+        image_sizes[image_path] = size
+    return size
+
+def estimate_makespan(costs:Sequence[float], workers:int) -> float:
+    # total cost on the busiest worker, if each job goes to the least loaded worker in the given order.
+    loads = [0.0]*max(1, workers)
+    for cost in costs:
+        heapq.heapreplace(loads, loads[0] + cost)
+    return max(loads)
+
+def get_longest_first_order(costs:Sequence[float]) -> List[int]:
+    # job indices, most expensive first; workers that take the next job when free then balance the load.
+    return sorted(range(len(costs)), key=lambda index: -costs[index])
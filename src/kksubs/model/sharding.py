@@ -0,0 +1,110 @@
+import glob
+import heapq
+import json
+import logging
+import os
+import zlib
+from typing import Dict, List, Sequence, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+# splits a batch render across nodes that share the output directory, without a coordinator.
+# every node computes the same partition of the (draft, image) jobs, renders its own shard,
+# and records the outputs it wrote in a shard manifest in the output directory.
+
+HASH = "hash"
+COST = "cost"
+
+def parse_shard(shard:Union[Tuple[int, int], str]) -> Tuple[int, int]:
+    # (index, count), or "index/count".
+    if isinstance(shard, str):
+        index, _, count = shard.partition("/")
+        shard = (int(index), int(count))
+    index, count = shard
+    if count < 1 or not 0 <= index < count:
+        raise ValueError(f"Invalid shard {index}/{count}: the index must be in [0, count).")
+    return index, count
+
+def get_output_key(text_id:str, image_id:str) -> str:
+    # path of the output image relative to the output directory.
+    return f"{os.path.splitext(text_id)[0]}/{image_id}"
+
+def get_hash_shard_index(key:str, count:int) -> int:
+    # crc32 is stable across processes and machines, unlike hash().
+    return zlib.crc32(key.encode("utf-8")) % count
+
+def partition_keys(keys:Sequence[str], count:int, method:str=None, costs:Sequence[float]=None) -> List[List[int]]:
+    # returns the indices of the keys in each shard.
+    # hash: each key goes to a fixed shard, so shards stay stable when jobs are added or removed.
+    # cost: the most expensive jobs are spread first, each to the least loaded shard, which balances the shards.
+    if method is None:
+        method = HASH
+    shards = [[] for _ in range(count)]
+    if method == HASH:
+        for index, key in enumerate(keys):
+            shards[get_hash_shard_index(key, count)].append(index)
+    elif method == COST:
+        if costs is None:
+            raise ValueError("Cost-balanced sharding requires job costs.")
+        # ties are broken by key and shard index, so every node computes the same partition.
+        order = sorted(range(len(keys)), key=lambda index: (-costs[index], keys[index]))
+        loads = [(0.0, shard_index) for shard_index in range(count)]
+        for index in order:
+            load, shard_index = heapq.heappop(loads)
+            shards[shard_index].append(index)
+            heapq.heappush(loads, (load + costs[index], shard_index))
+        for shard in shards:
+            shard.sort()
+    else:
+        raise ValueError(f"Unknown shard method {method}.")
+    return shards
+
+def get_manifest_path(output_directory:str, index:int, count:int) -> str:
+    return os.path.join(output_directory, f".kksubs-shard-{index}-of-{count}.json")
+
+def write_manifest(output_directory:str, shard:Tuple[int, int], method:str, keys:List[str]):
+    index, count = shard
+    os.makedirs(output_directory, exist_ok=True)
+    manifest_path = get_manifest_path(output_directory, index, count)
+    with open(manifest_path, "w", encoding="utf-8") as writer:
+        json.dump({"shard": [index, count], "method": method, "outputs": sorted(keys)}, writer, indent=2)
+    logger.info(f"Wrote shard manifest {manifest_path} with {len(keys)} outputs.")
+
+def read_manifests(output_directory:str, count:int=None) -> Dict[int, Dict]:
+    # shard manifests in the output directory by shard index. if count is None, manifests of all shard counts are read.
+    pattern = f".kksubs-shard-*-of-{'*' if count is None else count}.json"
+    manifests = dict()
+    for manifest_path in sorted(glob.glob(os.path.join(output_directory, pattern))):
+        with open(manifest_path, "r", encoding="utf-8") as reader:
+            manifest = json.load(reader)
+        if count is None and manifests and manifest["shard"][1] != next(iter(manifests.values()))["shard"][1]:
+            raise ValueError(f"Output directory {output_directory} holds manifests of different shard counts.")
+        manifests[manifest["shard"][0]] = manifest
+    return manifests
+
+def verify_shards(output_directory:str, expected_keys:Sequence[str], count:int=None) -> Dict:
+    # checks that every expected output was written by exactly one shard and exists on disk.
+    manifests = read_manifests(output_directory, count=count)
+    if count is None and manifests:
+        count = next(iter(manifests.values()))["shard"][1]
+
+    shards_by_key = dict()
+    for index, manifest in manifests.items():
+        for key in manifest["outputs"]:
+            shards_by_key.setdefault(key, []).append(index)
+    expected_key_set = set(expected_keys)
+
+    report = {
+        "shard_count": count,
+        "missing_shards": sorted(set(range(count or 0)) - set(manifests.keys())),
+        "missing": sorted(
+            key for key in expected_key_set
+            if key not in shards_by_key or not os.path.exists(os.path.join(output_directory, key))
+        ),
+        "duplicated": sorted(key for key, indices in shards_by_key.items() if len(indices) > 1),
+        "unexpected": sorted(set(shards_by_key.keys()) - expected_key_set),
+    }
+    report["is_complete"] = count is not None and not any(
+        report[name] for name in ["missing_shards", "missing", "duplicated", "unexpected"]
+    )
+    return report
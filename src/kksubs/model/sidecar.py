@@ -0,0 +1,96 @@
+import json
+import logging
+import os
+from typing import Dict, List, Optional, Tuple
+
+from kksubs.model.domain_models import SubtitleGroup
+from kksubs.model.layout import get_subtitle_layouts
+
+logger = logging.getLogger(__name__)
+
+# layout sidecars: the text geometry of every rendered frame of a draft, written next to its output folder,
+# so that later tools can re-composite subtitle regions without rendering or diffing pixels again.
+# json: one object for the draft, {"text_id": ..., "frames": [...]}.
+# jsonl: one frame per line.
+# a frame is {"image_id", "output", "size", "subtitles"}; each subtitle is its TextLayout.to_dict() with its orbits
+# under "orbits", in drawing order. coordinates are in pixels of the output image (so proofs are scaled).
+
+JSON = "json"
+JSONL = "jsonl"
+LAYOUT_FORMATS = [JSON, JSONL]
+
+def get_sidecar_path(output_directory:str, text_id:str, layout_format:str, shard:Tuple[int, int]=None) -> str:
+    # output_directory/<draft name>.layout.<format>; shards write their own sidecars, as they share the output directory.
+    name = os.path.splitext(text_id)[0]
+    if shard is not None:
+        name = f"{name}.shard-{shard[0]}-of-{shard[1]}"
+    return os.path.join(output_directory, f"{name}.layout.{layout_format}")
+
+def get_frame_layout(
+        subtitle_group:Optional[SubtitleGroup], image_size:Tuple[int, int], proof_scale:float=None
+) -> List[Dict]:
+    # the geometry the renderer uses for a validated subtitle group, on an output image of the given size.
+    if subtitle_group is None:
+        return []
+    if proof_scale is not None:
+        subtitle_group = subtitle_group.get_scaled(proof_scale)
+    subtitles = []
+    for subtitle in subtitle_group.subtitle_list:
+        layouts = get_subtitle_layouts(subtitle, image_size)
+        if not layouts:
+            continue
+        subtitle_dict = layouts[0].to_dict()
+        subtitle_dict["orbits"] = [layout.to_dict() for layout in layouts[1:]]
+        subtitles.append(subtitle_dict)
+    return subtitles
+
+
+class LayoutSidecarWriter:
+
+    def __init__(self, output_directory:str, layout_format:str=None, shard:Tuple[int, int]=None):
+        """
+        Collects frame layouts while a batch renders, and writes one sidecar per draft when closed.
+        Frames are written in the order they were added to each draft's jobs, not the order they finished.
+        :param layout_format: JSON or JSONL (default).
+        """
+        if layout_format is None:
+            layout_format = JSONL
+        if layout_format not in LAYOUT_FORMATS:
+            raise ValueError(f"Invalid layout format {layout_format}, expected one of {LAYOUT_FORMATS}.")
+        self.output_directory = output_directory
+        self.layout_format = layout_format
+        self.shard = shard
+        self._frames_by_text_id:Dict[str, Dict[str, Dict]] = dict()
+
+    def reserve(self, text_id:str, output:str):
+        # reserves the position of an output in its draft's sidecar.
+        self._frames_by_text_id.setdefault(text_id, dict()).setdefault(output, None)
+
+    def add(
+            self, text_id:str, image_id:str, output:str, subtitle_group:Optional[SubtitleGroup], image_size:Tuple[int, int],
+            proof_scale:float=None
+    ):
+        frames = self._frames_by_text_id.setdefault(text_id, dict())
+        frames[output] = {
+            "image_id": image_id,
+            "output": output,
+            "size": list(image_size),
+            "subtitles": get_frame_layout(subtitle_group, image_size, proof_scale=proof_scale),
+        }
+
+    def close(self) -> List[str]:
+        # writes the sidecars and returns their paths; frames that were never added (e.g. failed) are left out.
+        paths = []
+        for text_id, frames in self._frames_by_text_id.items():
+            frames = [frame for frame in frames.values() if frame is not None]
+            path = get_sidecar_path(self.output_directory, text_id, self.layout_format, shard=self.shard)
+            os.makedirs(self.output_directory, exist_ok=True)
+            with open(path, "w", encoding="utf-8") as writer:
+                if self.layout_format == JSONL:
+                    for frame in frames:
+                        writer.write(json.dumps(frame, separators=(",", ":")) + "\n")
+                else:
+                    json.dump({"text_id": text_id, "frames": frames}, writer, separators=(",", ":"))
+            logger.info(f"Wrote layouts of {len(frames)} frames to {path}.")
+            paths.append(path)
+        return paths
@@ -1,37 +1,139 @@
+import contextlib
+import copy
+import io
 import logging
+import math
 import os.path
-import textwrap
-from typing import Dict, List, Union
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
 
 from PIL import Image, ImageDraw, ImageFont, ImageFilter, ImageEnhance
-from kksubs.image.gaussian_blur import apply_gaussian_blur, cfr_apply_gaussian_blur
-from kksubs.image.motion_blur import apply_motion_blur, cfr_apply_motion_blur
-from kksubs.image.radial_blur import apply_radial_blur
-from kksubs.image.brightness import adjust_brightness, cfr_adjust_brightness
-from kksubs.image.utils import apply_image
+from kksubs.image.utils import apply_image, get_image_placement, get_scaled_size, load_image, scale_image
 
+from kksubs.model import engines, instrumentation
+from kksubs.model.cache_services import BackgroundCache, FrameCache, get_digest
 from kksubs.model.data_access_services import SubtitleDataAccessService
-from kksubs.model.domain_models import LayerData, Subtitle, SubtitleGroup, SubtitleProfile
+from kksubs.model.diagnostics import FrameProfiler, record_layers
+from kksubs.model.frame_transport import ProcessRenderer
+from kksubs.model.journal import JOURNAL_FILENAME, RenderJournal, get_input_hash
+from kksubs.model.layout import (
+    TextLayout, get_approximate_text_width, get_font, get_orbit_anchor_point, get_rotated_bounds, get_subtitle_content,
+    get_subtitle_layouts, get_text_layout
+)
+from kksubs.model.lint import LintIssue, get_placed_texts, lint_frame
+from kksubs.model.overlay import get_delta_overlay, get_overlay_path, link_file, unlink_shared
+from kksubs.model.sidecar import LayoutSidecarWriter
+from kksubs.model.sharding import COST, HASH, get_output_key, parse_shard, partition_keys, verify_shards, write_manifest
+from kksubs.model.scheduling import estimate_makespan, estimate_render_cost, get_image_size, get_longest_first_order
+from kksubs.model.domain_models import LayerData, Subtitle, SubtitleGroup, SubtitleProfile, coalesce
 from kksubs.model.validate import validate_subtitle_group
-import numpy as np
 
 logger = logging.getLogger(__name__)
 
 
 
-def _get_text_dimensions(text_string, font, default_text_width=None, default_text_height=None):
-    if text_string == "":
-        return default_text_width, default_text_height
-    ascent, descent = font.getmetrics()
+def _paste_layer(image:Image.Image, layer:Image.Image, is_overlay:bool=False, position:Tuple[int, int]=None):
+    # pastes a layer through its own alpha, at position on the image (a full-size layer by default);
+    # the layer may reach outside the image.
+    # overlays are transparent, so layers are alpha composited onto them instead; composited over the frame,
+    # the overlay then gives the same result as pasting the layers onto the frame.
+    if position is None:
+        position = (0, 0)
+    x, y = position
+    if is_overlay:
+        # alpha_composite only takes positions within the image.
+        if layer.width + x > 0 and layer.height + y > 0:
+            image.alpha_composite(layer.convert("RGBA"), dest=(max(x, 0), max(y, 0)), source=(max(-x, 0), max(-y, 0)))
+    else:
+        image.paste(layer, position, layer)
+
+def _get_frame_layer(image:Image.Image, layer:Image.Image, position:Tuple[int, int]) -> Image.Image:
+    # a layer of the image's size, for the steps that work on whole layers.
+    if layer.size == image.size and position == (0, 0):
+        return layer
+    frame_layer = Image.new(layer.mode, image.size, (0, 0, 0, 0))
+    frame_layer.paste(layer, position)
+    return frame_layer
+
+_ROTATE_RESAMPLING = {engines.NEAREST: Image.NEAREST, engines.BILINEAR: Image.BILINEAR, engines.BICUBIC: Image.BICUBIC}
+
+def _get_rotation_matrix(rotate:float, rotation_center:Tuple[float, float]) -> List[float]:
+    # the affine matrix (from output to input pixels) Image.rotate computes.
+    center_x, center_y = rotation_center
+    angle = -math.radians(rotate % 360.0)
+    a, b = round(math.cos(angle), 15), round(math.sin(angle), 15)
+    d, e = round(-math.sin(angle), 15), round(math.cos(angle), 15)
+    return [a, b, a*-center_x + b*-center_y + center_x, d, e, d*-center_x + e*-center_y + center_y]
 
-    text_width = font.getmask(text_string).getbbox()[2]
-    text_height = font.getmask(text_string).getbbox()[3] + descent
+def _get_offset_translation(translation:float, x_factor:float, y_factor:float, x_offset:int, y_offset:int, input_offset:int) -> float:
+    # translation of the matrix for an output offset by (x_offset, y_offset) reading an input offset by input_offset,
+    # such that pillow's 16.16 fixed point nearest resampling picks the same input pixels as without the offsets.
+    def fix(value):
+        return math.floor(value*65536.0 + 0.5)
+    half = x_factor*0.5 + y_factor*0.5
+    fixed = fix(translation + half) + x_offset*fix(x_factor) + y_offset*fix(y_factor) - input_offset*65536
+    return fixed/65536.0 - half
+
+def _rotate_layer(
+        layer:Image.Image, rotate:float, rotation_center:Tuple[float, float], box:Optional[Tuple[int, int, int, int]],
+        resample=None
+) -> Image.Image:
+    # rotates a layer as layer.rotate(rotate, center=rotation_center, resample=resample) does, reading only box,
+    # which holds all of the layer's visible pixels, and writing only where box is rotated to.
+    if resample is None:
+        resample = Image.NEAREST
+    if rotate % 180 == 0:
+        # pillow rotates by half turns with a different resampler.
+        return layer.rotate(rotate, center=rotation_center, resample=resample)
+    rotated_layer = Image.new(layer.mode, layer.size, (0, 0, 0, 0))
+    if box is None:
+        return rotated_layer
+    x0, y0, x1, y1 = get_rotated_bounds(box, rotate, rotation_center)
+    # two pixels of padding cover rounding, and the neighbours bicubic resampling reads.
+    region = (
+        max(0, math.floor(x0) - 2), max(0, math.floor(y0) - 2),
+        min(layer.width, math.ceil(x1) + 2), min(layer.height, math.ceil(y1) + 2),
+    )
+    if region[2] <= region[0] or region[3] <= region[1]:
+        return rotated_layer
+    a, b, c, d, e, f = _get_rotation_matrix(rotate, rotation_center)
+    if resample == Image.NEAREST:
+        c = _get_offset_translation(c, a, b, region[0], region[1], box[0])
+        f = _get_offset_translation(f, d, e, region[0], region[1], box[1])
+    else:
+        c = c + a*region[0] + b*region[1] - box[0]
+        f = f + d*region[0] + e*region[1] - box[1]
+    rotated_region = layer.crop(box).transform(
+        (region[2] - region[0], region[3] - region[1]), Image.AFFINE, (a, b, c, d, e, f), resample=resample
+    )
+    rotated_layer.paste(rotated_region, region[:2])
+    return rotated_layer
+
+def _encode_preview(image:Image.Image, image_format:str) -> bytes:
+    buffer = io.BytesIO()
+    if image_format.upper() == "PNG":
+        # favour encoding speed over file size for interactive use.
+        image.save(buffer, format="PNG", compress_level=1)
+    else:
+        image.save(buffer, format=image_format)
+    return buffer.getvalue()
 
-    return text_width, text_height
+def _is_numpy_composited(image:Image.Image, is_overlay:bool) -> bool:
+    return engines.get_engine(engines.COMPOSITE) == engines.NUMPY and not is_overlay and image.mode in ["RGB", "RGBA"]
 
-def apply_text_to_image(image:Image.Image, subtitle:Subtitle, get_box=None) -> Image.Image:
+def apply_text_to_image(
+        image:Image.Image, subtitle:Subtitle, get_box=None, is_overlay=None, under_layers:List=None
+) -> Image.Image:
+    # under_layers: layers (e.g. the subtitle's asset) composited under the text in the same pass, by the numpy compositor.
     if get_box is None:
         get_box = False
+    if is_overlay is None:
+        is_overlay = False
+    if under_layers is None:
+        under_layers = []
 
     # expand subtitle.
     subtitle_profile = subtitle.subtitle_profile
@@ -40,191 +142,215 @@ def apply_text_to_image(image:Image.Image, subtitle:Subtitle, get_box=None) -> I
     font_data = subtitle_profile.font_data
     outline_data_1 = subtitle_profile.outline_data_1
     outline_data_2 = subtitle_profile.outline_data_2
-    textbox_data = subtitle_profile.textbox_data
 
-    # extract image data
-    image_width, image_height = image.size
-    text_layer = Image.new("RGBA", image.size, (0, 0, 0, 0))
-    text_draw = ImageDraw.Draw(text_layer)
-    outline_1_layer = Image.new("RGBa", image.size, (0, 0, 0, 0))
-    outline_1_draw = ImageDraw.Draw(outline_1_layer)
-    outline_2_layer = Image.new("RGBa", image.size, (0, 0, 0, 0))
-    outline_2_draw = ImageDraw.Draw(outline_2_layer)
+    with instrumentation.stage("text_layout"):
+        text_layout = get_text_layout(subtitle_profile, content, image.size)
+        if text_layout is None:
+            if under_layers:
+                from kksubs.image.compositing import composite_layers
+                composite_layers(image, under_layers)
+            return image
 
     # extract text data
-    font_style = font_data.style
+    font = get_font(font_data.style, font_data.size)
     font_color = font_data.color
-    font_size = font_data.size
     font_stroke_size = font_data.stroke_size
     font_stroke_color = font_data.stroke_color
-    alignment = textbox_data.alignment
-    box_width = textbox_data.box_width
-    push = textbox_data.push
-    rotate = textbox_data.rotate
-    dynamic_rotate = textbox_data.dynamic_rotate
-
-    # TODO: move this out
-    if textbox_data.grid4 is not None:
-        grid4_x, grid4_y = textbox_data.grid4
-        tb_anchor_x = int(image_width//4*grid4_x)
-        tb_anchor_y = int(image_height//4*grid4_y)
-        
-        if textbox_data.anchor_point is not None: # if there is anchor point data, use it to fine-tune.
-            x_adjust, y_adjust = textbox_data.anchor_point
-            tb_anchor_x = tb_anchor_x + x_adjust
-            tb_anchor_y = tb_anchor_y - y_adjust
 
-    else:
-        tb_anchor_x, tb_anchor_y = textbox_data.anchor_point
-        tb_anchor_x = image_width/2 + tb_anchor_x
-        tb_anchor_y = image_height/2 - tb_anchor_y
-
-    font = ImageFont.truetype(font_style, font_size)
-    # this is used to standardize the heights of each horizontal text line, but might be a bad idea for different languages.
-    # maybe use vertical spacing in the future to avoid font-dependent height definition...
-    default_text_width, default_text_height = _get_text_dimensions("l", font)
-
-    # analyze text
-    wrapped_text = []
-    for line in content:
-        if line != "":
-            wrapped_text.extend(textwrap.wrap(line, width=box_width))
-        else:
-            wrapped_text.append("")
-    if not wrapped_text:
-        return image
-
-    text_dimensions = [_get_text_dimensions(line, font, default_text_width=default_text_width, default_text_height=default_text_height) for line in wrapped_text]
-    text_widths = list(map(lambda dim:dim[0], text_dimensions))
-    max_text_width = max(text_widths)
-    num_lines = len(wrapped_text)
-    sum_text_height = num_lines * default_text_height
-
-    # gather rotation arguments. (for future advanced rotation)
-    left = image_width
-    right = 0
-    up = image_height
-    down = 0
-    for line in wrapped_text:
-        text_width = font.getlength(line)
-        if alignment == "left":
-            left = min(left, tb_anchor_x)
-            right = max(right, tb_anchor_x + text_width)
-        elif alignment == "center":
-            left = min(left, tb_anchor_x - text_width/2)
-            right = max(right, tb_anchor_x + text_width/2)
-        elif alignment == "right":
-            left = min(left, tb_anchor_x - text_width)
-            right = max(right, tb_anchor_x)
-    if push == "up":
-        up = min(up, tb_anchor_y)
-        down = max(down, tb_anchor_y + sum_text_height)
-    elif push == "down":
-        up = min(up, tb_anchor_y + sum_text_height)
-        down = max(down, tb_anchor_y)
-    elif push == "center":
-        up = min(up, tb_anchor_y + sum_text_height)
-        down = max(down, tb_anchor_y)
-        pass
+    # position of the layers on the image; dilated layers only cover the whole image where they are rotated whole.
+    layer_position = (0, 0)
 
     # add text stage
-    for i, line in enumerate(wrapped_text):
-        text_width = font.getlength(line)
-
-        if alignment == "left":
-            x = tb_anchor_x + text_width/2 - text_width/2
-        elif alignment == "center":
-            x = tb_anchor_x - text_width/2
-        elif alignment == "right":
-            x = tb_anchor_x - text_width/2 - text_width/2
-        else:
-            raise ValueError(f"Invalid alignment value {alignment}.")
-        if push == "up":
-            y = tb_anchor_y - default_text_height*(num_lines-i)
-        elif push == "down":
-            y = tb_anchor_y - default_text_height*(num_lines-i) + sum_text_height
-        elif push == "center":
-            y = tb_anchor_y - default_text_height*(num_lines-i) + sum_text_height//2
+    with instrumentation.stage("rasterize"):
+        if engines.get_engine(engines.STROKE) == engines.DILATE:
+            # strokes is imported here, so that cv2 and numpy are only loaded by the dilate engine.
+            from kksubs.image.strokes import draw_local_text_layers, draw_text_layers
+            lines = [(line_layout.text, line_layout.x, line_layout.y) for line_layout in text_layout.lines]
+            outlines = [
+                None if outline_data is None else (outline_data.radius, outline_data.color)
+                for outline_data in [outline_data_1, outline_data_2]
+            ]
+            if not text_layout.rotate:
+                layer_position, text_layer, (outline_1_layer, outline_2_layer) = draw_local_text_layers(
+                    lines, font, font_color, stroke_size=font_stroke_size, stroke_fill=font_stroke_color, outlines=outlines
+                )
+            else:
+                text_layer, (outline_1_layer, outline_2_layer) = draw_text_layers(
+                    image.size, lines, font, font_color, stroke_size=font_stroke_size, stroke_fill=font_stroke_color,
+                    outlines=outlines
+                )
         else:
-            raise ValueError(f"Invalid push value {push}.")
-        line_pos = (x, y)
+            # extract image data
+            text_layer = Image.new("RGBA", image.size, (0, 0, 0, 0))
+            text_draw = ImageDraw.Draw(text_layer)
+            outline_1_layer = Image.new("RGBa", image.size, (0, 0, 0, 0))
+            outline_1_draw = ImageDraw.Draw(outline_1_layer)
+            outline_2_layer = Image.new("RGBa", image.size, (0, 0, 0, 0))
+            outline_2_draw = ImageDraw.Draw(outline_2_layer)
 
-        if outline_data_2 is not None:
-            outline_2_draw.text(
-                line_pos, line, font=font, fill=outline_data_2.color, stroke_width=outline_data_2.radius,
-                stroke_fill=outline_data_2.color
-            )
+            for line_layout in text_layout.lines:
+                line = line_layout.text
+                line_pos = (line_layout.x, line_layout.y)
 
-        if outline_data_1 is not None:
-            outline_1_draw.text(
-                line_pos, line, font=font, fill=outline_data_1.color, stroke_width=outline_data_1.radius,
-                stroke_fill=outline_data_1.color
-            )
+                if outline_data_2 is not None:
+                    outline_2_draw.text(
+                        line_pos, line, font=font, fill=outline_data_2.color, stroke_width=outline_data_2.radius,
+                        stroke_fill=outline_data_2.color
+                    )
 
-        # add text layer
-        if font_data.stroke_size is not None:
-            text_draw.text(line_pos, line, font=font, fill=font_color, stroke_width=font_stroke_size, stroke_fill=font_stroke_color)
-            pass
-        else:
-            text_draw.text(line_pos, line, font=font, fill=font_color)
-        # image.paste(text_layer, (0, 0), text_layer)
-    # layer rotation stage
-    if rotate is not None or dynamic_rotate is not None:
-        rotate_x = (right + left)/2
-        rotate_y = (up + down)/2
-
-        # check if
-        if rotate is None:
-            first_or_fourth_quadrant = rotate_x > image_width//2
-            first_or_second_quadrant = rotate_y < image_height*2//3
-            if (first_or_fourth_quadrant and first_or_second_quadrant):
-                rotate = -dynamic_rotate
-            elif (not first_or_fourth_quadrant and first_or_second_quadrant):
-                rotate = dynamic_rotate
-            if image_width*2//5 < rotate_x < image_width*3//5:
-                rotate = 0
+                if outline_data_1 is not None:
+                    outline_1_draw.text(
+                        line_pos, line, font=font, fill=outline_data_1.color, stroke_width=outline_data_1.radius,
+                        stroke_fill=outline_data_1.color
+                    )
 
-        if rotate:
-            text_layer = text_layer.rotate(rotate, center=(rotate_x, rotate_y))
+                # add text layer
+                if font_data.stroke_size is not None:
+                    text_draw.text(line_pos, line, font=font, fill=font_color, stroke_width=font_stroke_size, stroke_fill=font_stroke_color)
+                    pass
+                else:
+                    text_draw.text(line_pos, line, font=font, fill=font_color)
+                # image.paste(text_layer, (0, 0), text_layer)
+        record_layers("rasterize", [text_layer, outline_1_layer, outline_2_layer])
+    # layer rotation stage
+    with instrumentation.stage("rotation"):
+        rotate = text_layout.rotate
+        rotate_engine = engines.get_engine(engines.ROTATE)
+        if rotate and rotate_engine != engines.PIL:
+            # only the region around the text of each layer is rotated; layers without an outline are empty.
+            rotation_center = text_layout.rotation_center
+            resample = _ROTATE_RESAMPLING[rotate_engine]
+            text_layer = _rotate_layer(
+                text_layer, rotate, rotation_center, text_layout.get_ink_bounds(font, stroke_width=font_stroke_size, is_rotated=False),
+                resample=resample
+            )
+            if outline_data_1 is not None:
+                outline_1_layer = _rotate_layer(
+                    outline_1_layer, rotate, rotation_center,
+                    text_layout.get_ink_bounds(font, stroke_width=outline_data_1.radius, is_rotated=False), resample=resample
+                )
+            if outline_data_2 is not None:
+                outline_2_layer = _rotate_layer(
+                    outline_2_layer, rotate, rotation_center,
+                    text_layout.get_ink_bounds(font, stroke_width=outline_data_2.radius, is_rotated=False), resample=resample
+                )
+        elif rotate:
+            rotation_center = text_layout.rotation_center
+            text_layer = text_layer.rotate(rotate, center=rotation_center)
             if outline_1_layer is not None:
-                outline_1_layer = outline_1_layer.rotate(rotate, center=(rotate_x, rotate_y))
+                outline_1_layer = outline_1_layer.rotate(rotate, center=rotation_center)
             if outline_2_layer is not None:
-                outline_2_layer = outline_2_layer.rotate(rotate, center=(rotate_x, rotate_y))
+                outline_2_layer = outline_2_layer.rotate(rotate, center=rotation_center)
+        if rotate:
+            record_layers("rotation", [text_layer, outline_1_layer, outline_2_layer])
 
     # paste stage
-    if outline_data_2 is not None:
-        if outline_data_2.blur_strength is not None and outline_data_2.blur_strength:
-            outline_2_over_base = image.copy()
-            outline_2_over_base.paste(outline_2_layer, (0, 0), outline_2_layer)
-            outline_2_over_base = outline_2_over_base.filter(ImageFilter.GaussianBlur(radius=outline_data_2.blur_strength))
-            outline_2_layer = outline_2_layer.filter(ImageFilter.GaussianBlur(radius=outline_data_2.blur_strength))
-            outline_2_layer = outline_2_layer.convert("RGBA")
-            image.paste(outline_2_over_base, (0, 0), outline_2_layer)
-        else:
-            image.paste(outline_2_layer, (0, 0), outline_2_layer)
-    if outline_data_1 is not None:
-        if outline_data_1.blur_strength is not None and outline_data_1.blur_strength:
-            outline_1_over_base = image.copy()
-            outline_1_over_base.paste(outline_1_layer, (0, 0), outline_1_layer)
-            outline_1_over_base = outline_1_over_base.filter(ImageFilter.GaussianBlur(radius=outline_data_1.blur_strength))
-            outline_1_layer = outline_1_layer.filter(ImageFilter.GaussianBlur(radius=outline_data_1.blur_strength))
-            outline_1_layer = outline_1_layer.convert("RGBA")
-            image.paste(outline_1_over_base, (0, 0), outline_1_layer)
+    with instrumentation.stage("composite"):
+        if _is_numpy_composited(image, is_overlay):
+            # compositing is imported here, so that numpy is only loaded by the numpy compositor.
+            from kksubs.image.compositing import CompositeLayer, composite_layers
+            # the regions of the layers come from the layout, rather than from scanning the whole layers.
+            def get_layer_box(stroke_width):
+                box = text_layout.get_ink_bounds(font, stroke_width=stroke_width)
+                if box is None:
+                    return None
+                x, y = layer_position
+                return box[0] - x, box[1] - y, box[2] - x, box[3] - y
+
+            layers = list(under_layers)
+            for outline_data, outline_layer in [(outline_data_2, outline_2_layer), (outline_data_1, outline_1_layer)]:
+                if outline_data is not None:
+                    layers.append(CompositeLayer(
+                        outline_layer, position=layer_position, box=get_layer_box(outline_data.radius),
+                        blur_strength=outline_data.blur_strength
+                    ))
+            layers.append(CompositeLayer(text_layer, position=layer_position, box=get_layer_box(font_stroke_size)))
+            composite_layers(image, layers)
         else:
-            image.paste(outline_1_layer, (0, 0), outline_1_layer)
+            # blurs spread beyond the local layers, so blurred outlines are blurred as layers of the image's size.
+            if outline_data_1 is not None and outline_data_1.blur_strength:
+                outline_1_layer = _get_frame_layer(image, outline_1_layer, layer_position)
+            if outline_data_2 is not None and outline_data_2.blur_strength:
+                outline_2_layer = _get_frame_layer(image, outline_2_layer, layer_position)
+            if outline_data_2 is not None:
+                if outline_data_2.blur_strength is not None and outline_data_2.blur_strength and is_overlay:
+                    # there is no background in an overlay to blur into the outline, so only the outline is blurred.
+                    with instrumentation.stage("outline_blur"):
+                        _paste_layer(image, outline_2_layer.filter(ImageFilter.GaussianBlur(radius=outline_data_2.blur_strength)), is_overlay=True)
+                elif outline_data_2.blur_strength is not None and outline_data_2.blur_strength:
+                    with instrumentation.stage("outline_blur"):
+                        outline_2_over_base = image.copy()
+                        outline_2_over_base.paste(outline_2_layer, (0, 0), outline_2_layer)
+                        outline_2_over_base = outline_2_over_base.filter(ImageFilter.GaussianBlur(radius=outline_data_2.blur_strength))
+                        outline_2_layer = outline_2_layer.filter(ImageFilter.GaussianBlur(radius=outline_data_2.blur_strength))
+                        outline_2_layer = outline_2_layer.convert("RGBA")
+                        image.paste(outline_2_over_base, (0, 0), outline_2_layer)
+                        # a copy of the frame and its blur, and the blurred outline and its conversion.
+                        record_layers("outline_blur", [outline_2_over_base]*2 + [outline_2_layer]*2)
+                else:
+                    _paste_layer(image, outline_2_layer, is_overlay=is_overlay, position=layer_position)
+            if outline_data_1 is not None:
+                if outline_data_1.blur_strength is not None and outline_data_1.blur_strength and is_overlay:
+                    with instrumentation.stage("outline_blur"):
+                        _paste_layer(image, outline_1_layer.filter(ImageFilter.GaussianBlur(radius=outline_data_1.blur_strength)), is_overlay=True)
+                elif outline_data_1.blur_strength is not None and outline_data_1.blur_strength:
+                    with instrumentation.stage("outline_blur"):
+                        outline_1_over_base = image.copy()
+                        outline_1_over_base.paste(outline_1_layer, (0, 0), outline_1_layer)
+                        outline_1_over_base = outline_1_over_base.filter(ImageFilter.GaussianBlur(radius=outline_data_1.blur_strength))
+                        outline_1_layer = outline_1_layer.filter(ImageFilter.GaussianBlur(radius=outline_data_1.blur_strength))
+                        outline_1_layer = outline_1_layer.convert("RGBA")
+                        image.paste(outline_1_over_base, (0, 0), outline_1_layer)
+                        # a copy of the frame and its blur, and the blurred outline and its conversion.
+                        record_layers("outline_blur", [outline_1_over_base]*2 + [outline_1_layer]*2)
+                else:
+                    _paste_layer(image, outline_1_layer, is_overlay=is_overlay, position=layer_position)
 
-    image.paste(text_layer, (0, 0), text_layer)
+            _paste_layer(image, text_layer, is_overlay=is_overlay, position=layer_position)
 
     if not get_box:
         return image
-    return image, {
-        "left": left,
-        "right": right,
-        "up": up,
-        "down": down,
-    }
-
-def apply_layer_data_to_image(image:Image.Image, layer_data:LayerData) -> Image.Image:
+    return image, text_layout.get_box()
+
+def has_layer_effect(layer_data:LayerData) -> bool:
+    # whether the layer data changes the background at all.
+    return (
+        layer_data.brightness is not None or layer_data.gaussian_blur is not None
+        or layer_data.motion_blur is not None or layer_data.motion_rotate is not None
+        or layer_data.radial_blur is not None or layer_data.radial_coords is not None
+    )
+
+def has_background_effects(subtitle_group:SubtitleGroup) -> bool:
+    # whether any subtitle or orbit in the group changes the background: layer effects, or outlines blurred into it.
+    subtitle_profiles = []
+    for subtitle in subtitle_group.subtitle_list:
+        if subtitle.subtitle_profile is not None:
+            subtitle_profiles.append(subtitle.subtitle_profile)
+            subtitle_profiles.extend(subtitle.subtitle_profile.orbits or [])
+    for subtitle_profile in subtitle_profiles:
+        if subtitle_profile.layer_data is not None and has_layer_effect(subtitle_profile.layer_data):
+            return True
+        for outline_data in [subtitle_profile.outline_data_1, subtitle_profile.outline_data_2]:
+            if outline_data is not None and outline_data.blur_strength:
+                return True
+    return False
+
+def apply_layer_data_to_image(image:Image.Image, layer_data:LayerData, background_cache:BackgroundCache=None) -> Image.Image:
+    # the result depends only on the image and the layer data, so it can be reused from the background cache.
+    with instrumentation.stage("layer_effects"):
+        if background_cache is None or not has_layer_effect(layer_data):
+            return _apply_layer_data_to_image(image, layer_data)
+
+        cache_key = background_cache.get_key(image, layer_data)
+        cached_image = background_cache.get(cache_key)
+        if cached_image is not None:
+            record_layers("layer_effects", [cached_image])
+            return cached_image
+        image = _apply_layer_data_to_image(image, layer_data)
+        background_cache.put(cache_key, image)
+        return image
+
+def _apply_layer_data_to_image(image:Image.Image, layer_data:LayerData) -> Image.Image:
     
     brightness = layer_data.brightness
 
@@ -245,7 +371,9 @@ def apply_layer_data_to_image(image:Image.Image, layer_data:LayerData) -> Image.
     is_radial_blur = radial_blur is not None or radial_coords is not None
     is_rejection_filter = rejection_mask_coords is not None or rejection_mask_radius is not None or rejection_mask_blur_strength is not None
 
+    # effect modules are imported on first use; motion and radial blur load cv2 and numpy.
     if brightness is not None:
+        from kksubs.image.brightness import adjust_brightness, cfr_adjust_brightness
         if is_rejection_filter:
             image = cfr_adjust_brightness(
                 image, brightness,
@@ -257,6 +385,7 @@ def apply_layer_data_to_image(image:Image.Image, layer_data:LayerData) -> Image.
             image = adjust_brightness(image, brightness)
 
     elif is_gaussian_blur:
+        from kksubs.image.gaussian_blur import apply_gaussian_blur, cfr_apply_gaussian_blur
         if is_rejection_filter:
             image = cfr_apply_gaussian_blur(
                 image, gaussian_blur,
@@ -268,9 +397,11 @@ def apply_layer_data_to_image(image:Image.Image, layer_data:LayerData) -> Image.
             image = apply_gaussian_blur(image, gaussian_blur)
 
     elif is_motion_blur:
+        from kksubs.image.motion_blur import apply_motion_blur, cfr_apply_motion_blur
         if is_rejection_filter:
+            # masked motion blur has a kernel of 50 pixels by default, as LayerData.get_scaled assumes.
             image = cfr_apply_motion_blur(
-                image, motion_blur,
+                image, coalesce(motion_blur, 50),
                 mask_radius=rejection_mask_radius,
                 mask_blur_strength=rejection_mask_blur_strength,
                 mask_displacement=rejection_mask_coords
@@ -279,13 +410,22 @@ def apply_layer_data_to_image(image:Image.Image, layer_data:LayerData) -> Image.
             image = apply_motion_blur(image, motion_blur, angle=motion_rotate)
 
     elif is_radial_blur:
+        from kksubs.image.radial_blur import apply_radial_blur
         image = apply_radial_blur(image, focal_point=radial_coords, kernel_size=radial_blur)
-    
+
+    if brightness is not None or is_gaussian_blur or is_motion_blur or is_radial_blur:
+        record_layers("layer_effects", [image])
     return image
 
-def apply_subtitle_to_image(image:Image.Image, subtitle:Subtitle, is_orbit=None, box_data=None) -> Image.Image:
+def apply_subtitle_to_image(
+        image:Image.Image, subtitle:Subtitle, is_orbit=None, box_data=None, background_cache:BackgroundCache=None,
+        is_overlay=None
+) -> Image.Image:
     if is_orbit is None:
         is_orbit = False
+    # overlays are transparent images of the text, outlines and assets alone; layer effects are left out.
+    if is_overlay is None:
+        is_overlay = False
         
     # applies data from the subtitle to the image.
 
@@ -297,67 +437,41 @@ def apply_subtitle_to_image(image:Image.Image, subtitle:Subtitle, is_orbit=None,
         if box_data is None:
             return image
         
-        # update anchor point so it is at center of box.
-        left, right, up, down = box_data["left"], box_data["right"], box_data["up"], box_data["down"]
-        print(left, right, up, down)
-        center_x = (left + right)/2
-        center_y = (up + down)/2
-        anchor_point = subtitle_profile.textbox_data.anchor_point
-        centrix = subtitle_profile.centrix
-
-        if centrix is None:
-            centrix = ["c", "c"]
-            
-        def compute_centrix_x(s:str):
-            s = s.lower()
-            if s == "l":
-                return left
-            if s == "c":
-                return center_x
-            if s == "r":
-                return right
-            raise s
-
-        def compute_centrix_y(s:str):
-            s = s.lower()
-            if s == "u":
-                return up
-            if s == "d":
-                return down
-            if s == "c":
-                return center_y
-            raise s
-        centrix_x = int(np.average(list(map(compute_centrix_x, centrix[0])))) - image.size[0]//2
-        centrix_y = int(np.average(list(map(compute_centrix_y, centrix[1])))) - image.size[1]//2
-        anchor_point = (anchor_point[0]+centrix_x, anchor_point[1]+centrix_y)
-        subtitle_profile.textbox_data.anchor_point = anchor_point
+        # anchor the orbit relative to the main text box.
+        subtitle_profile.textbox_data.anchor_point = get_orbit_anchor_point(subtitle_profile, box_data, image.size)
 
     asset_data = subtitle_profile.asset_data
 
     # add background image (if any)
     layer_data = subtitle_profile.layer_data
-    if layer_data is not None:
-        image = apply_layer_data_to_image(image, layer_data)
+    if layer_data is not None and not is_overlay:
+        image = apply_layer_data_to_image(image, layer_data, background_cache=background_cache)
 
+    asset_layers = []
     if asset_data is not None and asset_data.path is not None:
         path = asset_data.path
         coords = asset_data.coords
         scale = asset_data.scale
         rotate = asset_data.rotate
         
-        asset_image = Image.open(path)
-        apply_image(image, asset_image, displacement=coords, scale=scale, rotate=rotate)
+        with instrumentation.stage("asset"):
+            asset_image = Image.open(path)
+            if _is_numpy_composited(image, is_overlay) and asset_image.mode in ["RGBA", "RGBa"]:
+                # composited with the text, in the same pass.
+                from kksubs.image.compositing import CompositeLayer
+                asset_image, position = get_image_placement(image.size, asset_image, displacement=coords, scale=scale, rotate=rotate)
+                asset_layers.append(CompositeLayer(asset_image, position=position))
+            else:
+                apply_image(image, asset_image, displacement=coords, scale=scale, rotate=rotate, is_overlay=is_overlay)
 
     # default text application.
-    default_text = subtitle_profile.default_text
-    if default_text is not None:
-        if content is None or len(content) == 0:
-            content = [default_text]
-        else:
-            content[0] = default_text + content[0]
-        subtitle.content = content
+    content = get_subtitle_content(subtitle)
+    subtitle.content = content
     if content is not None and len(content) > 0:
-        image, box_data = apply_text_to_image(image, subtitle, get_box=True)
+        image, box_data = apply_text_to_image(image, subtitle, get_box=True, is_overlay=is_overlay, under_layers=asset_layers)
+    elif asset_layers:
+        from kksubs.image.compositing import composite_layers
+        composite_layers(image, asset_layers)
 
     # orbits will be applied under the subtitle.
     # needs the textbox information.
@@ -371,36 +485,168 @@ def apply_subtitle_to_image(image:Image.Image, subtitle:Subtitle, is_orbit=None,
             updated_anchor_point = (orbit_anchor_point[0], orbit_anchor_point[1])
             # updated_anchor_point = (main_anchor_point[0]+orbit_anchor_point[0], main_anchor_point[1]+orbit_anchor_point[1])
             orbit_profile.textbox_data.anchor_point = updated_anchor_point
-            image = apply_subtitle_to_image(
-                image,
-                Subtitle(
-                    subtitle_profile=orbit_profile
-                ),
-                is_orbit=True,
-                box_data=box_data
-            )
+            with instrumentation.stage("orbits"):
+                image = apply_subtitle_to_image(
+                    image,
+                    Subtitle(
+                        subtitle_profile=orbit_profile
+                    ),
+                    is_orbit=True,
+                    box_data=box_data,
+                    background_cache=background_cache,
+                    is_overlay=is_overlay
+                )
 
     return image
 
 
 
+def apply_subtitle_group_to_image(
+        image:Image.Image, subtitle_group:SubtitleGroup, proof_scale:float=None, background_cache:BackgroundCache=None,
+        is_overlay:bool=False
+) -> Image.Image:
+    # subtitles are modified while being applied, so work on a copy of the (possibly cached) group.
+    # for an overlay, image is a transparent RGBA image of the frame's size.
+    if proof_scale is not None:
+        subtitle_group = subtitle_group.get_scaled(proof_scale)
+    else:
+        subtitle_group = copy.deepcopy(subtitle_group)
+    for subtitle in subtitle_group.subtitle_list:
+        if subtitle.content is None or list(subtitle.content) == 0:
+            continue
+        image = apply_subtitle_to_image(image, subtitle, background_cache=background_cache, is_overlay=is_overlay)
+    return image
+
+class RenderJob:
+
+    def __init__(self, text_id:str=None, image_id:str=None, image_path:str=None, subtitle_group:Optional[SubtitleGroup]=None):
+        """
+        A single output frame: an image from the input image directory, rendered for a draft.
+        :param text_id: file name of the draft.
+        :param subtitle_group: subtitles for the image, or None if the draft leaves the image unchanged.
+        """
+        self.text_id = text_id
+        self.image_id = image_id
+        self.image_path = image_path
+        self.subtitle_group = subtitle_group
+        # set by the scheduler and the renderer, for calibrating the cost model.
+        self.estimated_cost:Optional[float] = None
+        self.duration:Optional[float] = None
+        # set if the frame failed validation or rendering, when failures are isolated.
+        self.error:Optional[BaseException] = None
+
+
+def _map_in_order(fn:Callable, items:Iterable, workers:int=None) -> Iterator:
+    # lazily maps fn over items, preserving order.
+    # with workers, a bounded number of items is processed ahead so results do not pile up in memory.
+    if workers is None or workers <= 1:
+        for item in items:
+            yield fn(item)
+        return
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = deque()
+        for item in items:
+            futures.append(executor.submit(fn, item))
+            if len(futures) >= 2*workers:
+                yield futures.popleft().result()
+        while futures:
+            yield futures.popleft().result()
+
+
 class SubtitleService:
-    def __init__(self, subtitle_model:SubtitleDataAccessService=None):
+    def __init__(
+            self, subtitle_model:SubtitleDataAccessService=None, base_image_cache_size:int=None,
+            background_cache:BackgroundCache=None, frame_cache:FrameCache=None
+    ):
+        if base_image_cache_size is None:
+            base_image_cache_size = 8
         self.subtitle_model = subtitle_model
+        # optional on-disk cache of backgrounds processed with layer data.
+        self.background_cache = background_cache
+        # optional on-disk cache of decoded source images.
+        self.frame_cache = frame_cache
+        # optional profiling of selected frames.
+        self.frame_profiler:Optional[FrameProfiler] = None
 
-    def apply_subtitle_group(self, subtitle_group:SubtitleGroup) -> Image.Image:
-        image_id = subtitle_group.image_id
-        subtitle_list = subtitle_group.subtitle_list
-        image_path = os.path.join(self.subtitle_model.input_image_directory, image_id)
-        image = Image.open(image_path).copy()
-        for subtitle in subtitle_list:
-            if subtitle.content is None or list(subtitle.content) == 0:
-                continue
-            image = apply_subtitle_to_image(image, subtitle)
+        # decoded base images, kept warm for repeated previews of the same frames.
+        self.base_image_cache_size = base_image_cache_size
+        self._base_image_cache = OrderedDict()
+        self._base_image_cache_lock = threading.Lock()
+
+    def clear_cache(self):
+        with self._base_image_cache_lock:
+            self._base_image_cache.clear()
+
+    def get_base_image(self, image_path, proof_scale:float=None) -> Image.Image:
+        # returns a decoded copy of the image that can be drawn on.
+        stat = os.stat(image_path)
+        cache_key = (os.path.abspath(image_path), stat.st_mtime_ns, stat.st_size, proof_scale)
+        with self._base_image_cache_lock:
+            cached_image = self._base_image_cache.get(cache_key)
+            if cached_image is not None:
+                self._base_image_cache.move_to_end(cache_key)
+        if cached_image is not None:
+            return cached_image.copy()
+
+        image = self.load_image(image_path, proof_scale=proof_scale)
+        if self.base_image_cache_size > 0:
+            with self._base_image_cache_lock:
+                self._base_image_cache[cache_key] = image.copy()
+                while len(self._base_image_cache) > self.base_image_cache_size:
+                    self._base_image_cache.popitem(last=False)
         return image
 
-    def add_subtitles(self, filter_dict:Dict[str, Union[List[int], str]]=None):
-        # add subtitles to images.
+    def load_image(self, image_path, proof_scale:float=None) -> Image.Image:
+        # decodes an image, or maps its decoded pixels from the frame cache.
+        if self.frame_cache is None:
+            return load_image(image_path, scale=proof_scale)
+        image = self.frame_cache.load(image_path)
+        if proof_scale is None or proof_scale == 1:
+            return image
+        return scale_image(image, proof_scale)
+
+    def apply_subtitle_group(self, subtitle_group:SubtitleGroup, proof_scale:float=None) -> Image.Image:
+        image_path = os.path.join(self.subtitle_model.input_image_directory, subtitle_group.image_id)
+        with instrumentation.stage("decode"):
+            image = self.get_base_image(image_path, proof_scale=proof_scale)
+            record_layers("decode", [image])
+        return apply_subtitle_group_to_image(image, subtitle_group, proof_scale=proof_scale, background_cache=self.background_cache)
+
+    def preview(self, text_id:str, image_id:str, proof_scale:float=None, image_format:str=None) -> Union[Image.Image, bytes]:
+        # renders a single frame in memory, reusing the parsed drafts, profiles, fonts and base images kept warm in this service.
+        # returns the image, or its encoded bytes if an image format (e.g. "PNG", "JPEG") is given.
+        textpath = self.subtitle_model.get_textpath(text_id)
+        subtitle_groups = self.subtitle_model.get_subtitle_groups_by_textpath(textpath)
+
+        if image_id in subtitle_groups.keys():
+            subtitle_group = subtitle_groups[image_id]
+            validate_subtitle_group(subtitle_group)
+            image = self.apply_subtitle_group(subtitle_group, proof_scale=proof_scale)
+        else:
+            image_path = os.path.join(self.subtitle_model.input_image_directory, image_id)
+            if not os.path.exists(image_path):
+                raise FileNotFoundError(f"Image {image_id} is not in input image directory {self.subtitle_model.input_image_directory}.")
+            image = self.get_base_image(image_path, proof_scale=proof_scale)
+
+        if image_format is None:
+            return image
+        # the latency target for previews covers the render: encoding a 1080p frame takes about 200ms more as PNG,
+        # even at the lowest compression, against about 20ms as JPEG.
+        if image.mode == "RGBA" and image.getchannel("A").getextrema() == (255, 255):
+            # opaque frames are encoded without their alpha, which is cheaper.
+            image = image.convert("RGB")
+        try:
+            return _encode_preview(image, image_format)
+        except OSError:
+            if image.mode != "RGBA":
+                raise
+            # formats that cannot hold alpha (e.g. JPEG) get the frame without it.
+            return _encode_preview(image.convert("RGB"), image_format)
+
+    def get_render_jobs(self, filter_dict:Dict[str, Union[List[int], str]]=None, isolate_failures:bool=False) -> List[RenderJob]:
+        # gathers and validates the (draft, image) pairs to render, in output order.
+        # if isolate_failures, invalid subtitle groups are recorded on their jobs instead of raising.
 
         image_paths = self.subtitle_model.get_image_paths()
         image_paths.sort()
@@ -409,10 +655,22 @@ class SubtitleService:
 
         subtitle_groups = self.subtitle_model.get_subtitle_groups()
         # validation layer here.
+        validation_errors = dict()
+        validated_profile_ids = set()
         for text_path in subtitle_groups.keys():
             for image_id in subtitle_groups.get(text_path).keys():
-                validate_subtitle_group(subtitle_groups.get(text_path).get(image_id), image_id_set=image_id_set)
+                try:
+                    validate_subtitle_group(
+                        subtitle_groups.get(text_path).get(image_id), image_id_set=image_id_set,
+                        validated_profile_ids=validated_profile_ids
+                    )
+                except Exception as e:
+                    if not isolate_failures:
+                        raise
+                    logger.error(f"Subtitle group for image {image_id} in draft {os.path.basename(text_path)} is invalid: {e!r}")
+                    validation_errors[(text_path, image_id)] = e
 
+        render_jobs = []
         for text_path in subtitle_groups.keys():
             
             text_id = os.path.basename(text_path)
@@ -442,25 +700,458 @@ class SubtitleService:
             logger.info(f"Gathered {n} images to process: {filtered_image_ids}.")
 
             subtitle_group_by_text_id = subtitle_groups[text_path]
+            for i, image_path in enumerate(filtered_image_paths):
+                image_id = filtered_image_ids[i]
+                render_job = RenderJob(
+                    text_id=text_id, image_id=image_id, image_path=image_path,
+                    subtitle_group=subtitle_group_by_text_id.get(image_id)
+                )
+                render_job.error = validation_errors.get((text_path, image_id))
+                render_jobs.append(render_job)
+
+        return render_jobs
 
-            output_directory_by_text_id = os.path.join(
-                self.subtitle_model.output_directory, os.path.splitext(os.path.basename(text_path))[0]
+    def render_job(self, render_job:RenderJob, proof_scale:float=None) -> Image.Image:
+        start = time.perf_counter()
+        output = get_output_key(render_job.text_id, render_job.image_id)
+        frame_profiler = self.frame_profiler
+        if frame_profiler is not None:
+            profile = frame_profiler.render(output)
+        else:
+            profile = contextlib.nullcontext()
+        with profile, instrumentation.frame(output):
+            if render_job.subtitle_group is not None:
+                image = self.apply_subtitle_group(render_job.subtitle_group, proof_scale=proof_scale)
+            else:
+                with instrumentation.stage("decode"):
+                    image = self.load_image(render_job.image_path, proof_scale=proof_scale)
+        render_job.duration = time.perf_counter() - start
+        return image
+
+    def iter_render_jobs(
+            self, render_jobs:List[RenderJob], proof_scale:float=None, workers:int=None, processes:int=None,
+            frame_transport:str=None, isolate_failures:bool=False
+    ) -> Iterator[Tuple[RenderJob, Optional[Image.Image]]]:
+        # renders the jobs, yielding each job with its image in order.
+        # with more than one worker, frames are rendered concurrently but still yielded in order.
+        # with processes, subtitles are applied in worker processes; images are decoded here and handed over with the frame transport.
+        # if isolate_failures, failed frames are yielded with no image and the error set on the job.
+        if proof_scale is not None:
+            if not 0 < proof_scale <= 1:
+                raise ValueError(f"Proof scale must be in (0, 1], got {proof_scale}.")
+            logger.info(f"Rendering proofs at scale {proof_scale}.")
+
+        if processes is not None and processes > 1:
+            process_renderer = ProcessRenderer(
+                processes=processes, transport=frame_transport, background_cache=self.background_cache
+            )
+            def get_item(render_job:RenderJob):
+                # failed frames pass through the workers as their errors.
+                if render_job.error is not None:
+                    return render_job.error, None
+                try:
+                    return self.get_base_image(render_job.image_path, proof_scale=proof_scale), render_job.subtitle_group
+                except Exception as e:
+                    if not isolate_failures:
+                        raise
+                    return e, None
+            results = process_renderer.iter_render(
+                map(get_item, render_jobs), proof_scale=proof_scale, isolate_failures=isolate_failures
             )
-            if not os.path.exists(output_directory_by_text_id):
-                logger.info(f"Created output directory {output_directory_by_text_id}")
-                os.makedirs(output_directory_by_text_id)
+            for render_job, (result, seconds) in zip(render_jobs, results):
+                render_job.duration = seconds
+                yield self._get_render_result(render_job, result)
+        else:
+            def render(render_job:RenderJob):
+                if render_job.error is not None:
+                    return render_job.error
+                try:
+                    return self.render_job(render_job, proof_scale=proof_scale)
+                except Exception as e:
+                    if not isolate_failures:
+                        raise
+                    return e
+            for render_job, result in zip(render_jobs, _map_in_order(render, render_jobs, workers=workers)):
+                yield self._get_render_result(render_job, result)
 
-            for i, image_path in enumerate(filtered_image_paths):
-                image_id = filtered_image_ids[i]
-                output_image_path = os.path.join(output_directory_by_text_id, image_id)
-                if image_id in subtitle_group_by_text_id.keys():
-                    subtitle_group = subtitle_group_by_text_id[image_id]
-                    processed_image = self.apply_subtitle_group(subtitle_group)
-                    processed_image.save(output_image_path)
+    def _get_render_result(self, render_job:RenderJob, result:Union[Image.Image, Exception]) -> Tuple[RenderJob, Optional[Image.Image]]:
+        if isinstance(result, Exception):
+            render_job.error = result
+            logger.error(f"Failed to render image {render_job.image_id} for text_id {render_job.text_id}: {result!r}")
+            return render_job, None
+        return render_job, result
+
+    def iter_subtitles(
+            self, filter_dict:Dict[str, Union[List[int], str]]=None, proof_scale:float=None, workers:int=None,
+            processes:int=None
+    ) -> Iterator[Tuple[str, str, Image.Image]]:
+        # yields (text_id, image_id, image) for each rendered frame in order, without writing to the output directory.
+        render_jobs = self.get_render_jobs(filter_dict=filter_dict)
+        for render_job, image in self.iter_render_jobs(
+                render_jobs, proof_scale=proof_scale, workers=workers, processes=processes
+        ):
+            yield render_job.text_id, render_job.image_id, image
+
+    def get_output_image_path(self, render_job:RenderJob) -> str:
+        # output images are saved as output_directory/<draft name>/<image_id>.
+        output_directory_by_text_id = os.path.join(
+            self.subtitle_model.output_directory, os.path.splitext(render_job.text_id)[0]
+        )
+        if not os.path.exists(output_directory_by_text_id):
+            logger.info(f"Created output directory {output_directory_by_text_id}")
+            os.makedirs(output_directory_by_text_id, exist_ok=True)
+        return os.path.join(output_directory_by_text_id, render_job.image_id)
+
+    def get_overlay_key(self, render_job:RenderJob, proof_scale:float=None, include_effects:bool=False) -> Optional[str]:
+        # digest of everything an overlay is rendered from, or None if it depends on the frame's pixels.
+        subtitle_group = render_job.subtitle_group
+        if include_effects and subtitle_group is not None and has_background_effects(subtitle_group):
+            return None
+        subtitle_list = subtitle_group.subtitle_list if subtitle_group is not None else None
+        return get_digest(subtitle_list, get_image_size(render_job.image_path), proof_scale)
+
+    def render_overlay(self, render_job:RenderJob, proof_scale:float=None, include_effects:bool=False) -> Image.Image:
+        # the frame's text, outlines and assets on a transparent image, without decoding the frame.
+        # with include_effects, frames with background effects are decoded and rendered in full, and the overlay holds every
+        # pixel that differs from the frame, opaque, so that composited over the frame it gives the full render.
+        start = time.perf_counter()
+        subtitle_group = render_job.subtitle_group
+        with instrumentation.frame(get_output_key(render_job.text_id, render_job.image_id)):
+            if include_effects and subtitle_group is not None and has_background_effects(subtitle_group):
+                with instrumentation.stage("decode"):
+                    base_image = self.get_base_image(render_job.image_path, proof_scale=proof_scale)
+                image = apply_subtitle_group_to_image(
+                    base_image.copy(), subtitle_group, proof_scale=proof_scale, background_cache=self.background_cache
+                )
+                with instrumentation.stage("delta"):
+                    overlay = get_delta_overlay(base_image, image)
+            else:
+                size = get_image_size(render_job.image_path)
+                if proof_scale is not None and proof_scale != 1:
+                    size = get_scaled_size(size, proof_scale)
+                overlay = Image.new("RGBA", size, (0, 0, 0, 0))
+                if subtitle_group is not None:
+                    overlay = apply_subtitle_group_to_image(overlay, subtitle_group, proof_scale=proof_scale, is_overlay=True)
+        render_job.duration = time.perf_counter() - start
+        return overlay
+
+    def save_overlays(
+            self, render_jobs:List[RenderJob], proof_scale:float=None, workers:int=None, include_effects:bool=False,
+            isolate_failures:bool=False, layout_writer:LayoutSidecarWriter=None
+    ) -> Dict:
+        # renders the overlays of the jobs and saves them to the output directory as PNG.
+        # frames with identical overlays are rendered once; the later frames are hard links to the first one's file.
+        # returns a summary like save_render_jobs, where "linked" lists the outputs that were linked rather than rendered;
+        # linked outputs are not also listed in "rendered".
+        # outputs are keyed by the overlay's path, which is always PNG, in the summary, shard manifest and layout sidecar.
+        summary = {"rendered": [], "skipped": [], "failed": [], "linked": []}
+
+        def get_overlay_output(render_job:RenderJob) -> str:
+            return get_output_key(render_job.text_id, get_overlay_path(render_job.image_id))
+
+        def fail(render_job:RenderJob, error:BaseException):
+            if not isolate_failures:
+                raise error
+            render_job.error = error
+            logger.error(f"Failed to render overlay {render_job.image_id} for text_id {render_job.text_id}: {error!r}")
+            summary["failed"].append({"output": get_overlay_output(render_job), "error": repr(error)})
+
+        # each unique overlay with the jobs that share it.
+        unique_render_jobs:List[Tuple[RenderJob, List[RenderJob]]] = []
+        duplicates_by_key = dict()
+        for render_job in render_jobs:
+            if layout_writer is not None:
+                layout_writer.reserve(render_job.text_id, get_overlay_output(render_job))
+            if render_job.error is not None:
+                fail(render_job, render_job.error)
+                continue
+            try:
+                key = self.get_overlay_key(render_job, proof_scale=proof_scale, include_effects=include_effects)
+            except Exception as e:
+                fail(render_job, e)
+                continue
+            if key is not None and key in duplicates_by_key:
+                duplicates_by_key[key].append(render_job)
+                continue
+            duplicates = []
+            if key is not None:
+                duplicates_by_key[key] = duplicates
+            unique_render_jobs.append((render_job, duplicates))
+        logger.info(f"Rendering {len(unique_render_jobs)} unique overlays for {len(render_jobs)} frames.")
+
+        def render(item:Tuple[RenderJob, List[RenderJob]]):
+            try:
+                return self.render_overlay(item[0], proof_scale=proof_scale, include_effects=include_effects)
+            except Exception as e:
+                if not isolate_failures:
+                    raise
+                return e
+
+        for (render_job, duplicates), overlay in zip(unique_render_jobs, _map_in_order(render, unique_render_jobs, workers=workers)):
+            output = get_overlay_output(render_job)
+            path = get_overlay_path(self.get_output_image_path(render_job))
+            try:
+                if isinstance(overlay, Exception):
+                    raise overlay
+                with instrumentation.frame(output), instrumentation.stage("encode"):
+                    unlink_shared(path)
+                    overlay.save(path, format="PNG")
+            except Exception as e:
+                for failed_render_job in [render_job] + duplicates:
+                    fail(failed_render_job, e)
+                continue
+            for saved_render_job in [render_job] + duplicates:
+                saved_output = get_overlay_output(saved_render_job)
+                if saved_render_job is render_job:
+                    summary["rendered"].append(saved_output)
                 else:
-                    Image.open(image_path).save(output_image_path)
-                logger.info(f"Processed and saved image {i+1}/{n} ({image_id}) for text_id {text_id}.")
+                    # a failed link fails only that frame.
+                    try:
+                        link_file(path, get_overlay_path(self.get_output_image_path(saved_render_job)))
+                    except Exception as e:
+                        fail(saved_render_job, e)
+                        continue
+                    summary["linked"].append(saved_output)
+                if layout_writer is not None:
+                    layout_writer.add(
+                        saved_render_job.text_id, saved_render_job.image_id, saved_output, saved_render_job.subtitle_group,
+                        overlay.size, proof_scale=proof_scale
+                    )
+        logger.info(f"Saved {len(summary['rendered'])} overlays, and linked {len(summary['linked'])} frames to identical overlays.")
+        return summary
+
+    def get_layouts(self, filter_dict:Dict[str, Union[List[int], str]]=None) -> Dict[str, List[TextLayout]]:
+        # text geometry of each frame without rendering: output key -> layouts of its subtitles and orbits, in drawing order.
+        image_sizes = dict()
+        layouts = dict()
+        for render_job in self.get_render_jobs(filter_dict=filter_dict):
+            frame_layouts = []
+            if render_job.subtitle_group is not None:
+                image_size = get_image_size(render_job.image_path, image_sizes=image_sizes)
+                for subtitle in render_job.subtitle_group.subtitle_list:
+                    frame_layouts.extend(get_subtitle_layouts(subtitle, image_size))
+            layouts[get_output_key(render_job.text_id, render_job.image_id)] = frame_layouts
+        return layouts
+
+    def lint(self, filter_dict:Dict[str, Union[List[int], str]]=None, tolerance:float=None) -> List[LintIssue]:
+        # overlapping subtitles, off-frame text and orbit collisions in every frame, from the text layout alone.
+        # lines are measured from cached glyph advances (no kerning), which is what keeps whole drafts fast.
+        # invalid frames are skipped; validation reports them.
+        image_sizes = dict()
+        line_numbers_by_text_id = dict()
+        issues = []
+        for render_job in self.get_render_jobs(filter_dict=filter_dict, isolate_failures=True):
+            if render_job.subtitle_group is None or render_job.error is not None:
+                continue
+            if render_job.text_id not in line_numbers_by_text_id:
+                line_numbers_by_text_id[render_job.text_id] = self.subtitle_model.get_subtitle_line_numbers_by_textpath(
+                    self.subtitle_model.get_textpath(render_job.text_id)
+                )
+            # the image_id line stands in for subtitles whose start the scan could not find.
+            group_line_numbers = line_numbers_by_text_id[render_job.text_id].get(render_job.image_id)
+            subtitle_list = render_job.subtitle_group.subtitle_list
+            line_numbers = None
+            if group_line_numbers is not None:
+                line_numbers = (group_line_numbers[1:] + [group_line_numbers[0]]*len(subtitle_list))[:len(subtitle_list)]
+
+            image_size = get_image_size(render_job.image_path, image_sizes=image_sizes)
+            subtitle_layouts = [
+                get_subtitle_layouts(subtitle, image_size, measure_text=get_approximate_text_width) for subtitle in subtitle_list
+            ]
+            issues.extend(lint_frame(
+                render_job.text_id, render_job.image_id, get_placed_texts(subtitle_layouts, line_numbers=line_numbers),
+                image_size, tolerance=tolerance
+            ))
+        return issues
+
+    def estimate_render_job_costs(self, render_jobs:List[RenderJob], proof_scale:float=None):
+        image_sizes = dict()
+        for render_job in render_jobs:
+            if render_job.estimated_cost is None:
+                render_job.estimated_cost = estimate_render_cost(
+                    render_job.subtitle_group, get_image_size(render_job.image_path, image_sizes=image_sizes),
+                    proof_scale=proof_scale
+                )
+
+    def schedule_render_jobs(self, render_jobs:List[RenderJob], proof_scale:float=None, workers:int=None) -> List[RenderJob]:
+        # estimates the cost of each job and orders the jobs most expensive first,
+        # so that expensive frames do not end up on the last busy worker.
+        self.estimate_render_job_costs(render_jobs, proof_scale=proof_scale)
+        costs = [render_job.estimated_cost for render_job in render_jobs]
+        order = get_longest_first_order(costs)
+        if workers is not None and workers > 1:
+            logger.info(
+                f"Scheduled {len(render_jobs)} frames on {workers} workers: estimated makespan "
+                f"{estimate_makespan([costs[index] for index in order], workers):.1f}, "
+                f"{estimate_makespan(costs, workers):.1f} in draft order."
+            )
+        return [render_jobs[index] for index in order]
+
+    def get_journal(self) -> RenderJournal:
+        return RenderJournal(os.path.join(self.subtitle_model.output_directory, JOURNAL_FILENAME))
+
+    def save_render_jobs(
+            self, render_jobs:List[RenderJob], proof_scale:float=None, workers:int=None, processes:int=None,
+            resume:bool=False, isolate_failures:bool=False, layout_writer:LayoutSidecarWriter=None
+    ) -> Dict:
+        # renders the jobs and saves them to the output directory.
+        # frames are saved in any order, so parallel renders are scheduled by estimated cost.
+        # resume: record finished frames in the journal, and skip frames completed with the same inputs by earlier runs.
+        # isolate_failures: log and report failed frames, and keep going.
+        # layout_writer: collects the text geometry of each saved or skipped frame, from the output image size.
+        # returns a summary with the rendered, skipped and failed outputs.
+        summary = {"rendered": [], "skipped": [], "failed": []}
+        journal = self.get_journal() if resume else None
+        input_hashes = dict()
+        if layout_writer is not None:
+            for render_job in render_jobs:
+                layout_writer.reserve(render_job.text_id, get_output_key(render_job.text_id, render_job.image_id))
+        if journal is not None:
+            remaining_render_jobs = []
+            for render_job in render_jobs:
+                output = get_output_key(render_job.text_id, render_job.image_id)
+                if render_job.error is None:
+                    input_hashes[output] = get_input_hash(
+                        render_job.image_path, subtitle_group=render_job.subtitle_group, proof_scale=proof_scale
+                    )
+                    if journal.is_completed(output, input_hashes[output], self.get_output_image_path(render_job)):
+                        summary["skipped"].append(output)
+                        if layout_writer is not None:
+                            layout_writer.add(
+                                render_job.text_id, render_job.image_id, output, render_job.subtitle_group,
+                                get_image_size(self.get_output_image_path(render_job)), proof_scale=proof_scale
+                            )
+                        continue
+                remaining_render_jobs.append(render_job)
+            logger.info(f"Resuming: skipped {len(summary['skipped'])} completed frames, {len(remaining_render_jobs)} frames remaining.")
+            render_jobs = remaining_render_jobs
+
+        parallelism = max(workers or 1, processes or 1)
+        if parallelism > 1:
+            render_jobs = self.schedule_render_jobs(render_jobs, proof_scale=proof_scale, workers=parallelism)
+
+        n_by_text_id = dict()
+        for render_job, image in self.iter_render_jobs(
+                render_jobs, proof_scale=proof_scale, workers=workers, processes=processes, isolate_failures=isolate_failures
+        ):
+            output = get_output_key(render_job.text_id, render_job.image_id)
+            text_id = render_job.text_id
+            if image is not None:
+                try:
+                    with instrumentation.frame(output), instrumentation.stage("encode"):
+                        output_image_path = self.get_output_image_path(render_job)
+                        # outputs may be hard links to overlays that other frames share.
+                        unlink_shared(output_image_path)
+                        image.save(output_image_path)
+                except Exception as e:
+                    if not isolate_failures:
+                        raise
+                    logger.error(f"Failed to save image {render_job.image_id} for text_id {text_id}: {e!r}")
+                    render_job.error = e
+            if render_job.error is not None:
+                summary["failed"].append({"output": output, "error": repr(render_job.error)})
+                if journal is not None:
+                    journal.record_failed(output, input_hashes.get(output), render_job.error)
+                continue
+
+            summary["rendered"].append(output)
+            if journal is not None:
+                journal.record_completed(output, input_hashes[output])
+            if layout_writer is not None:
+                layout_writer.add(text_id, render_job.image_id, output, render_job.subtitle_group, image.size, proof_scale=proof_scale)
+            n_by_text_id[text_id] = n_by_text_id.get(text_id, 0) + 1
+            logger.info(f"Processed and saved image {n_by_text_id[text_id]} ({render_job.image_id}) for text_id {text_id}.")
+            if render_job.estimated_cost is not None:
+                logger.info(
+                    f"Frame {text_id}/{render_job.image_id}: estimated cost {render_job.estimated_cost:.2f}, "
+                    f"rendered in {render_job.duration:.3f}s."
+                )
+
+        for text_id, n in n_by_text_id.items():
             logger.info(f"Finished processing {n} images for text ID {text_id}")
+        if summary["failed"]:
+            logger.warning(
+                f"{len(summary['failed'])} frames failed: {[failure['output'] for failure in summary['failed']]}."
+            )
+
+        estimated_cost = sum(render_job.estimated_cost or 0 for render_job in render_jobs)
+        duration = sum(render_job.duration or 0 for render_job in render_jobs)
+        if estimated_cost > 0:
+            # for calibrating the cost model: a good model keeps this ratio similar across projects and effects.
+            logger.info(f"Rendered {estimated_cost:.1f} cost units in {duration:.2f}s ({duration/estimated_cost*1000:.1f} ms per unit).")
+        return summary
+
+    def get_shard(self, render_jobs:List[RenderJob], shard:Tuple[int, int], shard_method:str=None) -> List[RenderJob]:
+        # the jobs of one shard; every node computes the same partition from the same project.
+        index, count = parse_shard(shard)
+        keys = [get_output_key(render_job.text_id, render_job.image_id) for render_job in render_jobs]
+        costs = None
+        if shard_method == COST:
+            self.estimate_render_job_costs(render_jobs)
+            costs = [render_job.estimated_cost for render_job in render_jobs]
+        shard_render_jobs = [render_jobs[job_index] for job_index in partition_keys(keys, count, method=shard_method, costs=costs)[index]]
+        logger.info(f"Shard {index}/{count} has {len(shard_render_jobs)} of {len(render_jobs)} frames.")
+        return shard_render_jobs
+
+    def verify_shards(self, filter_dict:Dict[str, Union[List[int], str]]=None, shard_count:int=None, overlay:bool=False) -> Dict:
+        # checks that the shards together wrote every expected output exactly once.
+        # if overlay, the expected outputs are the PNG overlays written by save_overlays.
+        expected_keys = [
+            get_output_key(render_job.text_id, get_overlay_path(render_job.image_id) if overlay else render_job.image_id)
+            for render_job in self.get_render_jobs(filter_dict=filter_dict)
+        ]
+        report = verify_shards(self.subtitle_model.output_directory, expected_keys, count=shard_count)
+        if report["is_complete"]:
+            logger.info(f"All {len(expected_keys)} outputs were written by exactly one of {report['shard_count']} shards.")
+        else:
+            logger.warning(
+                f"Shards are incomplete: {len(report['missing'])} missing outputs, {len(report['duplicated'])} duplicated outputs, "
+                f"{len(report['unexpected'])} unexpected outputs, missing shards {report['missing_shards']}."
+            )
+        return report
+
+    def add_subtitles(
+            self, filter_dict:Dict[str, Union[List[int], str]]=None, proof_scale:float=None, workers:int=None,
+            processes:int=None, shard:Tuple[int, int]=None, shard_method:str=None, resume:bool=False,
+            isolate_failures:bool=False, layout_format:str=None, overlay:bool=False, overlay_effects:bool=False
+    ) -> Dict:
+        # add subtitles to images.
+        # if a proof scale is given, images are decoded and rendered at that fraction of their size for quick previews.
+        # if a shard (index, count) is given, only that shard of the jobs is rendered, and a shard manifest is written.
+        # if a layout format ("json" or "jsonl") is given, a layout sidecar is written for each draft.
+        # if overlay, transparent PNG overlays are saved instead of frames (see save_overlays), with the pixels changed by
+        # layer effects if overlay_effects. overlays render in threads, and are not journaled for resuming.
+        if overlay and resume:
+            raise ValueError("Overlays cannot be resumed; render them without resume.")
+        layout_writer = None
+        if layout_format is not None:
+            layout_writer = LayoutSidecarWriter(
+                self.subtitle_model.output_directory, layout_format=layout_format,
+                shard=parse_shard(shard) if shard is not None else None
+            )
+        render_jobs = self.get_render_jobs(filter_dict=filter_dict, isolate_failures=isolate_failures)
+        if shard is not None:
+            if shard_method is None:
+                shard_method = HASH
+            render_jobs = self.get_shard(render_jobs, shard, shard_method=shard_method)
+        if overlay:
+            summary = self.save_overlays(
+                render_jobs, proof_scale=proof_scale, workers=max(workers or 1, processes or 1),
+                include_effects=overlay_effects, isolate_failures=isolate_failures, layout_writer=layout_writer
+            )
+        else:
+            summary = self.save_render_jobs(
+                render_jobs, proof_scale=proof_scale, workers=workers, processes=processes, resume=resume,
+                isolate_failures=isolate_failures, layout_writer=layout_writer
+            )
+        if layout_writer is not None:
+            layout_writer.close()
+        if shard is not None:
+            write_manifest(
+                self.subtitle_model.output_directory, parse_shard(shard), shard_method,
+                summary["rendered"] + summary.get("linked", []) + summary["skipped"]
+            )
+        return summary
 
         pass
     pass
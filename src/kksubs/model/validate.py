@@ -1,3 +1,4 @@
+import functools
 import logging
 
 import os
@@ -69,14 +70,20 @@ def _validate_asset_data(asset_data:AssetData):
         if not isinstance(asset_data.rotate, int):
             raise TypeError(type(asset_data.rotate))
 
+@functools.lru_cache(maxsize=None)
+def _get_default_data():
+    # the global defaults are only read by add_default, so one set serves every profile.
+    return FontData.get_default(), OutlineData.get_default(), TextboxData.get_default()
+
 def _validate_subtitle_profile(subtitle_profile:SubtitleProfile, is_orbit=None) -> None:
     if is_orbit is None:
         is_orbit = False
+    default_font_data, default_outline_data, default_textbox_data = _get_default_data()
 
     if subtitle_profile.font_data is None:
         raise AttributeError
     else:
-        subtitle_profile.font_data.add_default(FontData.get_default())
+        subtitle_profile.font_data.add_default(default_font_data)
         _validate_font_data(subtitle_profile.font_data)
         
     if subtitle_profile.default_text is not None:
@@ -84,17 +91,17 @@ def _validate_subtitle_profile(subtitle_profile:SubtitleProfile, is_orbit=None)
             raise TypeError(type(subtitle_profile.default_text))
 
     if subtitle_profile.outline_data_1 is not None:
-        subtitle_profile.outline_data_1.add_default(OutlineData.get_default())
+        subtitle_profile.outline_data_1.add_default(default_outline_data)
         _validate_outline_data(subtitle_profile.outline_data_1)
 
     if subtitle_profile.outline_data_2 is not None:
-        subtitle_profile.outline_data_2.add_default(OutlineData.get_default())
+        subtitle_profile.outline_data_2.add_default(default_outline_data)
         _validate_outline_data(subtitle_profile.outline_data_2)
 
     if subtitle_profile.textbox_data is None:
         raise NotImplementedError("Subtitle profile has no textbox data.")
     else:
-        subtitle_profile.textbox_data.add_default(TextboxData.get_default())
+        subtitle_profile.textbox_data.add_default(default_textbox_data)
         _validate_textbox_data(subtitle_profile.textbox_data)
 
     if subtitle_profile.layer_data is not None:
@@ -109,19 +116,25 @@ def _validate_subtitle_profile(subtitle_profile:SubtitleProfile, is_orbit=None)
 
     pass
 
-def _validate_subtitle_list(subtitle_list:List[Subtitle]) -> None:
+def _validate_subtitle_list(subtitle_list:List[Subtitle], validated_profile_ids:Optional[set]=None) -> None:
     for subtitle in subtitle_list:
         if subtitle.subtitle_profile is not None:
+            if validated_profile_ids is not None and id(subtitle.subtitle_profile) in validated_profile_ids:
+                continue
             _validate_subtitle_profile(subtitle.subtitle_profile)
+            if validated_profile_ids is not None:
+                validated_profile_ids.add(id(subtitle.subtitle_profile))
     pass
 
-def validate_subtitle_group(subtitle_group:SubtitleGroup, image_id_set:Optional[set]=None) -> None:
+def validate_subtitle_group(subtitle_group:SubtitleGroup, image_id_set:Optional[set]=None, validated_profile_ids:Optional[set]=None) -> None:
+    # profiles shared between subtitles are only validated once if their ids are collected in validated_profile_ids,
+    # which must not outlive the subtitle groups.
     if image_id_set is not None:
         if subtitle_group.image_id not in image_id_set:
             logger.warning(f"Invalid image ID {subtitle_group.image_id}: this subtitle group will have no effect.")
     # check the data does not have issues.
 
     if subtitle_group.subtitle_list is not None:
-        _validate_subtitle_list(subtitle_group.subtitle_list)
+        _validate_subtitle_list(subtitle_group.subtitle_list, validated_profile_ids=validated_profile_ids)
 
     pass
\ No newline at end of file
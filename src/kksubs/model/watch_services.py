@@ -0,0 +1,157 @@
+import copy
+import logging
+import os
+from typing import Dict, List, Optional, Set, Tuple
+
+from kksubs.model.data_access_services import SubtitleDataAccessService
+from kksubs.model.dependency_graph import ASSET, FONT, IMAGE, PROFILE, DependencyGraph, get_changed_profile_ids
+from kksubs.model.domain_models import SubtitleGroup
+from kksubs.model.subtitle_services import RenderJob
+from kksubs.model.validate import validate_subtitle_group
+
+logger = logging.getLogger(__name__)
+
+def _get_file_key(path:Optional[str]) -> Optional[tuple]:
+    if path is None or not os.path.exists(path):
+        return None
+    stat = os.stat(path)
+    return (stat.st_mtime_ns, stat.st_size)
+
+class ProjectWatcher:
+
+    def __init__(self, subtitle_model:SubtitleDataAccessService):
+        """
+        Polls the project files for changes, and works out which output frames are affected.
+        The first poll treats every frame as changed.
+        A poll that raises (e.g. on an invalid subtitle group) keeps nothing, so its changes are found again by the next poll.
+        """
+        self.subtitle_model = subtitle_model
+        self.dependency_graph = DependencyGraph()
+
+        self._text_keys:Dict[str, tuple] = dict()
+        self._image_keys:Dict[str, tuple] = dict()
+        # font/asset node -> file key.
+        self._file_keys:Dict[tuple, tuple] = dict()
+        self._profile_key = None
+        self._subtitle_profile_dicts:Dict[str, Dict] = dict()
+        # draft path -> subtitle groups, as parsed at the last poll.
+        self._subtitle_groups:Dict[str, Dict[str, SubtitleGroup]] = dict()
+
+    def _get_drafts_affected_by_profiles(self, textpaths:List[str], subtitle_profile_dicts:Dict[str, Dict]) -> Set[str]:
+        # drafts that must be re-parsed after the subtitle profile file changed.
+        previous_subtitle_profile_dicts = self._subtitle_profile_dicts
+
+        is_same_profile_source = self._profile_key is not None and self._profile_key[1:] == (
+            self.subtitle_model.subtitle_profile_path, self.subtitle_model.default_subtitle_profile_id
+        )
+        # added or removed profiles can change how drafts are parsed (e.g. profile aliases in text drafts).
+        is_same_profile_ids = set(subtitle_profile_dicts.keys()) == set(previous_subtitle_profile_dicts.keys())
+        if not (is_same_profile_source and is_same_profile_ids):
+            return set(textpaths)
+
+        changed_profile_ids = get_changed_profile_ids(subtitle_profile_dicts, previous_subtitle_profile_dicts)
+        logger.info(f"Changed subtitle profiles: {sorted(changed_profile_ids)}.")
+        affected_frames = self.dependency_graph.get_affected_frames(
+            *[(PROFILE, profile_id) for profile_id in changed_profile_ids]
+        )
+        return {textpath for textpath, _ in affected_frames}
+
+    def poll(self) -> List[RenderJob]:
+        # returns the render jobs for frames affected by changes since the last poll.
+        textpaths = sorted(self.subtitle_model.get_textpaths())
+        image_paths = sorted(self.subtitle_model.get_image_paths())
+        image_path_by_id = {os.path.basename(image_path): image_path for image_path in image_paths}
+        image_ids = list(image_path_by_id.keys())
+
+        profile_key = (
+            _get_file_key(self.subtitle_model.subtitle_profile_path), self.subtitle_model.subtitle_profile_path,
+            self.subtitle_model.default_subtitle_profile_id
+        )
+        text_keys = {textpath: _get_file_key(textpath) for textpath in textpaths}
+        image_keys = {image_path: _get_file_key(image_path) for image_path in image_paths}
+
+        # drafts to re-parse.
+        changed_textpaths = {textpath for textpath in textpaths if self._text_keys.get(textpath) != text_keys[textpath]}
+        subtitle_profile_dicts = self._subtitle_profile_dicts
+        if profile_key != self._profile_key:
+            logger.info("Subtitle profiles changed.")
+            subtitle_profile_dicts = self.subtitle_model.get_subtitle_profile_dicts()
+            changed_textpaths.update(self._get_drafts_affected_by_profiles(textpaths, subtitle_profile_dicts))
+        is_image_list_changed = set(image_keys.keys()) != set(self._image_keys.keys())
+
+        # frames affected by changed images, fonts and assets.
+        changed_frames = set()
+        for image_path, image_key in image_keys.items():
+            if self._image_keys.get(image_path) != image_key:
+                changed_frames.update((textpath, os.path.basename(image_path)) for textpath in textpaths)
+        file_keys = dict()
+        for node in self.dependency_graph.get_nodes(FONT) | self.dependency_graph.get_nodes(ASSET):
+            file_keys[node] = _get_file_key(node[1])
+            if node in self._file_keys and self._file_keys[node] != file_keys[node]:
+                logger.info(f"Dependency {node[1]} changed.")
+                changed_frames.update(self.dependency_graph.get_affected_frames(node))
+
+        # frames affected by re-parsed drafts: only subtitle groups that differ after parsing are re-rendered.
+        # the changed subtitle groups are validated before any of the new state is kept.
+        parsed_subtitle_groups = dict()
+        changed_image_ids_by_textpath = dict()
+        for textpath in textpaths:
+            if textpath not in changed_textpaths:
+                continue
+            subtitle_groups = self.subtitle_model.get_subtitle_groups_by_textpath(textpath)
+            if textpath in self._subtitle_groups:
+                previous_subtitle_groups = self._subtitle_groups[textpath]
+                changed_image_ids = {
+                    image_id for image_id in set(subtitle_groups.keys()) | set(previous_subtitle_groups.keys())
+                    if subtitle_groups.get(image_id) != previous_subtitle_groups.get(image_id)
+                }
+            else:
+                changed_image_ids = set(image_ids)
+            logger.info(f"Draft {os.path.basename(textpath)}: {len(changed_image_ids)} subtitle groups changed.")
+            changed_frames.update((textpath, image_id) for image_id in changed_image_ids)
+
+            # keep an unvalidated copy for comparison, since validation fills in default data.
+            # copies are validated first, so that a failed poll leaves the parsed drafts as they were.
+            parsed_subtitle_groups[textpath] = copy.deepcopy(subtitle_groups)
+            changed_image_ids_by_textpath[textpath] = changed_image_ids
+            for image_id in changed_image_ids:
+                if image_id in subtitle_groups:
+                    validate_subtitle_group(copy.deepcopy(subtitle_groups[image_id]), image_id_set=set(image_ids))
+
+        for textpath in textpaths:
+            if textpath in parsed_subtitle_groups:
+                subtitle_groups = self.subtitle_model.get_subtitle_groups_by_textpath(textpath)
+                for image_id in changed_image_ids_by_textpath[textpath]:
+                    if image_id in subtitle_groups:
+                        validate_subtitle_group(subtitle_groups[image_id], image_id_set=set(image_ids))
+                self._subtitle_groups[textpath] = parsed_subtitle_groups[textpath]
+            elif not is_image_list_changed:
+                continue
+            self.dependency_graph.add_subtitle_groups(
+                textpath, self._subtitle_groups.get(textpath, dict()), image_ids,
+                default_profile_id=self.subtitle_model.default_subtitle_profile_id
+            )
+        if profile_key != self._profile_key:
+            self._subtitle_profile_dicts = subtitle_profile_dicts
+            self.dependency_graph.add_subtitle_profile_dicts(subtitle_profile_dicts)
+        # fonts and assets first referenced by this poll are watched from now on.
+        for node in self.dependency_graph.get_nodes(FONT) | self.dependency_graph.get_nodes(ASSET):
+            if node not in file_keys:
+                file_keys[node] = _get_file_key(node[1])
+        self._file_keys = file_keys
+        self._profile_key = profile_key
+        self._text_keys = text_keys
+        self._image_keys = image_keys
+
+        render_jobs = []
+        for textpath in textpaths:
+            image_ids_to_render = [image_id for image_id in image_ids if (textpath, image_id) in changed_frames]
+            if not image_ids_to_render:
+                continue
+            subtitle_groups = self.subtitle_model.get_subtitle_groups_by_textpath(textpath)
+            for image_id in image_ids_to_render:
+                render_jobs.append(RenderJob(
+                    text_id=os.path.basename(textpath), image_id=image_id, image_path=image_path_by_id[image_id],
+                    subtitle_group=subtitle_groups.get(image_id)
+                ))
+        return render_jobs
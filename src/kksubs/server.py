@@ -0,0 +1,291 @@
+import argparse
+import base64
+import json
+import logging
+import os
+import socketserver
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+
+from PIL import Image
+
+from kksubs.kksubs import SubtitleController
+from kksubs.model.sharding import COST, HASH, parse_shard
+from kksubs.model.sidecar import LAYOUT_FORMATS
+
+logger = logging.getLogger(__name__)
+
+# a long-running render server that keeps a loaded controller (and its caches) warm between requests.
+# requests are JSON bodies POSTed to /render, /preview, /batch or /reload; GET /status reports the server state.
+# requests that are invalid are answered with 400, and failures while handling a valid request with 500.
+
+CONFIG_FILENAMES = ["config.json", "config.yaml", "config.yml"]
+# actions that only read the server state, and may be requested with GET.
+GET_ACTIONS = ["status"]
+
+class RequestError(Exception):
+    # a request that is malformed or names drafts, images or options that do not exist.
+    pass
+
+def _get_argument(request:Dict, key:str, types:tuple, default=None, required:bool=False):
+    if key not in request or request[key] is None:
+        if required:
+            raise RequestError(f"Missing argument {key}.")
+        return default
+    if not isinstance(request[key], types) or isinstance(request[key], bool) and bool not in types:
+        raise RequestError(f"Invalid argument {key}: {request[key]!r}.")
+    return request[key]
+
+def _get_image_format(request:Dict) -> str:
+    # the format previews are encoded in, "PNG" if not given.
+    image_format = _get_argument(request, "image_format", (str,), default="PNG")
+    Image.init()
+    if image_format.upper() not in Image.SAVE:
+        raise RequestError(f"Invalid argument image_format: {image_format!r}.")
+    return image_format.upper()
+
+class RenderServer:
+
+    def __init__(self, project_directory:str=None, controller:SubtitleController=None, max_concurrency:int=None):
+        if max_concurrency is None:
+            max_concurrency = 2
+        if controller is None:
+            controller = SubtitleController()
+
+        self.project_directory = project_directory
+        self.controller = controller
+        self.max_concurrency = max_concurrency
+        # limits the number of requests rendering at the same time; other requests wait their turn.
+        # reloading takes every permit, so that no request renders while the project and caches are swapped.
+        self._semaphore = threading.BoundedSemaphore(max_concurrency)
+        self._reload_lock = threading.Lock()
+        self._config_key = None
+        if project_directory is not None:
+            self.reload()
+
+    def _get_config_key(self) -> Optional[tuple]:
+        for filename in CONFIG_FILENAMES:
+            config_path = os.path.join(self.project_directory, filename)
+            if os.path.exists(config_path):
+                stat = os.stat(config_path)
+                return (config_path, stat.st_mtime_ns, stat.st_size)
+        return None
+
+    def reload(self):
+        # reloads the project configuration and drops all cached data, once the requests rendering have finished.
+        with self._reload_lock:
+            for _ in range(self.max_concurrency):
+                self._semaphore.acquire()
+            try:
+                if self.project_directory is not None:
+                    self.controller.load_project(self.project_directory)
+                    self._config_key = self._get_config_key()
+                self.controller.clear_cache()
+            finally:
+                for _ in range(self.max_concurrency):
+                    self._semaphore.release()
+        logger.info(f"Reloaded project {self.project_directory}.")
+
+    def reload_if_changed(self):
+        # drafts, profiles and images are refreshed by the controller caches; only the project config needs checking here.
+        if self.project_directory is not None and self._get_config_key() != self._config_key:
+            logger.info("Project configuration changed on disk.")
+            self.reload()
+
+    def _get_render_arguments(self, request:Dict) -> Dict:
+        shard = _get_argument(request, "shard", (str, list))
+        if shard is not None:
+            try:
+                shard = parse_shard(shard)
+            except (TypeError, ValueError) as e:
+                raise RequestError(f"Invalid argument shard: {e}")
+        shard_method = _get_argument(request, "shard_method", (str,))
+        if shard_method not in {None, HASH, COST}:
+            raise RequestError(f"Invalid argument shard_method: {shard_method!r}.")
+        layout_format = _get_argument(request, "layout_format", (str,))
+        if layout_format not in {None, *LAYOUT_FORMATS}:
+            raise RequestError(f"Invalid argument layout_format: {layout_format!r}.")
+        arguments = dict(
+            filter_dict=_get_argument(request, "filter_dict", (dict,)),
+            proof_scale=_get_argument(request, "proof_scale", (int, float)),
+            workers=_get_argument(request, "workers", (int,)),
+            processes=_get_argument(request, "processes", (int,)),
+            shard=shard, shard_method=shard_method,
+            resume=_get_argument(request, "resume", (bool,), default=False),
+            isolate_failures=_get_argument(request, "isolate_failures", (bool,), default=False),
+            layout_format=layout_format,
+            overlay=_get_argument(request, "overlay", (bool,), default=False),
+            overlay_effects=_get_argument(request, "overlay_effects", (bool,), default=False),
+        )
+        if arguments["overlay"] and arguments["resume"]:
+            raise RequestError("Overlays cannot be resumed.")
+        return arguments
+
+    def _get_preview_arguments(self, request:Dict) -> Dict:
+        text_id = _get_argument(request, "text_id", (str,), required=True)
+        image_id = _get_argument(request, "image_id", (str,), required=True)
+        subtitle_model = self.controller.subtitle_model
+        try:
+            subtitle_model.get_textpath(text_id)
+        except FileNotFoundError as e:
+            raise RequestError(str(e))
+        if os.path.basename(image_id) != image_id or not os.path.exists(os.path.join(subtitle_model.input_image_directory, image_id)):
+            raise RequestError(f"Image {image_id} is not in input image directory {subtitle_model.input_image_directory}.")
+        return dict(
+            text_id=text_id, image_id=image_id, proof_scale=_get_argument(request, "proof_scale", (int, float)),
+            image_format=_get_image_format(request),
+        )
+
+    def handle(self, action:str, request:Dict):
+        # returns a JSON-serializable result, or bytes for previews.
+        # raises RequestError for invalid requests.
+        if not isinstance(request, dict):
+            raise RequestError("Requests must be JSON objects.")
+        if action == "status":
+            return {
+                "status": "ok",
+                "project_directory": self.project_directory,
+                "max_concurrency": self.max_concurrency,
+                "drafts": self.controller.show_drafts() if self.controller.subtitle_model.input_text_directory else [],
+            }
+        if action == "reload":
+            self.reload()
+            return {"status": "ok"}
+
+        if action in {"render", "preview"}:
+            self.reload_if_changed()
+            with self._semaphore:
+                if action == "render":
+                    summary = self.controller.add_subtitles(**self._get_render_arguments(request))
+                    return {"status": "ok", **summary}
+                return self.controller.preview(**self._get_preview_arguments(request))
+        if action == "batch":
+            results = []
+            for sub_request in _get_argument(request, "requests", (list,), default=[]):
+                if not isinstance(sub_request, dict):
+                    raise RequestError("Requests must be JSON objects.")
+                result = self.handle(sub_request.get("action"), sub_request)
+                if isinstance(result, bytes):
+                    result = {"status": "ok", "image": base64.b64encode(result).decode("ascii")}
+                results.append(result)
+            return {"status": "ok", "results": results}
+        raise RequestError(f"Unknown action {action}.")
+
+
+class _RenderRequestHandler(BaseHTTPRequestHandler):
+    render_server:RenderServer = None
+
+    def address_string(self):
+        # unix sockets have no client address.
+        if isinstance(self.client_address, tuple) and self.client_address:
+            return str(self.client_address[0])
+        return "unix"
+
+    def log_message(self, format, *args):
+        logger.debug(f"{self.address_string()} {format % args}")
+
+    def _send(self, code:int, body:bytes, content_type:str):
+        self.send_response(code)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, code:int, content:Dict):
+        self._send(code, json.dumps(content).encode("utf-8"), "application/json")
+
+    def _dispatch(self, action:str, request:Dict):
+        try:
+            result = self.render_server.handle(action, request)
+        except RequestError as e:
+            logger.warning(f"Request {action} failed: {e!r}")
+            self._send_json(400, {"status": "error", "error": repr(e)})
+            return
+        except Exception as e:
+            logger.exception(f"Request {action} failed.")
+            self._send_json(500, {"status": "error", "error": repr(e)})
+            return
+        if isinstance(result, bytes):
+            # the request was validated by handle, so its image format is known.
+            image_format = _get_image_format(request)
+            self._send(200, result, Image.MIME.get(image_format, f"image/{image_format.lower()}"))
+        else:
+            self._send_json(200, result)
+
+    def do_GET(self):
+        action = self.path.strip("/")
+        if action not in GET_ACTIONS:
+            # every other action changes or renders the project, and needs a POST.
+            self.send_response(405)
+            self.send_header("Allow", "POST")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self._dispatch(action, dict())
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            request = json.loads(self.rfile.read(length) or b"{}")
+        except json.JSONDecodeError as e:
+            self._send_json(400, {"status": "error", "error": repr(e)})
+            return
+        self._dispatch(self.path.strip("/"), request)
+
+
+if hasattr(socketserver, "UnixStreamServer"):
+    class _UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+        daemon_threads = True
+
+
+def create_server(render_server:RenderServer, host:str=None, port:int=None, unix_socket:str=None) -> socketserver.BaseServer:
+    # creates (but does not start) a localhost HTTP server, or an HTTP server listening on a unix socket.
+    if host is None:
+        host = "127.0.0.1"
+    if port is None:
+        port = 8765
+    handler = type("RenderRequestHandler", (_RenderRequestHandler,), {"render_server": render_server})
+    if unix_socket is not None:
+        if not hasattr(socketserver, "UnixStreamServer"):
+            raise NotImplementedError("Unix sockets are not supported on this platform.")
+        if os.path.exists(unix_socket):
+            os.remove(unix_socket)
+        return _UnixHTTPServer(unix_socket, handler)
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def serve(project_directory:str=None, host:str=None, port:int=None, unix_socket:str=None, max_concurrency:int=None):
+    render_server = RenderServer(project_directory=project_directory, max_concurrency=max_concurrency)
+    server = create_server(render_server, host=host, port=port, unix_socket=unix_socket)
+    logger.info(f"Serving project {project_directory} on {unix_socket or server.server_address}.")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        if unix_socket is not None and os.path.exists(unix_socket):
+            os.remove(unix_socket)
+
+
+def add_arguments(parser:argparse.ArgumentParser):
+    parser.add_argument("project_directory", help="project directory containing a config file or the standard input/output directories.")
+    parser.add_argument("--host", default=None, help="host to listen on (default 127.0.0.1).")
+    parser.add_argument("--port", type=int, default=None, help="port to listen on (default 8765).")
+    parser.add_argument("--unix-socket", default=None, help="listen on this unix socket instead of a TCP port.")
+    parser.add_argument("--max-concurrency", type=int, default=None, help="maximum number of requests rendering at once.")
+
+
+def main(argv=None, prog:str=None) -> int:
+    parser = argparse.ArgumentParser(prog=prog, description="Run a local kksubs render server.")
+    add_arguments(parser)
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+    serve(
+        project_directory=args.project_directory, host=args.host, port=args.port,
+        unix_socket=args.unix_socket, max_concurrency=args.max_concurrency,
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    main()
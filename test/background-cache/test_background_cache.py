@@ -0,0 +1,36 @@
+import os
+import tempfile
+import unittest
+
+from PIL import Image
+
+from kksubs.model.cache_services import BackgroundCache
+from kksubs.model.domain_models import LayerData
+from kksubs.model.subtitle_services import apply_layer_data_to_image
+
+class TestBackgroundCache(unittest.TestCase):
+
+    def test_background_cache(self):
+        with tempfile.TemporaryDirectory() as directory:
+            background_cache = BackgroundCache(directory=directory)
+            image = Image.open("test/resource/sample-images/1.png").convert("RGB").reduce(4)
+            layer_data = LayerData(gaussian_blur=5, f_radius=50)
+
+            processed_image = apply_layer_data_to_image(image.copy(), layer_data, background_cache=background_cache)
+            self.assertEqual(len(os.listdir(directory)), 1)
+            cached_image = apply_layer_data_to_image(image.copy(), layer_data, background_cache=background_cache)
+            self.assertEqual(processed_image.tobytes(), cached_image.tobytes())
+
+            # different layer data is cached separately.
+            apply_layer_data_to_image(image.copy(), LayerData(brightness=0.5), background_cache=background_cache)
+            self.assertEqual(len(os.listdir(directory)), 2)
+
+    def test_eviction(self):
+        with tempfile.TemporaryDirectory() as directory:
+            image = Image.new("RGB", (100, 100))
+            background_cache = BackgroundCache(directory=directory, max_size=2*100*100*3)
+            for i in range(5):
+                background_cache.put(str(i), image)
+            self.assertLessEqual(background_cache.get_size(), 2*100*100*3)
+            self.assertIsNotNone(background_cache.get("4"))
+            self.assertIsNone(background_cache.get("0"))
@@ -0,0 +1,55 @@
+import json
+import os
+import tempfile
+import unittest
+
+from kksubs.benchmark.suite import PHASES, compare_results, run_benchmark
+from kksubs.benchmark.synthetic import create_synthetic_project
+from kksubs.kksubs import SubtitleController
+
+class TestBenchmark(unittest.TestCase):
+
+    def test_synthetic_project(self):
+        with tempfile.TemporaryDirectory() as directory:
+            project = create_synthetic_project(
+                directory, frames=6, resolution=(320, 180), subtitles_per_frame=2, lines_per_subtitle=2, drafts=2,
+                features=["plain", "outline_blur", "orbits"],
+            )
+            self.assertEqual(len(os.listdir(project.input_image_directory)), 6)
+            controller = SubtitleController()
+            controller.load_project(project.directory)
+            render_jobs = controller.subtitle_service.get_render_jobs()
+            self.assertEqual(len(render_jobs), 12)
+            subtitle_profiles = [
+                subtitle.subtitle_profile
+                for render_job in render_jobs for subtitle in render_job.subtitle_group.subtitle_list
+            ]
+            self.assertEqual(len(subtitle_profiles), 24)
+            # profiles cycle through the features: plain, outline blur, orbits.
+            self.assertIsNone(subtitle_profiles[0].orbits)
+            self.assertEqual(subtitle_profiles[1].outline_data_1.blur_strength, 3)
+            self.assertEqual(len(subtitle_profiles[2].orbits), 2)
+
+    def test_source_images_outside_repository(self):
+        # the sample images are found from the package, whatever the working directory.
+        working_directory = os.getcwd()
+        with tempfile.TemporaryDirectory() as directory:
+            os.chdir(directory)
+            try:
+                project = create_synthetic_project(os.path.join(directory, "project"), frames=2, resolution=(32, 18))
+                self.assertEqual(len(os.listdir(project.input_image_directory)), 2)
+                with self.assertRaises(FileNotFoundError):
+                    create_synthetic_project(os.path.join(directory, "other"), source_image_directory="missing")
+            finally:
+                os.chdir(working_directory)
+
+    def test_run_benchmark(self):
+        results = run_benchmark(frames=3, resolution=(320, 180), features=["plain", "rotate"], repeats=2)
+        self.assertEqual(results["results"]["frames"], 3)
+        self.assertEqual(len(results["runs"]), 2)
+        for phase in PHASES:
+            self.assertGreaterEqual(results["results"][phase], 0)
+        # results are plain JSON, so runs can be stored and compared later.
+        baseline = json.loads(json.dumps(results))
+        ratios = compare_results(baseline, results)
+        self.assertAlmostEqual(ratios["total"], 1.0)
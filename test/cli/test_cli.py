@@ -0,0 +1,75 @@
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+
+from PIL import Image
+
+from kksubs.benchmark.synthetic import create_synthetic_project
+from kksubs.cli import main
+
+def run(argv):
+    stdout = io.StringIO()
+    with contextlib.redirect_stdout(stdout):
+        exit_code = main(argv)
+    return exit_code, stdout.getvalue()
+
+class TestCli(unittest.TestCase):
+
+    def test_cli(self):
+        with tempfile.TemporaryDirectory() as directory:
+            project = create_synthetic_project(directory, frames=3, resolution=(320, 180), features=["plain", "rotate"])
+
+            exit_code, output = run(["validate", directory])
+            self.assertEqual(exit_code, 0)
+            self.assertIn("Validated 3 frames, 0 invalid.", output)
+
+            exit_code, output = run(["render", directory, "--draft", "draft-0.txt", "--images", "0", "2", "--timing"])
+            self.assertEqual(exit_code, 0)
+            self.assertIn("Rendered 2 frames", output)
+            self.assertIn("Stage timings", output)
+            self.assertEqual(sorted(os.listdir(os.path.join(project.output_directory, "draft-0"))), ["00001.png", "00003.png"])
+
+            # the lorem ipsum subtitles are wider than the 320px frames.
+            exit_code, output = run(["lint", directory, "--draft", "draft-0.txt"])
+            self.assertEqual(exit_code, 1)
+            self.assertIn("draft-0.txt:2: 00001.png: off_frame", output)
+
+            preview_path = os.path.join(directory, "preview.png")
+            exit_code, _ = run(["preview", directory, "draft-0.txt", "00002.png", "-o", preview_path, "--proof-scale", "0.5"])
+            self.assertEqual(exit_code, 0)
+            self.assertTrue(os.path.exists(preview_path))
+            preview_path = os.path.join(directory, "preview.jpg")
+            exit_code, _ = run(["preview", directory, "draft-0.txt", "00002.png", "-o", preview_path])
+            self.assertEqual(exit_code, 0)
+            with Image.open(preview_path) as image:
+                self.assertEqual(image.format, "JPEG")
+
+            with open(os.path.join(project.input_text_directory, "draft-1.txt"), "w", encoding="utf-8") as writer:
+                writer.write("image_id: 00001.png\ncontent: missing asset\nasset_data.path: missing.png\n")
+            exit_code, output = run(["validate", directory, "--draft", "draft-1.txt"])
+            self.assertEqual(exit_code, 1)
+            self.assertIn("1 invalid", output)
+
+    def test_requires_command(self):
+        with contextlib.redirect_stderr(io.StringIO()):
+            with self.assertRaises(SystemExit):
+                main([])
+
+    def test_forwarded_arguments(self):
+        # bench and serve take the arguments of the benchmark suite and the server.
+        with contextlib.redirect_stderr(io.StringIO()):
+            with self.assertRaises(SystemExit) as context:
+                run(["bench", "--features", "unknown"])
+            self.assertEqual(context.exception.code, 2)
+            with self.assertRaises(SystemExit) as context:
+                run(["render", ".", "--features", "plain"])
+            self.assertEqual(context.exception.code, 2)
+        exit_code, output = run(["bench", "--frames", "1", "--resolution", "64", "36", "--repeats", "1", "--lines-per-subtitle", "2", "--drafts", "2"])
+        self.assertEqual(exit_code, 0)
+        self.assertIn("total", output)
+        stdout = io.StringIO()
+        with contextlib.redirect_stdout(stdout), self.assertRaises(SystemExit):
+            main(["serve", "--help"])
+        self.assertIn("--max-concurrency", stdout.getvalue())
@@ -0,0 +1,23 @@
+import unittest
+
+from kksubs.model.converters import _get_subtitle_groups_from_textstring, get_subtitle_profile_dicts, get_subtitle_profiles
+from kksubs.model.dependency_graph import IMAGE, build_dependency_graph
+
+class TestDependencyGraph(unittest.TestCase):
+
+    def test_dependency_graph(self):
+        path = "test/subtitle-profile-inheritance/subtitle_profiles.yaml"
+        textstring = "\n".join([
+            "image_id: 1.png", "subtitle_profile_id: child", "content: child text", "",
+            "image_id: 2.png", "subtitle_profile_id: parent", "content: parent text", "",
+            "image_id: 3.png", "content: default text",
+        ])
+        subtitle_groups = _get_subtitle_groups_from_textstring(textstring, subtitle_profiles=get_subtitle_profiles(path))
+        dependency_graph = build_dependency_graph(
+            get_subtitle_profile_dicts(path), {"draft.txt": subtitle_groups}, ["1.png", "2.png", "3.png", "4.png"]
+        )
+
+        # children are rebuilt with their parents.
+        self.assertSetEqual(dependency_graph.get_affected_frames_by_profile("parent"), {("draft.txt", "1.png"), ("draft.txt", "2.png")})
+        self.assertSetEqual(dependency_graph.get_affected_frames_by_profile("child"), {("draft.txt", "1.png")})
+        self.assertSetEqual(dependency_graph.get_affected_frames((IMAGE, "4.png")), {("draft.txt", "4.png")})
@@ -0,0 +1,73 @@
+import json
+import os
+import pstats
+import tempfile
+import threading
+import time
+import unittest
+
+from kksubs.kksubs import SubtitleController
+from kksubs.model.diagnostics import SUMMARY_FILENAME, FrameProfiler
+
+class TestDiagnostics(unittest.TestCase):
+
+    def test_should_profile(self):
+        with tempfile.TemporaryDirectory() as directory:
+            frame_profiler = FrameProfiler(directory=directory, frames=["2.png", "draft/3.png"])
+            self.assertTrue(frame_profiler.should_profile("draft/2.png"))
+            self.assertTrue(frame_profiler.should_profile("draft/3.png"))
+            self.assertFalse(frame_profiler.should_profile("other-draft/3.png"))
+
+            frames = [f"draft/{i}.png" for i in range(1000)]
+            sampled_frames = [frame for frame in frames if FrameProfiler(directory=directory, sample_rate=0.1).should_profile(frame)]
+            self.assertTrue(50 < len(sampled_frames) < 150)
+            self.assertListEqual(
+                sampled_frames, [frame for frame in frames if FrameProfiler(directory=directory, sample_rate=0.1).should_profile(frame)]
+            )
+
+    def test_profile_frames(self):
+        with tempfile.TemporaryDirectory() as directory:
+            output_directory = os.path.join(directory, "output")
+            diagnostics_directory = os.path.join(directory, "diagnostics")
+            os.makedirs(output_directory)
+            controller = SubtitleController()
+            controller.load_input_text_directory("test/simple-text/input-text-directory")
+            controller.load_input_image_directory("test/resource/sample-images")
+            controller.load_output_directory(output_directory)
+            controller.load_subtitle_profiles("test/simple-text/subtitle_profiles.yaml")
+            controller.load_default_subtitle_profile_id()
+
+            controller.enable_frame_profiling(frames=["2.png", "input-text/4.png"], directory=diagnostics_directory)
+            controller.add_subtitles(proof_scale=0.25, workers=2)
+
+            with open(os.path.join(diagnostics_directory, SUMMARY_FILENAME), "r", encoding="utf-8") as reader:
+                summaries = [json.loads(line) for line in reader]
+            self.assertListEqual(sorted(summary["frame"] for summary in summaries), ["input-text/2.png", "input-text/4.png"])
+            for summary in summaries:
+                # three layers of the (proof) frame's size are rasterized for each subtitle.
+                self.assertEqual(summary["layer_allocations"]["rasterize"]["bytes"] % (480*270*4), 0)
+                self.assertGreaterEqual(summary["layer_bytes"], 3*480*270*4)
+                self.assertGreaterEqual(summary["traced_peak_delta"], 0)
+                self.assertTrue(os.path.exists(summary["allocations"]))
+                stats = pstats.Stats(summary["profile"])
+                self.assertTrue(any(function[2] == "apply_text_to_image" for function in stats.stats.keys()))
+
+    def test_profiled_frames_render_alone(self):
+        with tempfile.TemporaryDirectory() as directory:
+            frame_profiler = FrameProfiler(directory=directory, frames=["draft/profiled.png"])
+            events = []
+            rendering = threading.Event()
+
+            def render_other():
+                with frame_profiler.render("draft/other.png"):
+                    rendering.set()
+                    time.sleep(0.2)
+                    events.append("other")
+
+            thread = threading.Thread(target=render_other)
+            thread.start()
+            rendering.wait(5)
+            with frame_profiler.render("draft/profiled.png"):
+                events.append("profiled")
+            thread.join()
+            self.assertListEqual(events, ["other", "profiled"])
@@ -0,0 +1,184 @@
+import tempfile
+import unittest
+
+from PIL import Image, ImageDraw
+
+from kksubs.benchmark.golden import MISSING, PASSED, compare_images, create_golden_project, iter_golden_renders, run_golden_harness
+from kksubs.benchmark.synthetic import create_synthetic_project
+from kksubs.image.compositing import CompositeLayer, composite_layers, get_visible_box
+from kksubs.image.strokes import draw_local_text_layers, draw_text_layers, get_frame_layer
+from kksubs.kksubs import SubtitleController
+from kksubs.model import engines
+from kksubs.model.domain_models import get_default_font_style
+from kksubs.model.layout import get_font
+from kksubs.model.subtitle_services import _paste_layer
+
+# dilated strokes are round at every corner, where freetype may miter them.
+MAX_MEAN_ERROR = 1.5
+MAX_DIFFERING_FRACTION = 0.1
+
+class TestEngines(unittest.TestCase):
+
+    def tearDown(self):
+        engines.set_engines()
+
+    def test_select_engine(self):
+        self.assertEqual(engines.get_engine(engines.STROKE), engines.PIL)
+        engines.set_engine(engines.STROKE, engines.DILATE)
+        self.assertEqual(engines.get_engines(), {**{kind: engines.PIL for kind in engines.ENGINES}, engines.STROKE: engines.DILATE})
+        engines.set_engine(engines.STROKE)
+        self.assertEqual(engines.get_engine(engines.STROKE), engines.PIL)
+        with self.assertRaises(ValueError):
+            engines.set_engine(engines.STROKE, "unknown")
+        with self.assertRaises(ValueError):
+            engines.set_engine("unknown", engines.PIL)
+
+    def test_dilated_strokes(self):
+        # large radii, drawn directly, against freetype strokes.
+        font = get_font(get_default_font_style(), 48)
+        size = (640, 200)
+        lines = [("Quick brown fox", 40.5, 30), ("jumps!", 60, 100)]
+        for radius in [3, 12]:
+            with self.subTest(radius=radius):
+                text_layer, (outline_layer, no_layer) = draw_text_layers(
+                    size, lines, font, (255, 255, 255), stroke_size=2, stroke_fill=(255, 0, 0),
+                    outlines=[(radius, (0, 0, 0)), None]
+                )
+                self.assertIsNone(no_layer)
+                self.assertEqual(outline_layer.mode, "RGBa")
+                reference_text_layer = Image.new("RGBA", size, (0, 0, 0, 0))
+                reference_outline_layer = Image.new("RGBa", size, (0, 0, 0, 0))
+                for line, x, y in lines:
+                    ImageDraw.Draw(reference_outline_layer).text((x, y), line, font=font, fill=(0, 0, 0), stroke_width=radius, stroke_fill=(0, 0, 0))
+                    ImageDraw.Draw(reference_text_layer).text((x, y), line, font=font, fill=(255, 255, 255), stroke_width=2, stroke_fill=(255, 0, 0))
+                self.assertLess(compare_images(text_layer, reference_text_layer)["mean_error"], MAX_MEAN_ERROR)
+                self.assertLess(compare_images(outline_layer.convert("RGBA"), reference_outline_layer.convert("RGBA"))["mean_error"], MAX_MEAN_ERROR)
+
+    def test_golden_images(self):
+        report = run_golden_harness(
+            configure=lambda controller: controller.set_render_engine(engines.STROKE, engines.DILATE),
+            max_mean_error=MAX_MEAN_ERROR, max_differing_fraction=MAX_DIFFERING_FRACTION,
+        )
+        for case_name, case_report in report.items():
+            with self.subTest(case=case_name):
+                if case_report["status"] == MISSING:
+                    continue
+                self.assertEqual(case_report["status"], PASSED, msg=case_report)
+
+    def test_worker_processes(self):
+        # workers render with the engine selected in the parent.
+        with tempfile.TemporaryDirectory() as directory:
+            create_synthetic_project(directory, frames=2, resolution=(320, 180), features=["plain", "outline_blur"])
+            controller = SubtitleController()
+            controller.load_project(directory)
+            controller.set_render_engine(engines.STROKE, engines.DILATE)
+            in_process = {image_id: image for _, image_id, image in controller.iter_subtitles()}
+            in_workers = {image_id: image for _, image_id, image in controller.iter_subtitles(processes=2)}
+            self.assertEqual(in_process.keys(), in_workers.keys())
+            controller.set_render_engine(engines.STROKE)
+            with_reference = {image_id: image for _, image_id, image in controller.iter_subtitles()}
+            for image_id, image in in_process.items():
+                self.assertEqual(compare_images(image, in_workers[image_id])["max_error"], 0)
+                self.assertGreater(compare_images(image, with_reference[image_id])["max_error"], 0)
+
+    def test_numpy_compositing(self):
+        # the numpy compositor gives the same pixels as pasting layers with pil, on RGB frames (the golden cases,
+        # assets included) and RGBA frames (the synthetic project).
+        with tempfile.TemporaryDirectory() as directory:
+            project = create_golden_project(directory)
+            references = {case_name: image for case_name, image, _, _ in iter_golden_renders(project)}
+            engines.set_engine(engines.COMPOSITE, engines.NUMPY)
+            for case_name, image, _, error in iter_golden_renders(project):
+                if error is not None:
+                    continue
+                with self.subTest(case=case_name):
+                    self.assertEqual(compare_images(image, references[case_name])["max_error"], 0)
+
+        with tempfile.TemporaryDirectory() as directory:
+            create_synthetic_project(
+                directory, frames=6, resolution=(480, 270), features=["plain", "outline_blur", "rotate", "orbits", "brightness"],
+                subtitles_per_frame=2
+            )
+            controller = SubtitleController()
+            controller.load_project(directory)
+            with_numpy = {image_id: image for _, image_id, image in controller.iter_subtitles()}
+            controller.set_render_engine(engines.COMPOSITE)
+            for _, image_id, image in controller.iter_subtitles():
+                with self.subTest(image_id=image_id):
+                    self.assertEqual(image.mode, "RGBA")
+                    self.assertEqual(compare_images(image, with_numpy[image_id])["max_error"], 0)
+
+    def test_local_text_layers(self):
+        # dilated strokes are composited by numpy from layers covering only the text, with the same pixels as pasting
+        # layers of the frame's size.
+        font = get_font(get_default_font_style(), 48)
+        position, text_layer, (outline_layer,) = draw_local_text_layers([("Quick", -10.5, 150)], font, (255, 255, 255), outlines=[(6, (0, 0, 0))])
+        self.assertEqual(position[0], -11 + font.getbbox("Quick")[0] - 8)
+        self.assertLess(text_layer.width, 200)
+        self.assertEqual(outline_layer.size, text_layer.size)
+
+        with tempfile.TemporaryDirectory() as directory:
+            create_synthetic_project(
+                directory, frames=4, resolution=(480, 270), features=["plain", "outline_blur", "rotate", "orbits"],
+                subtitles_per_frame=2
+            )
+            controller = SubtitleController()
+            controller.load_project(directory)
+            controller.set_render_engine(engines.STROKE, engines.DILATE)
+            references = {image_id: image for _, image_id, image in controller.iter_subtitles()}
+            controller.set_render_engine(engines.COMPOSITE, engines.NUMPY)
+            for _, image_id, image in controller.iter_subtitles():
+                with self.subTest(image_id=image_id):
+                    self.assertEqual(compare_images(image, references[image_id])["max_error"], 0)
+
+    def test_pasted_local_layers(self):
+        # pil pastes local layers at their position, including partly outside the frame, with the same pixels as
+        # pasting layers of the frame's size, onto frames and onto transparent overlays.
+        font = get_font(get_default_font_style(), 48)
+        size = (320, 180)
+        for x, y in [(-30.5, 150), (280, -20), (100, 60)]:
+            position, text_layer, (outline_layer,) = draw_local_text_layers([("Quick", x, y)], font, (255, 255, 255), outlines=[(6, (0, 0, 0))])
+            for is_overlay in [False, True]:
+                with self.subTest(x=x, y=y, is_overlay=is_overlay):
+                    frame = Image.new("RGBA", size, (0, 0, 0, 0)) if is_overlay else Image.new("RGB", size, (40, 120, 200))
+                    reference = frame.copy()
+                    for layer in [outline_layer, text_layer]:
+                        _paste_layer(frame, layer, is_overlay=is_overlay, position=position)
+                        _paste_layer(reference, get_frame_layer(size, layer, position), is_overlay=is_overlay)
+                    self.assertEqual(compare_images(frame, reference)["max_error"], 0)
+
+    def test_layer_opacity(self):
+        frame = Image.new("RGB", (40, 30), (0, 0, 255))
+        layer = Image.new("RGBA", (10, 10), (255, 0, 0, 255))
+        composite_layers(frame, [CompositeLayer(layer, position=(35, 25), opacity=0.5)])
+        self.assertEqual(frame.getpixel((36, 26)), (128, 0, 127))
+        self.assertEqual(frame.getpixel((34, 26)), (0, 0, 255))
+
+    def test_visible_box(self):
+        # an RGBA layer is visible where its alpha is; an RGBa layer also where it holds colors under zero alpha.
+        layer = Image.new("RGBA", (20, 10), (0, 0, 0, 0))
+        layer.putpixel((3, 2), (255, 0, 0, 0))
+        self.assertIsNone(get_visible_box(layer))
+        layer.putpixel((5, 4), (255, 0, 0, 1))
+        self.assertEqual(get_visible_box(layer), (5, 4, 6, 5))
+        layer = Image.frombytes("RGBa", layer.size, layer.tobytes())
+        self.assertEqual(get_visible_box(layer), (3, 2, 6, 5))
+        self.assertIsNone(get_visible_box(Image.new("RGBa", (20, 10), (0, 0, 0, 0))))
+
+    def test_region_rotation(self):
+        # rotating only the text's region places it exactly where rotating the whole layers does.
+        with tempfile.TemporaryDirectory() as directory:
+            create_synthetic_project(
+                directory, frames=4, resolution=(480, 270), features=["rotate", "outline_blur"], subtitles_per_frame=2
+            )
+            controller = SubtitleController()
+            controller.load_project(directory)
+            references = {image_id: image for _, image_id, image in controller.iter_subtitles()}
+            for name, max_mean_error in [(engines.NEAREST, 0), (engines.BICUBIC, MAX_MEAN_ERROR)]:
+                controller.set_render_engine(engines.ROTATE, name)
+                for _, image_id, image in controller.iter_subtitles():
+                    with self.subTest(engine=name, image_id=image_id):
+                        metrics = compare_images(image, references[image_id])
+                        self.assertLessEqual(metrics["mean_error"], max_mean_error)
+                        if name == engines.NEAREST:
+                            self.assertEqual(metrics["max_error"], 0)
@@ -0,0 +1,43 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from PIL import Image
+
+from kksubs.model.cache_services import FrameCache
+from kksubs.model.subtitle_services import SubtitleService
+
+class TestFrameCache(unittest.TestCase):
+
+    def test_frame_cache(self):
+        with tempfile.TemporaryDirectory() as directory:
+            image_path = os.path.join(directory, "1.png")
+            shutil.copy("test/resource/sample-images/1.png", image_path)
+            frame_cache = FrameCache(directory=os.path.join(directory, "frames"))
+
+            image = frame_cache.load(image_path)
+            self.assertEqual(len(os.listdir(frame_cache.directory)), 1)
+            cached_image = frame_cache.load(image_path)
+            self.assertEqual(image.mode, cached_image.mode)
+            self.assertEqual(image.tobytes(), cached_image.tobytes())
+
+            # images mapped from the cache can be drawn on.
+            cached_image.paste((0, 0, 0), (0, 0, 10, 10))
+            self.assertEqual(frame_cache.load(image_path).tobytes(), image.tobytes())
+
+            # edited images are decoded again.
+            Image.new("RGB", (10, 10)).save(image_path)
+            os.utime(image_path, ns=(time.time_ns() + 10**9, time.time_ns() + 10**9))
+            self.assertEqual(frame_cache.load(image_path).size, (10, 10))
+            self.assertEqual(len(os.listdir(frame_cache.directory)), 2)
+
+    def test_subtitle_service(self):
+        with tempfile.TemporaryDirectory() as directory:
+            image_path = "test/resource/sample-images/1.png"
+            subtitle_service = SubtitleService(base_image_cache_size=0, frame_cache=FrameCache(directory=directory))
+            image = subtitle_service.get_base_image(image_path, proof_scale=0.5)
+            cached_image = subtitle_service.get_base_image(image_path, proof_scale=0.5)
+            self.assertEqual(image.size, cached_image.size)
+            self.assertEqual(image.tobytes(), cached_image.tobytes())
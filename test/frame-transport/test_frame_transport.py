@@ -0,0 +1,59 @@
+import unittest
+
+from PIL import Image
+
+from kksubs.kksubs import SubtitleController
+from kksubs.model.frame_transport import (
+    PICKLE, SHARED_MEMORY, ProcessRenderer, SharedMemoryPool, SharedMemoryTransport, is_shared_memory_available
+)
+
+@unittest.skipUnless(is_shared_memory_available(), "shared memory requires python 3.8 or later.")
+class TestSharedMemoryTransport(unittest.TestCase):
+
+    def test_round_trip(self):
+        transport = SharedMemoryTransport()
+        try:
+            image = Image.open("test/resource/sample-images/1.png").convert("RGBA").reduce(4)
+            frame = transport.put(image)
+            self.assertEqual(transport.get(frame).tobytes(), image.tobytes())
+            transport.release(frame)
+
+            # released blocks are reused.
+            transport.allocate(image.size)
+            transport.put(image.convert("L"))
+            self.assertEqual(transport.pool.get_block_count(), 2)
+        finally:
+            transport.close()
+
+    def test_pool(self):
+        pool = SharedMemoryPool()
+        try:
+            block = pool.acquire(100)
+            self.assertIsNot(pool.acquire(100), block)
+            pool.release(block.name)
+            self.assertIs(pool.acquire(50), block)
+        finally:
+            pool.close()
+
+
+class TestProcessRenderer(unittest.TestCase):
+
+    def test_echo(self):
+        images = [Image.new("RGB", (64, 32), color=(i, i, i)) for i in range(5)]
+        for transport in [PICKLE, SHARED_MEMORY] if is_shared_memory_available() else [PICKLE]:
+            echoed_images = list(ProcessRenderer(processes=2, transport=transport).iter_echo(images))
+            self.assertListEqual([image.tobytes() for image in echoed_images], [image.tobytes() for image in images])
+
+    def test_processes(self):
+        controller = SubtitleController()
+        controller.load_input_text_directory("test/simple-text/input-text-directory")
+        controller.load_input_image_directory("test/resource/sample-images")
+        controller.load_subtitle_profiles("test/simple-text/subtitle_profiles.yaml")
+        controller.load_default_subtitle_profile_id()
+
+        frames = list(controller.iter_subtitles(proof_scale=0.25))
+        process_frames = list(controller.iter_subtitles(proof_scale=0.25, processes=2))
+        self.assertEqual(len(frames), len(process_frames))
+        for (text_id, image_id, image), (process_text_id, process_image_id, process_image) in zip(frames, process_frames):
+            self.assertEqual((text_id, image_id), (process_text_id, process_image_id))
+            self.assertEqual(image.tobytes(), process_image.tobytes())
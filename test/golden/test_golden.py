@@ -0,0 +1,55 @@
+import os
+import tempfile
+import unittest
+
+from PIL import Image
+
+from kksubs.benchmark.golden import (
+    DEFAULT_REFERENCE_DIRECTORY, MISSING, PASSED, compare_images, create_golden_project, get_cases, run_golden_harness
+)
+from kksubs.kksubs import SubtitleController
+
+# font rasterization may differ slightly between freetype versions.
+MAX_MEAN_ERROR = 0.5
+MAX_DIFFERING_FRACTION = 0.02
+
+class TestGolden(unittest.TestCase):
+
+    def test_golden_images(self):
+        report = run_golden_harness(max_mean_error=MAX_MEAN_ERROR, max_differing_fraction=MAX_DIFFERING_FRACTION)
+        self.assertEqual(set(report.keys()), set(get_cases(asset_path="asset.png").keys()))
+        for case_name, case_report in report.items():
+            with self.subTest(case=case_name):
+                if case_report["status"] == MISSING:
+                    # e.g. radial blur, which needs cv2.linearPolar (removed in opencv 5) to produce a reference.
+                    self.skipTest(f"No reference for {case_name}.")
+                self.assertEqual(case_report["status"], PASSED, msg=case_report)
+                self.assertGreater(case_report["seconds"], 0)
+
+    def test_detects_changes(self):
+        reference = Image.open(os.path.join(DEFAULT_REFERENCE_DIRECTORY, "align_center.png"))
+        metrics = compare_images(reference, reference)
+        self.assertEqual(metrics["max_error"], 0)
+        self.assertEqual(metrics["differing_fraction"], 0)
+
+        changed = reference.copy()
+        changed.paste((255, 0, 0, 255), (0, 0, 32, 18))
+        metrics = compare_images(changed, reference)
+        self.assertAlmostEqual(metrics["differing_fraction"], 0.01, delta=0.001)
+        self.assertGreater(metrics["mean_error"], 0)
+
+        report = run_golden_harness(case_names=["align_center"], max_mean_error=0, max_differing_fraction=0)
+        self.assertEqual(report["align_center"]["status"], PASSED)
+        self.assertTrue(compare_images(reference.resize((160, 90)), reference)["size_mismatch"])
+
+    def test_dynamic_rotation_cases(self):
+        # the dynamic rotation cases are anchored where the text is actually rotated.
+        with tempfile.TemporaryDirectory() as directory:
+            create_golden_project(directory, case_names=["dynamic_rotate_left", "dynamic_rotate_right"])
+            controller = SubtitleController()
+            controller.load_project(directory)
+            rotations = {
+                output.split("/")[0]: text_layout.rotate
+                for output, text_layouts in controller.get_layouts().items() for text_layout in text_layouts
+            }
+            self.assertDictEqual(rotations, {"dynamic_rotate_left": 10, "dynamic_rotate_right": -10})
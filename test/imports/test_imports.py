@@ -0,0 +1,15 @@
+import unittest
+
+from kksubs.benchmark.imports import measure_import
+
+class TestImports(unittest.TestCase):
+
+    def test_heavy_modules_are_lazy(self):
+        for module in ["kksubs.kksubs", "kksubs.server"]:
+            result = measure_import(module)
+            self.assertEqual(result["loaded_heavy_modules"], [], msg=module)
+            self.assertGreater(result["seconds"], 0)
+
+    def test_effects_load_heavy_modules(self):
+        result = measure_import("kksubs.image.motion_blur")
+        self.assertEqual(set(result["loaded_heavy_modules"]), {"cv2", "numpy"})
@@ -0,0 +1,50 @@
+import json
+import os
+import tempfile
+import unittest
+
+from kksubs.kksubs import SubtitleController
+from kksubs.model import instrumentation
+
+class TestInstrumentation(unittest.TestCase):
+
+    def tearDown(self):
+        instrumentation.disable_recorder()
+
+    def test_nested_stages(self):
+        recorder = instrumentation.enable_recorder()
+        with instrumentation.frame("frame"):
+            with instrumentation.stage("outer"):
+                with instrumentation.stage("inner"):
+                    pass
+        # stages outside of frames are not recorded.
+        with instrumentation.stage("outer"):
+            pass
+        report = recorder.get_report()
+        self.assertEqual(report["frames"], 1)
+        self.assertListEqual(sorted(report["stages"].keys()), ["outer", "outer/inner"])
+        self.assertLessEqual(sum(stage["total"] for stage in report["stages"].values()), report["total"])
+
+    def test_disabled(self):
+        self.assertIs(instrumentation.stage("stage"), instrumentation.stage("other stage"))
+
+    def test_render_report(self):
+        with tempfile.TemporaryDirectory() as output_directory:
+            controller = SubtitleController()
+            controller.load_input_text_directory("test/simple-text/input-text-directory")
+            controller.load_input_image_directory("test/resource/sample-images")
+            controller.load_output_directory(output_directory)
+            controller.load_subtitle_profiles("test/simple-text/subtitle_profiles.yaml")
+            controller.load_default_subtitle_profile_id()
+
+            controller.enable_stage_timing()
+            controller.add_subtitles(proof_scale=0.25, workers=2)
+            report_path = os.path.join(output_directory, "stage-timing.json")
+            controller.write_stage_timing_report(report_path, slowest_frame_count=3)
+            with open(report_path, "r", encoding="utf-8") as reader:
+                report = json.load(reader)
+
+            self.assertEqual(report["frames"], 6)
+            self.assertEqual(len(report["slowest_frames"]), 3)
+            for stage in ["decode", "text_layout", "rasterize", "composite", "encode"]:
+                self.assertIn(stage, report["stages"])
@@ -0,0 +1,69 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from kksubs.kksubs import SubtitleController
+from kksubs.model.journal import JOURNAL_FILENAME, RenderJournal
+
+class TestJournal(unittest.TestCase):
+
+    def test_resume_and_isolate_failures(self):
+        with tempfile.TemporaryDirectory() as directory:
+            input_text_directory = os.path.join(directory, "input-text-directory")
+            output_directory = os.path.join(directory, "output-directory")
+            os.makedirs(output_directory)
+            shutil.copytree("test/simple-text/input-text-directory", input_text_directory)
+            draft_path = os.path.join(input_text_directory, "input-text.txt")
+            with open(draft_path, "r", encoding="utf-8") as reader:
+                draft = reader.read()
+            with open(draft_path, "w", encoding="utf-8") as writer:
+                writer.write(draft.replace("font_data.color: red", "asset_data.path: missing-asset.png"))
+
+            controller = SubtitleController()
+            controller.load_input_text_directory(input_text_directory)
+            controller.load_input_image_directory("test/resource/sample-images")
+            controller.load_output_directory(output_directory)
+            controller.load_subtitle_profiles("test/simple-text/subtitle_profiles.yaml")
+            controller.load_default_subtitle_profile_id()
+
+            # without isolation, the invalid frame aborts the batch.
+            with self.assertRaises(Exception):
+                controller.add_subtitles(proof_scale=0.25)
+
+            summary = controller.add_subtitles(proof_scale=0.25, resume=True, isolate_failures=True)
+            self.assertListEqual([failure["output"] for failure in summary["failed"]], ["input-text/2.png"])
+            self.assertEqual(len(summary["rendered"]), 5)
+            self.assertTrue(os.path.exists(os.path.join(output_directory, JOURNAL_FILENAME)))
+
+            # completed frames are skipped; the failed frame is tried again.
+            summary = controller.add_subtitles(proof_scale=0.25, resume=True, isolate_failures=True, workers=2)
+            self.assertEqual(len(summary["skipped"]), 5)
+            self.assertEqual(len(summary["failed"]), 1)
+
+            # fixing the draft re-renders only the fixed frame; removed outputs are rendered again.
+            with open(draft_path, "w", encoding="utf-8") as writer:
+                writer.write(draft)
+            os.remove(os.path.join(output_directory, "input-text", "1.png"))
+            summary = controller.add_subtitles(proof_scale=0.25, resume=True)
+            self.assertListEqual(sorted(summary["rendered"]), ["input-text/1.png", "input-text/2.png"])
+            self.assertEqual(len(summary["skipped"]), 4)
+
+            # a different proof scale is a different input.
+            summary = controller.add_subtitles(proof_scale=0.5, resume=True)
+            self.assertEqual(len(summary["rendered"]), 6)
+
+    def test_torn_last_line(self):
+        # a run killed while writing an entry leaves a torn last line; the entries after it are kept.
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, JOURNAL_FILENAME)
+            journal = RenderJournal(path)
+            journal.record_completed("draft/1.png", "a")
+            with open(path, "a", encoding="utf-8") as writer:
+                writer.write('{"output": "draft/2.png", "sta')
+            journal = RenderJournal(path)
+            self.assertIsNone(journal.get_entry("draft/2.png"))
+            journal.record_completed("draft/3.png", "c")
+            journal = RenderJournal(path)
+            self.assertEqual(journal.get_entry("draft/1.png")["input_hash"], "a")
+            self.assertEqual(journal.get_entry("draft/3.png")["input_hash"], "c")
@@ -0,0 +1,47 @@
+import copy
+import tempfile
+import unittest
+
+from PIL import Image
+
+from kksubs.benchmark.synthetic import create_synthetic_project
+from kksubs.kksubs import SubtitleController
+from kksubs.model.layout import get_subtitle_layouts
+from kksubs.model.subtitle_services import apply_text_to_image
+
+class TestLayout(unittest.TestCase):
+
+    def test_layouts_match_rendering(self):
+        with tempfile.TemporaryDirectory() as directory:
+            create_synthetic_project(directory, frames=3, lines_per_subtitle=2, features=["plain", "rotate", "orbits"])
+            controller = SubtitleController()
+            controller.load_project(directory)
+            layouts = controller.get_layouts()
+            self.assertEqual(sorted(layouts.keys()), ["draft-0/00001.png", "draft-0/00002.png", "draft-0/00003.png"])
+
+            plain_layout, = layouts["draft-0/00001.png"]
+            rotated_layout, = layouts["draft-0/00002.png"]
+            self.assertIsNone(plain_layout.rotate)
+            self.assertEqual(rotated_layout.rotate, 10)
+            # the main text and both orbits.
+            self.assertEqual(len(layouts["draft-0/00003.png"]), 3)
+            self.assertEqual(len(plain_layout.lines), len(plain_layout.to_dict()["lines"]))
+            self.assertGreater(len(plain_layout.lines), 2)
+
+            for render_job in controller.subtitle_service.get_render_jobs():
+                subtitle = copy.deepcopy(render_job.subtitle_group.subtitle_list[0])
+                image = Image.new("RGBA", (1920, 1080), (0, 0, 0, 0))
+                _, box = apply_text_to_image(image, subtitle, get_box=True)
+                self.assertEqual(box, get_subtitle_layouts(subtitle, image.size)[0].get_box())
+
+            # unrotated text is drawn inside the box, give or take the stroke.
+            render_job = controller.subtitle_service.get_render_jobs()[0]
+            subtitle = copy.deepcopy(render_job.subtitle_group.subtitle_list[0])
+            image = apply_text_to_image(Image.new("RGBA", (1920, 1080), (0, 0, 0, 0)), subtitle)
+            left, top, right, bottom = image.getchannel("A").getbbox()
+            stroke_size = subtitle.subtitle_profile.font_data.stroke_size
+            self.assertLessEqual(abs(left - plain_layout.left), stroke_size + 2)
+            self.assertLessEqual(abs(right - plain_layout.right), stroke_size + 2)
+            self.assertLessEqual(abs(top - plain_layout.lines[0].y), stroke_size + 2)
+            # text pushed down grows from the anchor, so "up" is the bottom of the box; descenders and the stroke reach below.
+            self.assertLessEqual(abs(bottom - plain_layout.up), 2*stroke_size + 2)
@@ -0,0 +1,71 @@
+import itertools
+import json
+import os
+import random
+import tempfile
+import textwrap
+import unittest
+
+from kksubs.benchmark.synthetic import LOREM_IPSUM, create_synthetic_project
+from kksubs.kksubs import SubtitleController
+from kksubs.model.layout import get_approximate_text_width, get_text_width, wrap_content
+from kksubs.model.lint import OFF_FRAME, ORBIT_COLLISION, OVERLAP, get_intersecting_pairs
+
+DRAFT = """image_id: 00001.png
+profile_0: Hello there
+profile_0: Hello again
+
+image_id: 00002.png
+textbox_data.anchor_point: [2000, 0]
+content: Off the frame
+
+image_id: 00003.png
+profile_1: Orbits
+
+image_id: 00004.png
+profile_0: Nothing wrong here
+"""
+
+class TestLint(unittest.TestCase):
+
+    def test_lint(self):
+        with tempfile.TemporaryDirectory() as directory:
+            project = create_synthetic_project(directory, frames=4, features=["plain", "orbits"])
+            with open(os.path.join(project.input_text_directory, "draft-0.txt"), "w", encoding="utf-8") as writer:
+                writer.write(DRAFT)
+            controller = SubtitleController()
+            controller.load_project(directory)
+
+            issues = controller.lint()
+            self.assertEqual(
+                [(issue.kind, issue.image_id, issue.line_number) for issue in issues],
+                [(OVERLAP, "00001.png", 2), (OFF_FRAME, "00002.png", 7), (ORBIT_COLLISION, "00003.png", 10)]
+            )
+            self.assertIn("(line 3)", issues[0].message)
+            self.assertEqual(json.loads(json.dumps(issues[1].to_dict()))["text_id"], "draft-0.txt")
+
+            self.assertEqual(controller.lint(filter_dict={"draft-0.txt": [3]}), [])
+            # subtitles that only touch within the tolerance are not reported.
+            self.assertEqual([issue.kind for issue in controller.lint(filter_dict={"draft-0.txt": [0]}, tolerance=300)], [])
+
+    def test_intersecting_pairs(self):
+        random.seed(0)
+        bounds = []
+        for _ in range(200):
+            x, y = random.uniform(0, 1000), random.uniform(0, 1000)
+            bounds.append((x, y, x + random.uniform(1, 100), y + random.uniform(1, 100)))
+        expected = [
+            (i, j) for i, j in itertools.combinations(range(len(bounds)), 2)
+            if min(bounds[i][2], bounds[j][2]) > max(bounds[i][0], bounds[j][0])
+            and min(bounds[i][3], bounds[j][3]) > max(bounds[i][1], bounds[j][1])
+        ]
+        self.assertEqual(get_intersecting_pairs(bounds), expected)
+
+    def test_fast_paths(self):
+        font_style = os.path.join("src", "kksubs", "resource", "font", "Roboto", "Roboto-Regular.ttf")
+        self.assertAlmostEqual(
+            get_approximate_text_width(font_style, 50, LOREM_IPSUM), get_text_width(font_style, 50, LOREM_IPSUM), delta=3
+        )
+        for line in [LOREM_IPSUM, "well-known  words", " leading", "trailing ", "averyveryverylongword here", "x"]:
+            for box_width in [1, 5, 20, 60]:
+                self.assertEqual(wrap_content([line], box_width), textwrap.wrap(line, width=box_width))
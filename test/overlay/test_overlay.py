@@ -0,0 +1,90 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from PIL import Image
+
+from kksubs.benchmark.golden import compare_images
+from kksubs.benchmark.synthetic import create_synthetic_project
+from kksubs.kksubs import SubtitleController
+
+class TestOverlay(unittest.TestCase):
+
+    def test_overlay(self):
+        with tempfile.TemporaryDirectory() as directory:
+            project = create_synthetic_project(
+                directory, frames=4, resolution=(640, 360), features=["plain", "outline_blur", "brightness"]
+            )
+            controller = SubtitleController()
+            controller.load_project(directory)
+            output_directory = os.path.join(project.output_directory, "draft-0")
+            controller.add_subtitles()
+            frames = {image_id: Image.open(os.path.join(output_directory, image_id)).convert("RGB") for image_id in os.listdir(output_directory)}
+
+            def get_composited(image_id):
+                frame = Image.open(os.path.join(project.input_image_directory, image_id)).convert("RGBA")
+                overlay = Image.open(os.path.join(output_directory, image_id))
+                self.assertEqual(overlay.mode, "RGBA")
+                return Image.alpha_composite(frame, overlay).convert("RGB")
+
+            # frames 1 and 4 have the same plain subtitle, so the second is a link to the first.
+            summary = controller.add_subtitles(overlay=True, workers=2)
+            self.assertEqual(summary["linked"], ["draft-0/00004.png"])
+            self.assertEqual(len(summary["rendered"]), 3)
+            self.assertNotIn("draft-0/00004.png", summary["rendered"])
+            self.assertTrue(os.path.samefile(os.path.join(output_directory, "00001.png"), os.path.join(output_directory, "00004.png")))
+            self.assertLessEqual(compare_images(frames["00001.png"], get_composited("00001.png"))["max_error"], 2)
+            # without effects, the brightened background is left out.
+            self.assertGreater(compare_images(frames["00003.png"], get_composited("00003.png"))["mean_error"], 10)
+
+            # the shard manifest lists linked overlays as outputs of the shard.
+            controller.add_subtitles(overlay=True, shard="0/1")
+            self.assertEqual(controller.verify_shards(shard_count=1, overlay=True)["missing"], [])
+
+            summary = controller.add_subtitles(overlay=True, overlay_effects=True)
+            for image_id, frame in frames.items():
+                self.assertLessEqual(compare_images(frame, get_composited(image_id))["max_error"], 2)
+
+            # frames saved over shared overlays do not change the other links.
+            controller.add_subtitles(filter_dict={"draft-0.txt": [0]})
+            self.assertFalse(os.path.samefile(os.path.join(output_directory, "00001.png"), os.path.join(output_directory, "00004.png")))
+            self.assertEqual(Image.open(os.path.join(output_directory, "00004.png")).mode, "RGBA")
+
+            with self.assertRaises(ValueError):
+                controller.add_subtitles(overlay=True, resume=True)
+
+            # a frame that cannot be linked fails alone.
+            with mock.patch("kksubs.model.subtitle_services.link_file", side_effect=OSError("disk full")):
+                summary = controller.add_subtitles(overlay=True, isolate_failures=True)
+                self.assertEqual([failure["output"] for failure in summary["failed"]], ["draft-0/00004.png"])
+                self.assertEqual(summary["linked"], [])
+                self.assertEqual(len(summary["rendered"]), 3)
+                with self.assertRaises(OSError):
+                    controller.add_subtitles(overlay=True)
+
+    def test_overlay_of_jpeg_frames(self):
+        with tempfile.TemporaryDirectory() as directory:
+            project = create_synthetic_project(directory, frames=2, resolution=(320, 180), features=["plain"])
+            for image_id in os.listdir(project.input_image_directory):
+                path = os.path.join(project.input_image_directory, image_id)
+                Image.open(path).convert("RGB").save(os.path.splitext(path)[0] + ".jpg")
+                os.remove(path)
+            draft_path = os.path.join(project.input_text_directory, "draft-0.txt")
+            with open(draft_path, "r", encoding="utf-8") as reader:
+                draft = reader.read()
+            with open(draft_path, "w", encoding="utf-8") as writer:
+                writer.write(draft.replace(".png", ".jpg"))
+            controller = SubtitleController()
+            controller.load_project(directory)
+
+            # overlays are PNG whatever the frame format, and are listed, manifested and laid out by their own path.
+            summary = controller.add_subtitles(overlay=True, shard="0/1", layout_format="json")
+            self.assertEqual(sorted(summary["rendered"] + summary["linked"]), ["draft-0/00001.png", "draft-0/00002.png"])
+            self.assertTrue(controller.verify_shards(shard_count=1, overlay=True)["is_complete"])
+            with open(os.path.join(project.output_directory, "draft-0.shard-0-of-1.layout.json"), "r", encoding="utf-8") as reader:
+                sidecar = json.load(reader)
+            for frame in sidecar["frames"]:
+                self.assertTrue(frame["image_id"].endswith(".jpg"))
+                self.assertTrue(os.path.exists(os.path.join(project.output_directory, frame["output"])))
@@ -0,0 +1,37 @@
+import io
+import unittest
+
+from PIL import Image
+
+from kksubs.kksubs import SubtitleController
+
+class TestPreview(unittest.TestCase):
+
+    def setUp(self):
+        self.controller = SubtitleController()
+        self.controller.load_input_text_directory("test/simple-text/input-text-directory")
+        self.controller.load_input_image_directory("test/resource/sample-images")
+        self.controller.load_output_directory("test/simple-text/output-directory")
+        self.controller.load_subtitle_profiles("test/simple-text/subtitle_profiles.yaml")
+        self.controller.load_default_subtitle_profile_id()
+
+    def test_preview(self):
+        image = self.controller.preview("input-text.txt", "5.png")
+        self.assertEqual(image.size, (1920, 1080))
+
+        # repeated previews use the warm caches and must not accumulate changes (e.g. default text).
+        repeated_image = self.controller.preview("input-text", "5.png")
+        self.assertEqual(image.tobytes(), repeated_image.tobytes())
+
+    def test_preview_bytes(self):
+        image_bytes = self.controller.preview("input-text", "1.png", image_format="PNG")
+        with Image.open(io.BytesIO(image_bytes)) as image:
+            self.assertEqual(image.size, (1920, 1080))
+
+    def test_preview_without_alpha(self):
+        # frames with alpha are encoded without it in formats that cannot hold it.
+        image = self.controller.preview("input-text", "1.png")
+        self.assertEqual(image.mode, "RGBA")
+        image_bytes = self.controller.preview("input-text", "1.png", image_format="JPEG")
+        with Image.open(io.BytesIO(image_bytes)) as encoded_image:
+            self.assertEqual((encoded_image.format, encoded_image.mode, encoded_image.size), ("JPEG", "RGB", (1920, 1080)))
@@ -0,0 +1,55 @@
+import os
+import tempfile
+import unittest
+
+from PIL import Image
+
+from kksubs.image.utils import load_image
+from kksubs.kksubs import SubtitleController
+from kksubs.model.domain_models import LayerData, SubtitleProfile
+
+class TestProofMode(unittest.TestCase):
+
+    def test_get_scaled(self):
+        subtitle_profile = SubtitleProfile.get_default()
+        subtitle_profile.textbox_data.anchor_point = (100, -400)
+        scaled_profile = subtitle_profile.get_scaled(0.25)
+        self.assertEqual(scaled_profile.font_data.size, 12)
+        self.assertEqual(scaled_profile.font_data.stroke_size, 1)
+        self.assertEqual(scaled_profile.textbox_data.anchor_point, (25, -100))
+        self.assertEqual(scaled_profile.textbox_data.box_width, subtitle_profile.textbox_data.box_width)
+        # the original profile is left untouched.
+        self.assertEqual(subtitle_profile.font_data.size, 50)
+
+    def test_get_scaled_layer_data(self):
+        # pixel defaults of masked effects are scaled with the frame.
+        layer_data = LayerData(motion_rotate=30, f_coords=(100, 0)).get_scaled(0.25)
+        self.assertEqual((layer_data.motion_blur, layer_data.f_radius, layer_data.f_blur, layer_data.f_coords), (12, 50, 50, (25, 0)))
+        self.assertIsNone(LayerData(motion_rotate=30).get_scaled(0.25).motion_blur)
+        self.assertIsNone(LayerData(f_coords=(100, 0)).get_scaled(0.25).motion_blur)
+
+    def test_proof_mode(self):
+        with tempfile.TemporaryDirectory() as output_directory:
+            controller = SubtitleController()
+            controller.load_input_text_directory("test/simple-text/input-text-directory")
+            controller.load_input_image_directory("test/resource/sample-images")
+            controller.load_output_directory(output_directory)
+            controller.load_subtitle_profiles("test/simple-text/subtitle_profiles.yaml")
+            controller.load_default_subtitle_profile_id()
+            controller.add_subtitles(proof_scale=0.25)
+
+            with Image.open(os.path.join(output_directory, "input-text", "1.png")) as image:
+                self.assertEqual(image.size, (480, 270))
+
+    def test_load_image_closes_file(self):
+        # the source can be replaced or removed once a frame is loaded, at full and at reduced scale.
+        with tempfile.TemporaryDirectory() as directory:
+            image_path = os.path.join(directory, "frame.png")
+            Image.new("RGB", (64, 36), (10, 20, 30)).save(image_path)
+            for scale in [None, 0.5]:
+                with self.subTest(scale=scale):
+                    image = load_image(image_path, scale=scale)
+                    self.assertIsNone(getattr(image, "fp", None))
+                    os.replace(image_path, image_path + ".old")
+                    self.assertEqual(image.getpixel((0, 0)), (10, 20, 30))
+                    os.replace(image_path + ".old", image_path)
@@ -0,0 +1,66 @@
+import os
+import tempfile
+import unittest
+
+from kksubs.kksubs import SubtitleController
+from kksubs.model.domain_models import FontData, LayerData, OutlineData, Subtitle, SubtitleGroup, SubtitleProfile, TextboxData
+from kksubs.model.scheduling import COSTS, estimate_makespan, estimate_render_cost, get_longest_first_order
+
+def get_subtitle_group(subtitle_profile:SubtitleProfile, content=None) -> SubtitleGroup:
+    if content is None:
+        content = ["hello world"]
+    return SubtitleGroup(image_id="1.png", subtitle_list=[Subtitle(subtitle_profile=subtitle_profile, content=content)])
+
+class TestScheduling(unittest.TestCase):
+
+    def test_estimate_render_cost(self):
+        size = (1920, 1080)
+        plain_profile = SubtitleProfile(font_data=FontData(size=40), textbox_data=TextboxData())
+        heavy_profile = SubtitleProfile(
+            font_data=FontData(size=40), textbox_data=TextboxData(),
+            outline_data_1=OutlineData(radius=5, blur_strength=3), outline_data_2=OutlineData(radius=10, blur_strength=5),
+            layer_data=LayerData(radial_blur=50),
+            orbits=[SubtitleProfile(font_data=FontData(size=40), textbox_data=TextboxData(), default_text="orbit")]*3,
+        )
+        plain_cost = estimate_render_cost(get_subtitle_group(plain_profile), size)
+        heavy_cost = estimate_render_cost(get_subtitle_group(heavy_profile), size)
+        self.assertGreater(heavy_cost, 5*plain_cost)
+        self.assertLess(estimate_render_cost(None, size), plain_cost)
+        self.assertGreater(
+            estimate_render_cost(get_subtitle_group(plain_profile, content=["a much longer line of text"]*4), size), plain_cost
+        )
+        # empty subtitles cost only their layer effects.
+        self.assertEqual(estimate_render_cost(get_subtitle_group(plain_profile, content=[]), size), estimate_render_cost(None, size))
+        effect_profile = SubtitleProfile(
+            font_data=FontData(size=40), textbox_data=TextboxData(), layer_data=LayerData(brightness=0.5),
+            orbits=[SubtitleProfile(font_data=FontData(size=40), textbox_data=TextboxData(), default_text="orbit")],
+        )
+        self.assertAlmostEqual(
+            estimate_render_cost(get_subtitle_group(effect_profile, content=[]), size),
+            estimate_render_cost(None, size) + COSTS["brightness"]*1920*1080/1e6
+        )
+        # proofs scale all geometry, so the cost scales with the area.
+        self.assertAlmostEqual(
+            estimate_render_cost(get_subtitle_group(heavy_profile), size, proof_scale=0.5), heavy_cost/4
+        )
+
+    def test_longest_first(self):
+        costs = [1, 1, 1, 1, 1, 1, 6]
+        order = get_longest_first_order(costs)
+        self.assertEqual(order[0], 6)
+        self.assertLess(estimate_makespan([costs[i] for i in order], 2), estimate_makespan(costs, 2))
+        self.assertEqual(estimate_makespan([costs[i] for i in order], 2), 6)
+
+    def test_scheduled_render(self):
+        with tempfile.TemporaryDirectory() as output_directory:
+            controller = SubtitleController()
+            controller.load_input_text_directory("test/simple-text/input-text-directory")
+            controller.load_input_image_directory("test/resource/sample-images")
+            controller.load_output_directory(output_directory)
+            controller.load_subtitle_profiles("test/simple-text/subtitle_profiles.yaml")
+            controller.load_default_subtitle_profile_id()
+
+            controller.add_subtitles(proof_scale=0.25, workers=2)
+            self.assertListEqual(
+                sorted(os.listdir(os.path.join(output_directory, "input-text"))), [f"{i}.png" for i in range(1, 7)]
+            )
@@ -0,0 +1,102 @@
+import http.client
+import io
+import json
+import os
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+from PIL import Image
+
+from kksubs.kksubs import SubtitleController
+from kksubs.server import RenderServer, create_server
+
+class TestServer(unittest.TestCase):
+
+    def test_server(self):
+        with tempfile.TemporaryDirectory() as output_directory:
+            controller = SubtitleController()
+            controller.load_input_text_directory("test/simple-text/input-text-directory")
+            controller.load_input_image_directory("test/resource/sample-images")
+            controller.load_output_directory(output_directory)
+            controller.load_subtitle_profiles("test/simple-text/subtitle_profiles.yaml")
+            controller.load_default_subtitle_profile_id()
+
+            server = create_server(RenderServer(controller=controller, max_concurrency=1), port=0)
+            thread = threading.Thread(target=server.serve_forever, daemon=True)
+            thread.start()
+            try:
+                connection = http.client.HTTPConnection(*server.server_address)
+
+                connection.request("POST", "/preview", body=json.dumps({"text_id": "input-text", "image_id": "1.png", "proof_scale": 0.5}))
+                response = connection.getresponse()
+                self.assertEqual(response.status, 200)
+                with Image.open(io.BytesIO(response.read())) as image:
+                    self.assertEqual(image.size, (960, 540))
+
+                # a null image format is the default format.
+                connection.request("POST", "/preview", body=json.dumps({
+                    "text_id": "input-text", "image_id": "1.png", "proof_scale": 0.25, "image_format": None
+                }))
+                response = connection.getresponse()
+                self.assertEqual(response.status, 200)
+                self.assertEqual(response.getheader("Content-Type"), "image/png")
+                with Image.open(io.BytesIO(response.read())) as image:
+                    self.assertEqual(image.format, "PNG")
+
+                connection.request("POST", "/batch", body=json.dumps({"requests": [
+                    {"action": "render", "filter_dict": {"input-text.txt": [0]}, "proof_scale": 0.25},
+                    {"action": "preview", "text_id": "input-text", "image_id": "2.png", "proof_scale": 0.25},
+                ]}))
+                response = connection.getresponse()
+                self.assertEqual(response.status, 200)
+                results = json.loads(response.read())["results"]
+                self.assertEqual(results[0]["status"], "ok")
+                self.assertIn("image", results[1])
+                self.assertTrue(os.path.exists(os.path.join(output_directory, "input-text", "1.png")))
+
+                connection.request("POST", "/render", body=json.dumps({"filter_dict": {"input-text.txt": [1]}, "proof_scale": 0.25, "layout_format": "json"}))
+                response = connection.getresponse()
+                self.assertEqual(json.loads(response.read())["status"], "ok")
+                self.assertTrue(os.path.exists(os.path.join(output_directory, "input-text.layout.json")))
+
+                # GET only reads the server state.
+                connection.request("GET", "/status")
+                response = connection.getresponse()
+                self.assertEqual(json.loads(response.read())["status"], "ok")
+                connection.request("GET", "/render")
+                response = connection.getresponse()
+                response.read()
+                self.assertEqual(response.status, 405)
+
+                # invalid requests, and failures while handling valid ones.
+                for action, request in [
+                    ("preview", {"text_id": "missing", "image_id": "1.png"}),
+                    ("preview", {"text_id": "input-text"}),
+                    ("render", {"layout_format": "xml"}),
+                    ("unknown", {}),
+                ]:
+                    with self.subTest(action=action, request=request):
+                        connection.request("POST", f"/{action}", body=json.dumps(request))
+                        response = connection.getresponse()
+                        response.read()
+                        self.assertEqual(response.status, 400)
+                with mock.patch.object(controller, "preview", side_effect=KeyError("font")):
+                    connection.request("POST", "/preview", body=json.dumps({"text_id": "input-text", "image_id": "1.png"}))
+                    response = connection.getresponse()
+                    response.read()
+                    self.assertEqual(response.status, 500)
+            finally:
+                server.shutdown()
+                server.server_close()
+
+    def test_reload_waits_for_renders(self):
+        render_server = RenderServer(max_concurrency=2)
+        render_server._semaphore.acquire()
+        reloaded = threading.Event()
+        thread = threading.Thread(target=lambda: (render_server.reload(), reloaded.set()), daemon=True)
+        thread.start()
+        self.assertFalse(reloaded.wait(0.2))
+        render_server._semaphore.release()
+        self.assertTrue(reloaded.wait(5))
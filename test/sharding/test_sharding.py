@@ -0,0 +1,50 @@
+import os
+import tempfile
+import unittest
+
+from kksubs.kksubs import SubtitleController
+from kksubs.model.sharding import COST, HASH, parse_shard, partition_keys
+
+class TestSharding(unittest.TestCase):
+
+    def test_partition_keys(self):
+        keys = [f"draft/{i}.png" for i in range(20)]
+        costs = [1.0]*19 + [10.0]
+        for method in [HASH, COST]:
+            shards = partition_keys(keys, 3, method=method, costs=costs)
+            self.assertListEqual(sorted(index for shard in shards for index in shard), list(range(20)))
+            self.assertListEqual(shards, partition_keys(keys, 3, method=method, costs=costs))
+        # cost-balanced shards differ in load by at most one cheap job.
+        shards = partition_keys(keys, 3, method=COST, costs=costs)
+        loads = sorted(sum(costs[index] for index in shard) for shard in shards)
+        self.assertLessEqual(loads[-1] - loads[0], 1.0)
+
+    def test_parse_shard(self):
+        self.assertEqual(parse_shard("1/3"), (1, 3))
+        self.assertEqual(parse_shard((0, 1)), (0, 1))
+        with self.assertRaises(ValueError):
+            parse_shard((3, 3))
+
+    def test_sharded_render(self):
+        with tempfile.TemporaryDirectory() as output_directory:
+            controller = SubtitleController()
+            controller.load_input_text_directory("test/simple-text/input-text-directory")
+            controller.load_input_image_directory("test/resource/sample-images")
+            controller.load_output_directory(output_directory)
+            controller.load_subtitle_profiles("test/simple-text/subtitle_profiles.yaml")
+            controller.load_default_subtitle_profile_id()
+
+            controller.add_subtitles(proof_scale=0.25, shard=(0, 2), shard_method=COST)
+            report = controller.verify_shards()
+            self.assertFalse(report["is_complete"])
+            self.assertListEqual(report["missing_shards"], [1])
+
+            controller.add_subtitles(proof_scale=0.25, shard=(1, 2), shard_method=COST)
+            report = controller.verify_shards()
+            self.assertTrue(report["is_complete"])
+            self.assertListEqual(
+                sorted(os.listdir(os.path.join(output_directory, "input-text"))), [f"{i}.png" for i in range(1, 7)]
+            )
+
+            os.remove(os.path.join(output_directory, "input-text", "1.png"))
+            self.assertListEqual(controller.verify_shards()["missing"], ["input-text/1.png"])
@@ -0,0 +1,61 @@
+import json
+import os
+import tempfile
+import unittest
+
+from PIL import Image, ImageChops
+
+from kksubs.benchmark.synthetic import create_synthetic_project
+from kksubs.kksubs import SubtitleController
+
+def read_jsonl(path):
+    with open(path, "r", encoding="utf-8") as reader:
+        return [json.loads(line) for line in reader]
+
+class TestSidecar(unittest.TestCase):
+
+    def test_sidecar(self):
+        with tempfile.TemporaryDirectory() as directory:
+            project = create_synthetic_project(directory, frames=2, features=["plain", "orbits"])
+            controller = SubtitleController()
+            controller.load_project(directory)
+            controller.add_subtitles(workers=2, layout_format="jsonl")
+
+            frames = read_jsonl(os.path.join(project.output_directory, "draft-0.layout.jsonl"))
+            self.assertEqual([frame["output"] for frame in frames], ["draft-0/00001.png", "draft-0/00002.png"])
+            layouts = controller.get_layouts()
+            for frame in frames:
+                self.assertEqual(frame["size"], [1920, 1080])
+                subtitle, = frame["subtitles"]
+                expected = [layout.to_dict() for layout in layouts[frame["output"]]]
+                self.assertEqual([{**subtitle, "orbits": None}] + subtitle["orbits"], [{**expected[0], "orbits": None}] + expected[1:])
+
+                # everything the renderer drew lies within the reported bounds.
+                source = Image.open(os.path.join(project.input_image_directory, frame["image_id"])).convert("RGB")
+                output = Image.open(os.path.join(project.output_directory, frame["output"])).convert("RGB")
+                left, top, right, bottom = ImageChops.difference(source, output).getbbox()
+                bounds = [subtitle["bounds"]] + [orbit["bounds"] for orbit in subtitle["orbits"]]
+                self.assertGreaterEqual(left, min(bound[0] for bound in bounds))
+                self.assertGreaterEqual(top, min(bound[1] for bound in bounds))
+                self.assertLessEqual(right, max(bound[2] for bound in bounds) + 1)
+                self.assertLessEqual(bottom, max(bound[3] for bound in bounds) + 1)
+            self.assertEqual(len(frames[1]["subtitles"][0]["orbits"]), 2)
+
+            # proofs report proof coordinates, and resumed runs still list the skipped frames.
+            controller.add_subtitles(proof_scale=0.5, resume=True, layout_format="json")
+            summary = controller.add_subtitles(proof_scale=0.5, resume=True, layout_format="json")
+            self.assertEqual(len(summary["skipped"]), 2)
+            with open(os.path.join(project.output_directory, "draft-0.layout.json"), "r", encoding="utf-8") as reader:
+                sidecar = json.load(reader)
+            self.assertEqual(sidecar["text_id"], "draft-0.txt")
+            self.assertEqual([frame["size"] for frame in sidecar["frames"]], [[960, 540], [960, 540]])
+            self.assertEqual(sidecar["frames"][0]["subtitles"][0]["anchor"], [480, 270])
+
+            # shards share the output directory, so each writes its own sidecar.
+            outputs = []
+            for shard in ["0/2", "1/2"]:
+                controller.add_subtitles(shard=shard, layout_format="jsonl")
+                path = os.path.join(project.output_directory, f"draft-0.shard-{shard[0]}-of-2.layout.jsonl")
+                if os.path.exists(path):
+                    outputs.extend(frame["output"] for frame in read_jsonl(path))
+            self.assertEqual(sorted(outputs), ["draft-0/00001.png", "draft-0/00002.png"])
@@ -0,0 +1,29 @@
+import os
+import tempfile
+import unittest
+
+from kksubs.kksubs import SubtitleController
+
+class TestIterSubtitles(unittest.TestCase):
+
+    def test_iter_subtitles(self):
+        with tempfile.TemporaryDirectory() as output_directory:
+            controller = SubtitleController()
+            controller.load_input_text_directory("test/simple-text/input-text-directory")
+            controller.load_input_image_directory("test/resource/sample-images")
+            controller.load_output_directory(output_directory)
+            controller.load_subtitle_profiles("test/simple-text/subtitle_profiles.yaml")
+            controller.load_default_subtitle_profile_id()
+
+            frames = list(controller.iter_subtitles(proof_scale=0.25))
+            self.assertListEqual(
+                [(text_id, image_id) for text_id, image_id, _ in frames],
+                [("input-text.txt", f"{i}.png") for i in range(1, 7)]
+            )
+
+            parallel_frames = list(controller.iter_subtitles(proof_scale=0.25, workers=3))
+            for (_, _, image), (_, _, parallel_image) in zip(frames, parallel_frames):
+                self.assertEqual(image.tobytes(), parallel_image.tobytes())
+
+            # streaming does not write any output.
+            self.assertListEqual(os.listdir(output_directory), [])
@@ -1,6 +1,6 @@
 import unittest
 
-from kksubs.model.converters import get_subtitle_profiles
+from kksubs.model.converters import _get_subtitle_groups_from_textstring, get_subtitle_profiles
 
 class TestSubtitleProfileInheritance(unittest.TestCase):
 
@@ -13,4 +13,27 @@ class TestSubtitleProfileInheritance(unittest.TestCase):
         self.assertEqual(parent_profile.font_data.color, (255, 0, 0))
         self.assertEqual(parent_profile.font_data.size, 50)
         self.assertEqual(child_profile.font_data.color, (0, 0, 255))
-        self.assertEqual(child_profile.font_data.size, 50)
\ No newline at end of file
+        self.assertEqual(child_profile.font_data.size, 50)
+
+    def test_asset_data(self):
+        # asset data from YAML is converted like the other profile sections.
+        path = "test/subtitle-profile-inheritance/subtitle_profiles.yaml"
+        asset_data = get_subtitle_profiles(path)["asset"].asset_data
+        self.assertEqual(asset_data.coords, (-100, 40))
+        self.assertEqual(asset_data.scale, 0.05)
+        self.assertEqual(asset_data.rotate, 30)
+
+    def test_shared_profiles(self):
+        # subtitles without local profile data share their resolved profile, and local data stays with its subtitle.
+        path = "test/subtitle-profile-inheritance/subtitle_profiles.yaml"
+        textstring = "\n".join([
+            "image_id: 1.png", "child: one",
+            "image_id: 2.png", "outline_data_1.radius: 7", "child: two",
+            "image_id: 3.png", "child: three",
+        ])
+        subtitle_groups = _get_subtitle_groups_from_textstring(textstring, get_subtitle_profiles(path), default_profile_id="parent")
+        profiles = [subtitle_groups[image_id].subtitle_list[0].subtitle_profile for image_id in ["1.png", "2.png", "3.png"]]
+        self.assertIs(profiles[0], profiles[2])
+        self.assertEqual(profiles[0].font_data.color, (0, 0, 255))
+        self.assertEqual(profiles[1].outline_data_1.radius, 7)
+        self.assertIsNone(profiles[2].outline_data_1)
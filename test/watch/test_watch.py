@@ -0,0 +1,54 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from kksubs.model.data_access_services import SubtitleDataAccessService
+from kksubs.model.watch_services import ProjectWatcher
+
+def _replace_in_file(path, old, new):
+    with open(path, "r", encoding="utf-8") as reader:
+        content = reader.read()
+    with open(path, "w", encoding="utf-8") as writer:
+        writer.write(content.replace(old, new))
+    # make sure the change is visible even on file systems with coarse timestamps.
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+class TestWatch(unittest.TestCase):
+
+    def test_watch(self):
+        with tempfile.TemporaryDirectory() as directory:
+            input_text_directory = os.path.join(directory, "input-text-directory")
+            shutil.copytree("test/simple-text/input-text-directory", input_text_directory)
+            subtitle_profile_path = os.path.join(directory, "subtitle_profiles.yaml")
+            shutil.copy("test/simple-text/subtitle_profiles.yaml", subtitle_profile_path)
+            textpath = os.path.join(input_text_directory, "input-text.txt")
+
+            model = SubtitleDataAccessService()
+            model.set_input_text_directory(input_text_directory)
+            model.set_input_image_directory("test/resource/sample-images")
+            model.set_subtitle_profile_path(subtitle_profile_path)
+            model.set_default_subtitle_profile_id("default")
+            watcher = ProjectWatcher(model)
+
+            self.assertEqual(len(watcher.poll()), 6)
+            self.assertListEqual(watcher.poll(), [])
+
+            # a one-line edit only affects its own image.
+            _replace_in_file(textpath, "font_data.color: red", "font_data.color: blue")
+            self.assertListEqual([render_job.image_id for render_job in watcher.poll()], ["2.png"])
+
+            # a profile edit only affects the images using that profile.
+            _replace_in_file(subtitle_profile_path, "color: black", "color: green")
+            self.assertListEqual([render_job.image_id for render_job in watcher.poll()], ["5.png"])
+
+            # an invalid edit keeps nothing: once it is fixed, every frame it changed is re-rendered.
+            _replace_in_file(textpath, "font_data.color: blue", "font_data.color: red")
+            _replace_in_file(textpath, "font_data.color: (10, 200, 10)", "font_data.style: missing.ttf")
+            for _ in range(2):
+                with self.assertRaises(Exception):
+                    watcher.poll()
+            _replace_in_file(textpath, "font_data.style: missing.ttf", "font_data.color: (10, 10, 200)")
+            self.assertListEqual([render_job.image_id for render_job in watcher.poll()], ["2.png", "6.png"])
+            self.assertListEqual(watcher.poll(), [])